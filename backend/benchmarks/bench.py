@@ -0,0 +1,350 @@
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from .mock_upstream import PROVIDERS_DIR, start_mock_upstream, load_latency_profile, fake_embedding
+from .rerank_eval import percentile
+
+# Offline micro and end-to-end benchmarks. "micro" scenarios are CPU-only; "e2e" scenarios call the
+# real service code against benchmarks/mock_upstream.py with the chosen latency profile.
+# Run from the repository root:
+#   python -m backend.benchmarks.bench --kind e2e --profile typical --json after.json --compare before.json
+
+SCENARIOS: dict[str, tuple[str, Callable[[], Callable[[], Any]]]] = {}
+
+def scenario(name: str, kind: str) -> Callable:
+    def register(setup: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        SCENARIOS[name] = (kind, setup)
+        return setup
+
+    return register
+
+def load_provider_fixture(provider: str) -> dict:
+    return json.loads((PROVIDERS_DIR / f"{provider}.json").read_text())
+
+# Raw Brave web results from the fixtures, mapped to the fields the re-ranker and RAG pipeline read
+def fixture_web_results() -> list[dict]:
+    web_results = []
+
+    for route in load_provider_fixture("brave")["routes"]:
+        if route["path"] != "/web/search":
+            continue
+
+        for web_res in route["body"]["web"]["results"]:
+            web_results.append({
+                "title": web_res["title"],
+                "url": web_res["url"],
+                "snippet": web_res["description"],
+                "site_homepage": web_res["meta_url"]["hostname"],
+                "extra_snippets": web_res.get("extra_snippets", []),
+            })
+
+    return web_results
+
+def fixture_snippets() -> list[str]:
+    return [
+        snippet
+        for web_result in fixture_web_results()
+        for snippet in [web_result["snippet"], *web_result["extra_snippets"]]
+    ]
+
+@scenario("rerank", "micro")
+def setup_rerank() -> Callable[[], Any]:
+    from ..services.reranker import Reranker
+    from ..infrastructure.rank_profiles import UserRankProfile
+
+    reranker = Reranker()
+    web_results = fixture_web_results()
+    profile = UserRankProfile()
+
+    for query in ["paris hotels tripadvisor.com", "eiffel tower tickets", "christopher nolan films", "en.wikipedia.org paris"]:
+        profile.update(query)
+
+    return lambda: reranker.rerank(web_results, profile)
+
+@scenario("dedup", "micro")
+def setup_dedup() -> Callable[[], Any]:
+    from ..services.dedup import dedupe_texts
+
+    snippets = fixture_snippets() * 3
+
+    return lambda: dedupe_texts(snippets)
+
+@scenario("semantic_cache.lookup", "micro")
+def setup_semantic_cache_lookup() -> Callable[[], Any]:
+    from ..infrastructure.semantic_cache import SemanticCache
+
+    cache = SemanticCache(max_entries=1000)
+
+    for i in range(1000):
+        cache.store("web:moderate", f"query {i}", fake_embedding(f"query {i}"), {"rank": i})
+
+    embedding = fake_embedding("query not in the cache")
+
+    return lambda: cache.lookup_similar("web:moderate", "web", embedding)
+
+@scenario("bm25.search", "micro")
+def setup_bm25_search() -> Callable[[], Any]:
+    from ..infrastructure.lexical_index import BM25Index
+
+    snippets = fixture_snippets() * 4
+    index = BM25Index([str(i) for i in range(len(snippets))], snippets)
+
+    return lambda: index.search("eiffel tower tickets opening times", top_k=10)
+
+# Raised by a setup whose fixture is not on disk; the scenario is reported as skipped
+class FixtureUnavailable(Exception):
+    pass
+
+# Real articles fetched by fetch_wikitext_corpus.py and checked against the pinned checksum
+def load_wikitext_corpus() -> list[dict]:
+    from .fetch_wikitext_corpus import CORPUS_PATH, LOCK_PATH
+
+    if not CORPUS_PATH.exists() or not LOCK_PATH.exists():
+        raise FixtureUnavailable("no wikitext corpus, run python -m backend.benchmarks.fetch_wikitext_corpus")
+
+    corpus = CORPUS_PATH.read_bytes()
+
+    if hashlib.sha256(corpus).hexdigest() != json.loads(LOCK_PATH.read_text())["sha256"]:
+        raise FixtureUnavailable("wikitext corpus does not match its lock file, fetch it again")
+
+    return json.loads(corpus)["articles"]
+
+@scenario("wikitext.see_also", "micro")
+def setup_wikitext_see_also() -> Callable[[], Any]:
+    from ..services.wikitext import extract_see_also_titles
+
+    wikitexts = [article["wikitext"] for article in load_wikitext_corpus()]
+
+    return lambda: [extract_see_also_titles(wikitext) for wikitext in wikitexts]
+
+@scenario("wikitext.infobox", "micro")
+def setup_wikitext_infobox() -> Callable[[], Any]:
+    from ..services.wikitext import normalize_infobox_row
+
+    rows = [row for article in load_wikitext_corpus() for row in article["infobox"]]
+
+    return lambda: [normalize_infobox_row(label, value) for label, value in rows]
+
+@scenario("geo_index.nearest", "micro")
+def setup_geo_index_nearest() -> Callable[[], Any]:
+    import random
+    from ..infrastructure.geo_index import GeoIndex
+
+    rng = random.Random(1234)
+    index = GeoIndex()
+
+    # Clustered like real results: most places around a few cities, the rest anywhere
+    cities = [(48.8566, 2.3522), (40.7128, -74.0060), (35.6762, 139.6503), (-33.8688, 151.2093)]
+
+    for i in range(20000):
+        lat, lon = rng.choice(cities) if i % 5 else (rng.uniform(-60, 70), rng.uniform(-180, 180))
+        index.add(str(i), "place", f"place {i}", lat + rng.gauss(0, 0.05), lon + rng.gauss(0, 0.05))
+
+    return lambda: index.nearest(48.8584, 2.2945, k=10)
+
+@scenario("image_proxy.transcode", "micro")
+def setup_image_proxy_transcode() -> Callable[[], Any]:
+    from io import BytesIO
+    from PIL import Image
+    from ..services.image_proxy import ImageProxy
+
+    # A backdrop-sized JPEG, the common case for TMDB originals
+    source = BytesIO()
+    Image.radial_gradient("L").resize((1920, 1080)).convert("RGB").save(source, "JPEG", quality=90)
+    source = source.getvalue()
+
+    return lambda: ImageProxy.transcode(source, 384, "webp")
+
+@scenario("brave.web", "e2e")
+def setup_brave_web() -> Callable[[], Any]:
+    from ..services.brave import Brave
+
+    brave = Brave()
+    queries = ["eiffel tower", "hotels in paris", "inception", "generic query"]
+    state = {"i": 0}
+
+    # Cycles through fixtures that do and do not trigger the Wikipedia / Tripadvisor / TMDB enrichments
+    def run() -> Any:
+        state["i"] += 1
+        return brave.get_web_results(queries[state["i"] % len(queries)], "moderate")
+
+    return run
+
+@scenario("brave.suggest", "e2e")
+def setup_brave_suggest() -> Callable[[], Any]:
+    from ..services.brave import Brave
+
+    brave = Brave()
+
+    return lambda: brave.get_suggest_results("eiffel")
+
+@scenario("wiki", "e2e")
+def setup_wiki() -> Callable[[], Any]:
+    from ..services.wiki import Wiki
+
+    wiki = Wiki()
+
+    return lambda: wiki.get_wiki_result("Eiffel Tower - Wikipedia", "https://en.wikipedia.org/wiki/Eiffel_Tower")
+
+@scenario("tripadvisor", "e2e")
+def setup_tripadvisor() -> Callable[[], Any]:
+    from ..services.tripadvisor import Tripadvisor
+
+    tripadvisor = Tripadvisor()
+
+    return lambda: tripadvisor.get_place_results("paris")
+
+@scenario("tmdb", "e2e")
+def setup_tmdb() -> Callable[[], Any]:
+    from ..services.tmdb import TMDB
+
+    tmdb = TMDB()
+
+    return lambda: tmdb.get_tmdb_results("Inception (2010) | IMDb")
+
+@scenario("embeddings", "e2e")
+def setup_embeddings() -> Callable[[], Any]:
+    from ..infrastructure.embeddings import embedding_client
+
+    snippets = fixture_snippets()[:32]
+
+    return lambda: embedding_client.embed_sync(snippets)
+
+def run_scenario(fn: Callable[[], Any], iterations: int, warmup: int, concurrency: int) -> dict:
+    for _ in range(warmup):
+        fn()
+
+    errors = 0
+    empty = 0
+
+    def timed_call(_: int) -> float:
+        nonlocal errors, empty
+        start = time.perf_counter()
+
+        try:
+            # The services swallow upstream failures and return False / {} / [], so count those separately
+            if not fn():
+                empty += 1
+
+        except Exception:
+            errors += 1
+
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed_call, range(iterations)))
+
+    else:
+        latencies = [timed_call(i) for i in range(iterations)]
+
+    wall_time = time.perf_counter() - wall_start
+    latencies_ms = [latency * 1000 for latency in latencies]
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput_ops": round(iterations / wall_time, 2),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 4),
+        "p50_ms": round(percentile(latencies_ms, 50), 4),
+        "p95_ms": round(percentile(latencies_ms, 95), 4),
+        "p99_ms": round(percentile(latencies_ms, 99), 4),
+        "max_ms": round(max(latencies_ms), 4),
+        "errors": errors,
+        "empty": empty,
+    }
+
+def format_comparison(report: dict, baseline: dict) -> list[str]:
+    lines = []
+
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+
+        if not before:
+            continue
+
+        changes = []
+
+        for metric in ("p50_ms", "p99_ms", "throughput_ops"):
+            if before[metric]:
+                changes.append(f"{metric} {before[metric]} -> {result[metric]} ({(result[metric] / before[metric] - 1) * 100:+.1f}%)")
+
+        lines.append(f"{name}: " + ", ".join(changes))
+
+    return lines
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against recorded provider fixtures")
+    parser.add_argument("--scenario", action="append", default=[], help="Scenario name or glob; repeatable")
+    parser.add_argument("--kind", choices=["micro", "e2e", "all"], default="all")
+    parser.add_argument("--profile", default="none", help="Latency profile for the mock upstream (e2e scenarios)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--iterations", type=int, default=None, help="Defaults to 2000 for micro, 50 for e2e")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--json", type=Path, default=None, help="Write the report to this file")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline report to compare against")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (kind, _) in SCENARIOS.items():
+            print(f"{kind:5} {name}")
+
+        return 0
+
+    selected = [
+        name
+        for name, (kind, _) in SCENARIOS.items()
+        if (args.kind == "all" or kind == args.kind)
+        and (not args.scenario or any(fnmatch.fnmatch(name, pattern) for pattern in args.scenario))
+    ]
+
+    if not selected:
+        print("No scenarios selected, see --list")
+        return 1
+
+    # Base URLs must be in the environment before the service modules are imported by the setups
+    server = start_mock_upstream(load_latency_profile(args.profile), seed=args.seed)
+    os.environ.update(server.base_urls())
+
+    report = {"profile": args.profile, "seed": args.seed, "scenarios": {}}
+
+    for name in selected:
+        kind, setup = SCENARIOS[name]
+        iterations = args.iterations or (2000 if kind == "micro" else 50)
+
+        try:
+            fn = setup()
+
+        except FixtureUnavailable as e:
+            print(f"{name}: skipped, {e}")
+            continue
+
+        report["scenarios"][name] = run_scenario(fn, iterations, args.warmup, args.concurrency)
+        print(f"{name}: {json.dumps(report['scenarios'][name])}")
+
+    report["upstream_requests"] = dict(sorted(server.request_counts.items()))
+    server.shutdown()
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        for line in format_comparison(report, json.loads(args.compare.read_text())):
+            print(line)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
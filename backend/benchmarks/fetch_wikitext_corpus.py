@@ -0,0 +1,138 @@
+import sys
+import json
+import hashlib
+import argparse
+from io import StringIO
+from pathlib import Path
+
+import requests as req
+
+# Downloads the corpus for the wikitext.* micro-benchmarks: the raw wikitext of real articles (what
+# extract_see_also_titles parses) and the label / value cells of their rendered infobox (what
+# normalize_infobox_row parses), read the same way services/wiki.py reads them. Wikipedia text is CC BY-SA.
+# The corpus itself is not committed. The lock file pins each article's revision and the sha256 of the written
+# corpus, so every run benchmarks the same bytes.
+# Run from the repository root with network access:
+#   python -m backend.benchmarks.fetch_wikitext_corpus            # fetch the pinned revisions and verify
+#   python -m backend.benchmarks.fetch_wikitext_corpus --update   # re-pin to the current revisions
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+CORPUS_PATH = FIXTURES_DIR / "wikitext_corpus.json"
+LOCK_PATH = FIXTURES_DIR / "wikitext_corpus.lock.json"
+
+WIKIPEDIA_BASE_URL = "https://en.wikipedia.org"
+HEADERS = {"User-Agent": "HuggyPanda-benchmarks/0.1.0 (https://huggypanda.com)"}
+
+# Chosen for coverage: {{coord}} in the infobox (north / south, east / west, display=title), nested infobox
+# templates, and See also sections written as lists, {{div col}} blocks, {{portal}} boxes or missing entirely
+TITLES = [
+    "Eiffel Tower",
+    "New York City",
+    "Sydney Opera House",
+    "Rio de Janeiro",
+    "London",
+    "Mount Everest",
+    "Amazon River",
+    "Tokyo",
+    "Christopher Nolan",
+    "The Dark Knight",
+    "Python (programming language)",
+    "Apple Inc.",
+]
+
+def get_latest_revision_ids(titles: list[str]) -> dict[str, int]:
+    res = req.get(
+        f"{WIKIPEDIA_BASE_URL}/w/api.php",
+        headers=HEADERS,
+        params={
+            "action": "query",
+            "prop": "revisions",
+            "rvprop": "ids",
+            "titles": "|".join(titles),
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+        },
+        timeout=30,
+    )
+    res.raise_for_status()
+
+    return {page["title"]: page["revisions"][0]["revid"] for page in res.json()["query"]["pages"]}
+
+def get_wikitext(revision_id: int) -> str:
+    res = req.get(
+        f"{WIKIPEDIA_BASE_URL}/w/index.php",
+        headers=HEADERS,
+        params={"oldid": revision_id, "action": "raw"},
+        timeout=30,
+    )
+    res.raise_for_status()
+
+    return res.text
+
+def get_infobox_rows(revision_id: int) -> list[list[str]]:
+    import pandas as pd
+
+    res = req.get(f"{WIKIPEDIA_BASE_URL}/w/index.php", headers=HEADERS, params={"oldid": revision_id}, timeout=30)
+    res.raise_for_status()
+
+    try:
+        infobox = pd.read_html(StringIO(res.text), attrs={"class": "infobox"})[0]
+
+    except (ValueError, IndexError):
+        return []
+
+    label_column, value_column = list(infobox.keys())[:2]
+
+    return [
+        [str(label), str(value)]
+        for label, value in zip(infobox[label_column], infobox[value_column])
+        if not pd.isna(label) and not pd.isna(value)
+    ]
+
+def serialize_corpus(articles: list[dict]) -> bytes:
+    return (json.dumps({"articles": articles}, ensure_ascii=False, indent=1, sort_keys=True) + "\n").encode("utf-8")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fetch the real-article corpus for the wikitext benchmarks")
+    parser.add_argument("--update", action="store_true", help="Pin the current revisions and rewrite the lock file")
+    args = parser.parse_args()
+
+    if args.update or not LOCK_PATH.exists():
+        revision_ids = get_latest_revision_ids(TITLES)
+        lock = None
+    else:
+        lock = json.loads(LOCK_PATH.read_text())
+        revision_ids = lock["revisions"]
+
+    articles = []
+
+    for title, revision_id in sorted(revision_ids.items()):
+        articles.append({
+            "title": title,
+            "revision_id": revision_id,
+            "wikitext": get_wikitext(revision_id),
+            "infobox": get_infobox_rows(revision_id),
+        })
+        print(f"{title} (revision {revision_id}): {len(articles[-1]['wikitext'])} chars, {len(articles[-1]['infobox'])} infobox rows")
+
+    corpus = serialize_corpus(articles)
+    sha256 = hashlib.sha256(corpus).hexdigest()
+
+    # The infobox is rendered on request, so a template edit upstream can change it even for a pinned revision
+    if lock is not None and lock["sha256"] != sha256:
+        print(f"Corpus checksum {sha256} does not match the lock ({lock['sha256']}); re-pin with --update")
+        return 1
+
+    CORPUS_PATH.write_bytes(corpus)
+
+    if lock is None:
+        LOCK_PATH.write_text(json.dumps({"revisions": dict(sorted(revision_ids.items())), "sha256": sha256}, indent=2) + "\n")
+        print(f"Pinned {len(revision_ids)} revisions in {LOCK_PATH.name}; commit it")
+
+    print(f"Wrote {CORPUS_PATH.name} ({len(corpus)} bytes, sha256 {sha256})")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
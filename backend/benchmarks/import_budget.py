@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+# Import-time profile of the worker with a budget: exits 1 when importing the app gets slower than
+# total_ms (median of --runs fresh interpreters) or when a module listed as deferred is imported at startup.
+# Run from the repository root: python -m backend.benchmarks.import_budget [--update]
+
+DEFAULT_BUDGET = Path(__file__).parent / "fixtures" / "import_budget.json"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Importing the app must not need real credentials, only well-formed settings
+PLACEHOLDER_ENV = {
+    "RDS_USER": "bench",
+    "RDS_PASS": "bench",
+    "RDS_HOST": "127.0.0.1",
+    "RDS_PORT": "5432",
+    "RDS_NAME": "bench",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+}
+
+# One "import time: self | cumulative | name" line per module, children indented two spaces under their parent
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    modules = []
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+
+        if not self_us.strip().isdigit():
+            continue
+
+        # Drop the single separator space so top-level imports are the unindented names
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+
+    return modules
+
+def profile_import(module: str) -> list[tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env={**PLACEHOLDER_ENV, **os.environ},
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    return parse_importtime(result.stderr)
+
+def top_level_packages(modules: list[tuple[str, int, int]]) -> dict[str, int]:
+    cumulative_by_package: dict[str, int] = {}
+    ancestors: list[str] = []
+
+    # importtime prints children before their parent, so walk bottom-up to see each parent first
+    for name, _, cumulative_us in reversed(modules):
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        package = name.strip().split(".")[0]
+        del ancestors[depth:]
+
+        # A package is charged once, where it is first entered from a different package;
+        # its own submodules are already inside that cumulative time
+        if package not in ancestors:
+            cumulative_by_package[package] = cumulative_by_package.get(package, 0) + cumulative_us
+
+        ancestors.append(package)
+
+    return cumulative_by_package
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the worker's import time against a budget")
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--update", action="store_true", help="Rewrite total_ms as 1.25x the measured median")
+    args = parser.parse_args()
+
+    budget = json.loads(args.budget.read_text())
+    module = budget["module"]
+
+    runs = [profile_import(module) for _ in range(args.runs)]
+    totals_ms = [sum(cumulative_us for name, _, cumulative_us in run if not name.startswith(" ")) / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+
+    # Report the run closest to the median so the breakdown matches the headline number
+    typical_run = runs[min(range(len(runs)), key=lambda i: abs(totals_ms[i] - median_ms))]
+    imported = {name.strip() for name, _, _ in typical_run}
+
+    report = {
+        "module": module,
+        "median_ms": round(median_ms, 1),
+        "runs_ms": [round(total, 1) for total in totals_ms],
+        "budget_ms": budget["total_ms"],
+        "top_packages_ms": {
+            package: round(cumulative_us / 1000, 1)
+            for package, cumulative_us in sorted(top_level_packages(typical_run).items(), key=lambda item: item[1], reverse=True)[:args.top]
+        },
+        "deferred_imported": sorted(
+            name for name in budget.get("deferred", [])
+            if name in imported or any(imported_name.startswith(f"{name}.") for imported_name in imported)
+        ),
+    }
+
+    print(json.dumps(report, indent=2))
+
+    if args.update:
+        budget["total_ms"] = round(median_ms * 1.25)
+        args.budget.write_text(json.dumps(budget, indent=2) + "\n")
+        return 0
+
+    failures = []
+
+    if median_ms > budget["total_ms"]:
+        failures.append(f"import of {module} took {median_ms:.0f}ms, budget is {budget['total_ms']}ms")
+
+    if report["deferred_imported"]:
+        failures.append(f"deferred modules imported at startup: {', '.join(report['deferred_imported'])}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from .rerank_eval import percentile
+
+# Open-loop load generator and saturation report for one API worker.
+#
+# 1. Sample an anonymized query stream from UserSearchHistory (or use the committed synthetic one):
+#      python -m backend.benchmarks.loadgen sample --out queries.jsonl
+# 2. Start the mock upstream, then the API with the printed base URLs exported:
+#      python -m backend.benchmarks.mock_upstream --profile typical
+# 3. Step through arrival rates until p99 or the error rate breaks:
+#      python -m backend.benchmarks.loadgen run --base-url http://127.0.0.1:8000 --rates 5,10,20,40,80
+#
+# Arrivals are Poisson and scheduled up front; latency is measured from the scheduled time, so a
+# saturated server shows up as queueing delay instead of silently lowering the offered load.
+
+DEFAULT_QUERY_LOG = Path(__file__).parent / "fixtures" / "query_log.jsonl"
+STAGE_METRIC = "huggypanda_stage_duration_seconds"
+
+# Queries that could identify someone are dropped rather than rewritten
+PII_PATTERNS = [
+    re.compile(r"\S+@\S+\.\S+"),
+    re.compile(r"https?://\S+|www\.\S+"),
+    re.compile(r"\d{5,}"),
+    re.compile(r"\d{3}[\s.-]\d{3,4}[\s.-]\d{4}"),
+]
+
+def anonymize_query(query: str) -> Optional[str]:
+    from ..infrastructure.semantic_cache import normalize_query
+
+    if any(pattern.search(query) for pattern in PII_PATTERNS):
+        return None
+
+    return normalize_query(query) or None
+
+def sample_query_log(out: Path, min_users: int, limit: int) -> int:
+    from sqlalchemy import select, func, distinct
+    from ..infrastructure.db import engine, UserSearchHistory
+
+    # k-anonymity: only queries issued by at least min_users distinct users, and no user ids leave the database
+    statement = (
+        select(UserSearchHistory.query, func.count().label("weight"))
+        .group_by(UserSearchHistory.query)
+        .having(func.count(distinct(UserSearchHistory.user_id)) >= min_users)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+
+    weights: dict[str, int] = {}
+
+    with engine.connect() as conn:
+        for query, weight in conn.execute(statement):
+            anonymized_query = anonymize_query(query)
+
+            if anonymized_query:
+                weights[anonymized_query] = weights.get(anonymized_query, 0) + weight
+
+    with out.open("w") as file:
+        for query, weight in sorted(weights.items(), key=lambda item: item[1], reverse=True):
+            file.write(json.dumps({"query": query, "weight": weight}) + "\n")
+
+    return len(weights)
+
+def load_query_log(path: Path) -> tuple[list[str], list[int]]:
+    records = [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+    return [record["query"] for record in records], [record["weight"] for record in records]
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+
+    unknown = set(weights) - {"search", "suggest", "session"}
+
+    if unknown:
+        raise ValueError(f"Unknown request types in --mix: {sorted(unknown)}")
+
+    return weights
+
+# Cumulative bucket counts per stage from the /metrics text
+def scrape_stage_buckets(metrics_text: str) -> dict[str, dict[float, float]]:
+    buckets: dict[str, dict[float, float]] = {}
+
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != STAGE_METRIC:
+            continue
+
+        for sample in family.samples:
+            if not sample.name.endswith("_bucket"):
+                continue
+
+            stage_buckets = buckets.setdefault(sample.labels["stage"], {})
+            upper_bound = float(sample.labels["le"])
+            stage_buckets[upper_bound] = stage_buckets.get(upper_bound, 0.0) + sample.value
+
+    return buckets
+
+# Same linear interpolation as PromQL histogram_quantile, applied to the delta between two scrapes
+def histogram_quantile(quantile: float, buckets: dict[float, float]) -> Optional[float]:
+    ordered = sorted(buckets.items())
+
+    if not ordered or ordered[-1][1] <= 0:
+        return None
+
+    rank = quantile * ordered[-1][1]
+    previous_bound, previous_count = 0.0, 0.0
+
+    for upper_bound, count in ordered:
+        if count >= rank:
+            if upper_bound == float("inf"):
+                return previous_bound
+
+            fraction = (rank - previous_count) / (count - previous_count) if count > previous_count else 1.0
+            return previous_bound + (upper_bound - previous_bound) * fraction
+
+        previous_bound, previous_count = upper_bound, count
+
+    return previous_bound
+
+def stage_percentiles(before: dict, after: dict) -> dict[str, dict[str, float]]:
+    stages = {}
+
+    for stage, after_buckets in after.items():
+        before_buckets = before.get(stage, {})
+        delta = {bound: count - before_buckets.get(bound, 0.0) for bound, count in after_buckets.items()}
+        total = max(delta.values(), default=0.0)
+
+        if total <= 0:
+            continue
+
+        stages[stage] = {
+            "count": int(total),
+            **{
+                f"p{int(quantile * 100)}_ms": round(histogram_quantile(quantile, delta) * 1000, 2)
+                for quantile in (0.5, 0.95, 0.99)
+            },
+        }
+
+    return stages
+
+class LoadGenerator:
+    def __init__(
+        self,
+        base_url: str,
+        queries: list[str],
+        weights: list[int],
+        mix: dict[str, float],
+        num_sessions: int,
+        logged_in_fraction: float,
+        logged_in_user_ids: list[int],
+        timeout: float,
+        seed: int,
+    ):
+        self.base_url = base_url
+        self.queries = queries
+        self.weights = weights
+        self.mix = mix
+        self.num_sessions = num_sessions
+        self.logged_in_fraction = logged_in_fraction
+        self.logged_in_user_ids = logged_in_user_ids
+        self.timeout = timeout
+
+        self.rng = random.Random(seed)
+        self.session_keys: list[str] = []
+
+    async def create_sessions(self, client: httpx.AsyncClient) -> None:
+        for _ in range(self.num_sessions):
+            res = await client.post("/session")
+            res.raise_for_status()
+            self.session_keys.append(res.json()["session_key"])
+
+        num_logged_in = int(len(self.session_keys) * self.logged_in_fraction)
+
+        if not num_logged_in:
+            return
+
+        if not self.logged_in_user_ids:
+            raise ValueError("--logged-in-fraction needs --logged-in-user-ids of existing users")
+
+        # There is no password-free login route, so logged-in sessions are attached to users directly in Redis
+        from ..infrastructure.sessions import RedisSession
+
+        redis_session = RedisSession()
+
+        for i, session_key in enumerate(self.session_keys[:num_logged_in]):
+            redis_session.modify_session(session_key, updated_user_id=self.logged_in_user_ids[i % len(self.logged_in_user_ids)])
+
+    def _next_request(self) -> tuple[str, str, str, dict]:
+        request_type = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        session_key = self.rng.choice(self.session_keys)
+        query = self.rng.choices(self.queries, weights=self.weights)[0]
+
+        if request_type == "search":
+            return request_type, "GET", "/search", {"query": query, "session_key": session_key}
+
+        if request_type == "suggest":
+            # A keystroke prefix of a real query, at least two characters long
+            return request_type, "GET", "/search/suggest", {"query": query[:self.rng.randint(min(2, len(query)), len(query))]}
+
+        return request_type, "POST", "/session", {"session_key": session_key}
+
+    async def _send(self, client: httpx.AsyncClient, scheduled_at: float, request: tuple, results: list) -> None:
+        request_type, method, path, params = request
+
+        await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+
+        try:
+            res = await client.request(method, path, params=params)
+            ok = res.status_code < 500 and res.status_code != 429
+
+        except httpx.HTTPError:
+            ok = False
+
+        results.append((request_type, time.perf_counter() - scheduled_at, ok))
+
+    async def run_step(self, client: httpx.AsyncClient, rate: float, duration: float) -> dict:
+        arrivals = []
+        elapsed = self.rng.expovariate(rate)
+
+        while elapsed < duration:
+            arrivals.append(elapsed)
+            elapsed += self.rng.expovariate(rate)
+
+        results: list[tuple[str, float, bool]] = []
+        start = time.perf_counter() + 0.1
+
+        await asyncio.gather(*(
+            self._send(client, start + arrival, self._next_request(), results)
+            for arrival in arrivals
+        ))
+
+        wall_time = time.perf_counter() - start
+        endpoints = {}
+
+        for request_type in sorted({result[0] for result in results}):
+            latencies_ms = [latency * 1000 for name, latency, _ in results if name == request_type]
+            errors = sum(1 for name, _, ok in results if name == request_type and not ok)
+
+            endpoints[request_type] = {
+                "requests": len(latencies_ms),
+                "error_rate": round(errors / len(latencies_ms), 4),
+                "p50_ms": round(percentile(latencies_ms, 50), 2),
+                "p95_ms": round(percentile(latencies_ms, 95), 2),
+                "p99_ms": round(percentile(latencies_ms, 99), 2),
+            }
+
+        all_latencies_ms = [latency * 1000 for _, latency, _ in results]
+
+        return {
+            "offered_rps": rate,
+            "achieved_rps": round(len(results) / wall_time, 2) if wall_time > 0 else 0.0,
+            "requests": len(results),
+            "error_rate": round(sum(1 for *_, ok in results if not ok) / len(results), 4) if results else 0.0,
+            "p99_ms": round(percentile(all_latencies_ms, 99), 2) if all_latencies_ms else 0.0,
+            "endpoints": endpoints,
+        }
+
+    async def run(
+        self,
+        rates: list[float],
+        duration: float,
+        p99_slo_ms: float,
+        max_error_rate: float,
+        saturation_factor: float,
+    ) -> dict:
+
+        limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            await self.create_sessions(client)
+
+            steps = []
+            baseline_stages: dict[str, dict] = {}
+            baseline_p99_ms = 0.0
+            saturated_stage = None
+
+            for rate in rates:
+                before = scrape_stage_buckets((await client.get("/metrics")).text)
+                step = await self.run_step(client, rate, duration)
+                after = scrape_stage_buckets((await client.get("/metrics")).text)
+
+                step["stages"] = stage_percentiles(before, after)
+                steps.append(step)
+
+                if not baseline_stages:
+                    baseline_stages = step["stages"]
+
+                if not baseline_p99_ms:
+                    baseline_p99_ms = step["p99_ms"]
+
+                # The first stage whose p99 grows past saturation_factor x its lowest-rate p99 is where queueing starts.
+                # Per-route "http ..." stages contain every inner stage, so they only count when no inner stage moved.
+                if saturated_stage is None:
+                    growth = {
+                        stage: stats["p99_ms"] / baseline_stages[stage]["p99_ms"]
+                        for stage, stats in step["stages"].items()
+                        if not stage.startswith("http ") and stage in baseline_stages and baseline_stages[stage]["p99_ms"] > 0
+                    }
+                    worst_stage = max(growth, key=growth.get, default=None)
+
+                    if worst_stage is not None and growth[worst_stage] >= saturation_factor:
+                        saturated_stage = {"stage": worst_stage, "offered_rps": rate, "p99_growth": round(growth[worst_stage], 2)}
+
+                    elif baseline_p99_ms and step["p99_ms"] / baseline_p99_ms >= saturation_factor:
+                        saturated_stage = {
+                            "stage": "worker (queueing outside any traced stage)",
+                            "offered_rps": rate,
+                            "p99_growth": round(step["p99_ms"] / baseline_p99_ms, 2),
+                        }
+
+                print(json.dumps({key: step[key] for key in ("offered_rps", "achieved_rps", "error_rate", "p99_ms")}))
+
+                if step["p99_ms"] > p99_slo_ms or step["error_rate"] > max_error_rate:
+                    break
+
+        sustainable = [
+            step["offered_rps"]
+            for step in steps
+            if step["p99_ms"] <= p99_slo_ms and step["error_rate"] <= max_error_rate
+        ]
+
+        return {
+            "p99_slo_ms": p99_slo_ms,
+            "max_error_rate": max_error_rate,
+            "max_sustainable_rps": max(sustainable, default=0.0),
+            "first_saturated_stage": saturated_stage,
+            "steps": steps,
+        }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load generator and saturation report")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sample_parser = subparsers.add_parser("sample", help="Export an anonymized query stream from UserSearchHistory")
+    sample_parser.add_argument("--out", type=Path, required=True)
+    sample_parser.add_argument("--min-users", type=int, default=3, help="Keep queries issued by at least this many users")
+    sample_parser.add_argument("--limit", type=int, default=5000)
+
+    run_parser = subparsers.add_parser("run", help="Step through arrival rates against a running API")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--queries", type=Path, default=DEFAULT_QUERY_LOG)
+    run_parser.add_argument("--rates", default="5,10,20,40,80,160", help="Comma-separated requests per second")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Seconds per rate step")
+    run_parser.add_argument("--mix", default="search=0.35,suggest=0.55,session=0.10")
+    run_parser.add_argument("--sessions", type=int, default=200)
+    run_parser.add_argument("--logged-in-fraction", type=float, default=0.0)
+    run_parser.add_argument("--logged-in-user-ids", default="", help="Comma-separated ids of existing users")
+    run_parser.add_argument("--p99-slo-ms", type=float, default=1500.0)
+    run_parser.add_argument("--max-error-rate", type=float, default=0.01)
+    run_parser.add_argument("--saturation-factor", type=float, default=2.0)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--seed", type=int, default=1234)
+    run_parser.add_argument("--json", type=Path, default=None, help="Write the report to this file")
+
+    args = parser.parse_args()
+
+    if args.command == "sample":
+        print(f"Wrote {sample_query_log(args.out, args.min_users, args.limit)} queries to {args.out}")
+        return 0
+
+    queries, weights = load_query_log(args.queries)
+
+    load_generator = LoadGenerator(
+        base_url=args.base_url,
+        queries=queries,
+        weights=weights,
+        mix=parse_mix(args.mix),
+        num_sessions=args.sessions,
+        logged_in_fraction=args.logged_in_fraction,
+        logged_in_user_ids=[int(user_id) for user_id in args.logged_in_user_ids.split(",") if user_id],
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+
+    report = asyncio.run(load_generator.run(
+        rates=[float(rate) for rate in args.rates.split(",")],
+        duration=args.duration,
+        p99_slo_ms=args.p99_slo_ms,
+        max_error_rate=args.max_error_rate,
+        saturation_factor=args.saturation_factor,
+    ))
+
+    print(json.dumps({key: report[key] for key in ("max_sustainable_rps", "first_saturated_stage")}, indent=2))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
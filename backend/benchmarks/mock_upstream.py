@@ -0,0 +1,261 @@
+import re
+import sys
+import json
+import math
+import zlib
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+# Local stand-in for every upstream the search path calls. Responses are replayed from
+# fixtures/providers/<provider>.json; each provider gets its own latency and error distribution.
+# Run from the repository root: python -m backend.benchmarks.mock_upstream --profile typical
+# and export the printed base URLs before starting the API.
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+PROVIDERS_DIR = FIXTURES_DIR / "providers"
+LATENCY_PROFILES_PATH = FIXTURES_DIR / "latency_profiles.json"
+
+# provider -> (environment variable read by the service, path prefix served here)
+BASE_URL_ENV = {
+    "brave": "BRAVE_API_BASE_URL",
+    "wikipedia": "WIKIPEDIA_BASE_URL",
+    "tripadvisor": "TRIPADVISOR_API_BASE_URL",
+    "tmdb": "TMDB_API_BASE_URL",
+    "openai": "OAI_BASE_URL",
+}
+
+EMBEDDING_DIM = 1536
+
+# z-score of the 99th percentile of a standard normal
+Z_P99 = 2.326
+
+class LatencyModel:
+    def __init__(
+        self,
+        median_ms: float = 0.0,
+        p99_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: tuple[int, ...] = (503,),
+        seed: Optional[int] = None,
+    ):
+        # Log-normal fitted to the median and p99, which is how upstream latency is usually reported
+        self.mu = math.log(median_ms / 1000) if median_ms > 0 else None
+        self.sigma = math.log(p99_ms / median_ms) / Z_P99 if median_ms > 0 and p99_ms > median_ms else 0.0
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: dict, seed: Optional[int] = None) -> "LatencyModel":
+        return cls(
+            median_ms=data.get("median_ms", 0.0),
+            p99_ms=data.get("p99_ms", 0.0),
+            error_rate=data.get("error_rate", 0.0),
+            error_statuses=tuple(data.get("error_statuses", (503,))),
+            seed=seed,
+        )
+
+    def sample(self) -> tuple[float, Optional[int]]:
+        with self._lock:
+            delay = self._rng.lognormvariate(self.mu, self.sigma) if self.mu is not None else 0.0
+            status = self._rng.choice(self.error_statuses) if self._rng.random() < self.error_rate else None
+
+        return delay, status
+
+def load_latency_profile(name_or_path: str) -> dict[str, dict]:
+    path = Path(name_or_path)
+
+    if path.suffix == ".json" and path.exists():
+        return json.loads(path.read_text())
+
+    profiles = json.loads(LATENCY_PROFILES_PATH.read_text())
+
+    if name_or_path not in profiles:
+        raise ValueError(f"Unknown latency profile {name_or_path!r}, expected one of {sorted(profiles)}")
+
+    return profiles[name_or_path]
+
+def load_routes(providers_dir: Path = PROVIDERS_DIR) -> dict[str, list[dict]]:
+    routes = {}
+
+    for path in sorted(providers_dir.glob("*.json")):
+        provider_routes = json.loads(path.read_text())["routes"]
+
+        for route in provider_routes:
+            route["pattern"] = re.compile(route["path"])
+
+        routes[path.stem] = provider_routes
+
+    return routes
+
+def find_route(routes: list[dict], path: str, query: dict[str, str]) -> Optional[dict]:
+    # First match wins, so fixtures list query-specific routes before the catch-all for a path
+    for route in routes:
+        if not route["pattern"].fullmatch(path):
+            continue
+
+        if all(query.get(key) == value for key, value in route.get("query", {}).items()):
+            return route
+
+    return None
+
+# Deterministic per text, so repeated queries embed identically and cache behaviour is reproducible
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list[float]:
+    vector = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+
+    return [round(float(value), 6) for value in vector]
+
+class MockUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], routes: dict[str, list[dict]], latency: dict[str, LatencyModel]):
+        super().__init__(address, MockUpstreamHandler)
+
+        self.routes = routes
+        self.latency = latency
+        self.request_counts: dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_urls(self) -> dict[str, str]:
+        return {env_var: f"{self.base_url}/{provider}" for provider, env_var in BASE_URL_ENV.items()}
+
+    def count(self, provider: str, status: int) -> None:
+        with self._counts_lock:
+            key = f"{provider}:{status}"
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockUpstreamServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, provider: str, status: int, body: bytes, content_type: str, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(provider, status)
+
+    def _send_json(self, provider: str, status: int, data: Any, headers: Optional[dict] = None) -> None:
+        self._send(provider, status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        provider, _, path = url.path.lstrip("/").partition("/")
+        path = "/" + unquote(path)
+
+        body = None
+
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+        delay, error_status = self.server.latency.get(provider, LatencyModel()).sample()
+
+        if delay:
+            time.sleep(delay)
+
+        if error_status is not None:
+            self._send_json(provider, error_status, {"error": "injected"}, {"Retry-After": "0.1"} if error_status == 429 else None)
+            return
+
+        if provider == "openai" and path == "/embeddings" and method == "POST":
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+            self._send_json(provider, 200, {
+                "object": "list",
+                "model": body.get("model", "text-embedding-3-small"),
+                "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(text)} for i, text in enumerate(inputs)],
+                "usage": {"prompt_tokens": sum(len(text) // 4 + 1 for text in inputs), "total_tokens": sum(len(text) // 4 + 1 for text in inputs)},
+            })
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = find_route(self.server.routes.get(provider, []), path, query)
+
+        if route is None:
+            self._send_json(provider, 404, {"error": f"no fixture for {provider} {path}"})
+            return
+
+        if "body" in route:
+            self._send_json(provider, route.get("status", 200), route["body"])
+
+        else:
+            self._send(
+                provider,
+                route.get("status", 200),
+                route.get("text", "").encode("utf-8"),
+                route.get("content_type", "text/plain; charset=utf-8"),
+            )
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+def start_mock_upstream(
+    latency_profile: Optional[dict[str, dict]] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    seed: Optional[int] = None,
+) -> MockUpstreamServer:
+
+    latency = {
+        provider: LatencyModel.from_dict(settings, seed=None if seed is None else seed + i)
+        for i, (provider, settings) in enumerate((latency_profile or {}).items())
+    }
+
+    server = MockUpstreamServer((host, port), load_routes(), latency)
+    threading.Thread(target=server.serve_forever, name="mock-upstream", daemon=True).start()
+
+    return server
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded provider responses with configurable latency and errors")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", default="typical", help="Name in fixtures/latency_profiles.json or a path to a JSON profile")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = start_mock_upstream(load_latency_profile(args.profile), args.host, args.port, args.seed)
+
+    for env_var, base_url in server.base_urls().items():
+        print(f"export {env_var}={base_url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+
+    except KeyboardInterrupt:
+        print(json.dumps(server.request_counts, indent=2, sort_keys=True))
+        server.shutdown()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
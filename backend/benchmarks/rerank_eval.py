@@ -0,0 +1,99 @@
+import sys
+import json
+import math
+import time
+import argparse
+from pathlib import Path
+
+from ..services.reranker import Reranker
+from ..infrastructure.rank_profiles import UserRankProfile
+
+# Offline evaluation of the personalized re-ranker over recorded result sets.
+# Each JSONL record: {"history": [queries], "query": str,
+#                     "results": [web_results items], "relevant_urls": [urls]}
+# Run from the repository root: python -m backend.benchmarks.rerank_eval [--path file.jsonl]
+
+DEFAULT_FIXTURE = Path(__file__).parent / "fixtures" / "rerank_sessions.jsonl"
+
+def reciprocal_rank(results: list[dict], relevant_urls: set[str]) -> float:
+    for rank, result in enumerate(results, start=1):
+        if result["url"] in relevant_urls:
+            return 1.0 / rank
+
+    return 0.0
+
+def ndcg_at_k(results: list[dict], relevant_urls: set[str], k: int = 10) -> float:
+    dcg = sum(
+        1.0 / math.log2(rank + 1)
+        for rank, result in enumerate(results[:k], start=1)
+        if result["url"] in relevant_urls
+    )
+    ideal_dcg = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant_urls), k) + 1))
+
+    return dcg / ideal_dcg if ideal_dcg else 0.0
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def evaluate(records: list[dict], reranker: Reranker, repeat: int) -> dict:
+    baseline_mrr, reranked_mrr, baseline_ndcg, reranked_ndcg = [], [], [], []
+    latencies_us = []
+
+    for record in records:
+        profile = UserRankProfile()
+
+        for query in record.get("history", []):
+            profile.update(query)
+
+        relevant_urls = set(record["relevant_urls"])
+        reranked = reranker.rerank(record["results"], profile)
+
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            reranker.rerank(record["results"], profile)
+            latencies_us.append((time.perf_counter_ns() - start) / 1000)
+
+        baseline_mrr.append(reciprocal_rank(record["results"], relevant_urls))
+        reranked_mrr.append(reciprocal_rank(reranked, relevant_urls))
+        baseline_ndcg.append(ndcg_at_k(record["results"], relevant_urls))
+        reranked_ndcg.append(ndcg_at_k(reranked, relevant_urls))
+
+    budget_us = reranker.budget_ns / 1000
+
+    return {
+        "records": len(records),
+        "mrr": {"baseline": sum(baseline_mrr) / len(records), "reranked": sum(reranked_mrr) / len(records)},
+        "ndcg@10": {"baseline": sum(baseline_ndcg) / len(records), "reranked": sum(reranked_ndcg) / len(records)},
+        "latency_us": {
+            "p50": percentile(latencies_us, 50),
+            "p95": percentile(latencies_us, 95),
+            "p99": percentile(latencies_us, 99),
+            "max": max(latencies_us),
+        },
+        "budget_us": budget_us,
+        "over_budget_calls": sum(1 for latency in latencies_us if latency > budget_us),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline evaluation of the personalized re-ranker")
+    parser.add_argument("--path", type=Path, default=DEFAULT_FIXTURE)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--budget-us", type=int, default=None)
+    args = parser.parse_args()
+
+    records = [json.loads(line) for line in args.path.read_text().splitlines() if line.strip()]
+
+    if not records:
+        print(f"No records in {args.path}")
+        return 1
+
+    reranker = Reranker(budget_us=args.budget_us) if args.budget_us else Reranker()
+    report = evaluate(records, reranker, args.repeat)
+
+    print(json.dumps(report, indent=2))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,77 @@
 import os
-from typing import Final
+import threading
+from typing import Final, TYPE_CHECKING
 
-import boto3
 from dotenv import load_dotenv
-from pinecone.grpc import PineconeGRPC as Pinecone
-from pinecone import ServerlessSpec
+
+# boto3 and the Pinecone gRPC client are slow to import, so they load inside the getters below
+if TYPE_CHECKING:
+    import boto3
+    from pinecone.grpc import PineconeGRPC as Pinecone
 
 load_dotenv()
 env = os.getenv
 
-# S3
-S3_CLIENT: Final[boto3.client] = boto3.client(
-    "s3",
-    aws_access_key_id=env("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=env("AWS_SECRET_ACCESS_KEY"),
-    region_name=env("AWS_REGION")
-)
+# Importing this module is free of network calls and heavy imports; the clients below are created on
+# first use (or eagerly by the FastAPI lifespan in main.py) and shared by the whole process.
 
+# S3
 BUCKET_NAME: Final[str] = env("S3_BUCKET_NAME")
 
 # Pinecone
-PC: Final[Pinecone] = Pinecone(api_key=env("PINECONE_API_KEY"))
 PC_INDEX_NAME: Final[str] = env("PINECONE_INDEX_NAME")
 
-if not PC.has_index(PC_INDEX_NAME):
-    PC.create_index(
-        name=PC_INDEX_NAME,
-        dimension=1536,
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region=env("PINECONE_INDEX_REGION")
-        ),
-        deletion_protection="disabled",
-        tags={"project": "huggypanda-rag-search"}
-    )
-
-PC_INDEX: Final[Pinecone.Index] = PC.Index(PC_INDEX_NAME)
+_s3_client: "boto3.client" = None
+_pinecone_index: "Pinecone.Index" = None
+_lock = threading.Lock()
+
+def get_s3_client() -> "boto3.client":
+    global _s3_client
+
+    if _s3_client is None:
+        with _lock:
+            if _s3_client is None:
+                import boto3
+
+                _s3_client = boto3.client(
+                    "s3",
+                    aws_access_key_id=env("AWS_ACCESS_KEY_ID"),
+                    aws_secret_access_key=env("AWS_SECRET_ACCESS_KEY"),
+                    region_name=env("AWS_REGION")
+                )
+
+    return _s3_client
+
+def get_pinecone_index() -> "Pinecone.Index":
+    global _pinecone_index
+
+    if _pinecone_index is None:
+        with _lock:
+            if _pinecone_index is None:
+                from pinecone import ServerlessSpec
+                from pinecone.grpc import PineconeGRPC as Pinecone
+
+                pc = Pinecone(api_key=env("PINECONE_API_KEY"))
+
+                if not pc.has_index(PC_INDEX_NAME):
+                    pc.create_index(
+                        name=PC_INDEX_NAME,
+                        dimension=1536,
+                        metric="cosine",
+                        spec=ServerlessSpec(
+                            cloud="aws",
+                            region=env("PINECONE_INDEX_REGION")
+                        ),
+                        deletion_protection="disabled",
+                        tags={"project": "huggypanda-rag-search"}
+                    )
+
+                _pinecone_index = pc.Index(PC_INDEX_NAME)
+
+    return _pinecone_index
+
+def check_s3() -> None:
+    get_s3_client().head_bucket(Bucket=BUCKET_NAME)
+
+def check_pinecone() -> None:
+    get_pinecone_index().describe_index_stats()
@@ -0,0 +1,313 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from dotenv import load_dotenv
+
+from .user_cache import UserCache
+from .passwords import password_hasher, PasswordHasherOverloaded
+from .telemetry import instrument_engine
+from .db import (
+    Base,
+    UserPreferences,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_QUERY_CACHE_SIZE,
+    HISTORY_PAGE_SIZE,
+    search_history_buffer,
+    select_user,
+    select_user_by_username_or_email,
+    select_user_profile,
+    select_user_preference,
+    new_user,
+    apply_user_update,
+    apply_user_preference_update,
+    new_search_history_row,
+    clamp_history_limit,
+    select_search_history_page,
+    serialize_search_history_page,
+    serialize_user_profile,
+    delete_search_history,
+    is_search_history_row_of,
+)
+
+load_dotenv()
+env = os.getenv
+
+DB_STATEMENT_CACHE_SIZE = int(env("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# prepared_statement_cache_size is asyncpg's per-connection cache of server-side prepared statements
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{env('RDS_USER')}:{env('RDS_PASS')}@{env('RDS_HOST')}:{env('RDS_PORT')}/{env('RDS_NAME')}"
+    f"?prepared_statement_cache_size={DB_STATEMENT_CACHE_SIZE}"
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
+instrument_engine(async_engine.sync_engine)
+
+class AsyncDatabase:
+    def __init__(self):
+        # expire_on_commit=False so attributes can be read after commit without an implicit (awaitable) refresh
+        self.SessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+        self.user_cache = UserCache()
+
+    async def init_models(self) -> None:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def dispose(self) -> None:
+        await async_engine.dispose()
+
+    # User table
+    async def create_user(
+            self,
+            username: str,
+            email: str,
+            provider: str,
+            provider_id: str,
+            password: Optional[str] = None,
+        ) -> int | bool:
+
+        async with self.SessionLocal() as db:
+            try:
+                password_hash = await password_hasher.hash_async(password) if password else None
+                db_user = new_user(username, email, provider, provider_id, password_hash)
+
+                db.add(db_user)
+                await db.commit()
+
+                return db_user.id
+
+            except PasswordHasherOverloaded:
+                await db.rollback()
+                raise
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    async def read_user_profile(self, user_id: int) -> dict | bool:
+        cached_profile = await self.user_cache.get_profile_async(user_id)
+
+        if cached_profile:
+            return cached_profile
+
+        async with self.SessionLocal() as db:
+            try:
+                db_user_profile = (await db.execute(select_user_profile(user_id))).first()
+
+                if not db_user_profile:
+                    return False
+
+                profile = serialize_user_profile(*db_user_profile)
+                await self.user_cache.set_profile_async(user_id, profile)
+
+                return profile
+
+            except Exception:
+                return False
+
+    async def read_user(self, user_id: int) -> dict[str, str | int] | bool:
+        profile = await self.read_user_profile(user_id)
+
+        return profile["user"] if profile else False
+
+    async def update_user(
+            self,
+            user_id: int,
+            username: Optional[str] = None,
+            password: Optional[str] = None,
+            email: Optional[str] = None,
+            last_login_at: Optional[datetime] = None,
+            s3_pfp_url: Optional[str] = None
+        ) -> bool:
+
+        async with self.SessionLocal() as db:
+            try:
+                db_user = (await db.execute(select_user(user_id))).scalars().first()
+
+                if not db_user:
+                    return False
+
+                password_hash = await password_hasher.hash_async(password) if password else None
+                apply_user_update(db_user, username, password_hash, email, last_login_at, s3_pfp_url)
+
+                await db.commit()
+                await self.user_cache.invalidate_async(user_id)
+
+                return True
+
+            except PasswordHasherOverloaded:
+                await db.rollback()
+                raise
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    async def delete_user(self, user_id: int) -> bool:
+        async with self.SessionLocal() as db:
+            try:
+                db_user = (await db.execute(select_user(user_id))).scalars().first()
+
+                if not db_user:
+                    return False
+
+                await db.delete(db_user)
+                await db.commit()
+                await self.user_cache.invalidate_async(user_id)
+
+                return True
+
+            except Exception:
+                await db.rollback()
+                return False
+
+
+    # UserPreferences table
+    async def create_user_preference(self, user_id: int) -> bool:
+        async with self.SessionLocal() as db:
+            try:
+                db.add(UserPreferences(user_id=user_id))
+                await db.commit()
+                await self.user_cache.invalidate_async(user_id)
+
+                return True
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    async def read_user_preference(self, user_id: int) -> dict[str, str] | bool:
+        profile = await self.read_user_profile(user_id)
+
+        if not profile or not profile["preferences"]:
+            return False
+
+        return profile["preferences"]
+
+    async def update_user_preference(
+            self,
+            user_id: int,
+            theme: Optional[str] = None,
+            safesearch: Optional[str] = None
+        ) -> bool:
+
+        async with self.SessionLocal() as db:
+            try:
+                db_user_preference = (await db.execute(select_user_preference(user_id))).scalars().first()
+
+                if not db_user_preference:
+                    return False
+
+                apply_user_preference_update(db_user_preference, theme, safesearch)
+
+                await db.commit()
+                await self.user_cache.invalidate_async(user_id)
+
+                return True
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    # Authentication (Local accounts only; Google and GitHub accounts are handled by OAuth)
+    async def check_login_credentials(self, username_or_email: str, password: str) -> bool:
+        async with self.SessionLocal() as db:
+            try:
+                db_user = (await db.execute(select_user_by_username_or_email(username_or_email))).scalars().first()
+
+                if not db_user or not db_user.password:
+                    return False
+
+                if not await password_hasher.verify_async(password, db_user.password):
+                    return False
+
+                if password_hasher.needs_rehash(db_user.password):
+                    try:
+                        db_user.password = await password_hasher.hash_async(password)
+                        await db.commit()
+
+                    except Exception:
+                        await db.rollback()
+
+                return True
+
+            # A full hasher queue is not a wrong password; the app answers it with a 503 and Retry-After
+            except PasswordHasherOverloaded:
+                await db.rollback()
+                raise
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    async def login_after_successful_2fa(self, username_or_email: str) -> int | bool:
+        async with self.SessionLocal() as db:
+            try:
+                db_user = (await db.execute(select_user_by_username_or_email(username_or_email))).scalars().first()
+
+                db_user.last_login_at = datetime.now()
+
+                await db.commit()
+                await self.user_cache.invalidate_async(db_user.id)
+
+                return db_user.id
+
+            except Exception:
+                await db.rollback()
+                return False
+
+    # UserSearchHistory table
+    async def log_user_search(self, user_id: int, query: str) -> bool:
+        # Same write-behind buffer as Database; appending never touches the network
+        return search_history_buffer.add(new_search_history_row(user_id, query))
+
+    async def read_user_search_history(
+            self,
+            user_id: int,
+            limit: int = HISTORY_PAGE_SIZE,
+            cursor: Optional[str] = None
+        ) -> dict[str, list[dict[str, str]] | str] | bool:
+
+        async with self.SessionLocal() as db:
+            try:
+                limit = clamp_history_limit(limit)
+                db_user_search_history = (await db.execute(select_search_history_page(user_id, limit, cursor))).all()
+
+                return serialize_search_history_page(db_user_search_history, limit)
+
+            except Exception:
+                return False
+
+    async def delete_user_search_history(self, user_id: int) -> bool:
+        # discard() may wait on an in-flight flush, so keep it off the event loop
+        await asyncio.to_thread(search_history_buffer.discard, is_search_history_row_of(user_id))
+
+        async with self.SessionLocal() as db:
+            try:
+                deleted_count = (await db.execute(delete_search_history(user_id))).rowcount
+
+                if not deleted_count:
+                    await db.rollback()
+                    return False
+
+                await db.commit()
+
+                return True
+
+            except Exception:
+                await db.rollback()
+                return False
@@ -1,19 +1,46 @@
 import os
+import base64
+import logging
 from datetime import datetime
 
-import bcrypt
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import create_engine, text, select, insert, delete, tuple_, or_, Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 from typing import Optional
 
+from .write_behind import WriteBehindBuffer
+from .user_cache import UserCache
+from .passwords import password_hasher, PasswordHasherOverloaded
+from .rank_profiles import rank_profile_store
+from .telemetry import instrument_engine
+
 load_dotenv()
 env = os.getenv
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = f"postgresql+psycopg2://{env('RDS_USER')}:{env('RDS_PASS')}@{env('RDS_HOST')}:{env('RDS_PORT')}/{env('RDS_NAME')}"
 
-engine = create_engine(DATABASE_URL)
+# Pool settings are shared with the async engine in async_db.py
+DB_POOL_SIZE = int(env("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(env("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(env("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(env("DB_POOL_RECYCLE", "1800"))
+DB_QUERY_CACHE_SIZE = int(env("DB_QUERY_CACHE_SIZE", "500"))
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
+instrument_engine(engine)
+
 Base = declarative_base()
 
 class User(Base):
@@ -48,9 +75,213 @@ class UserSearchHistory(Base):
     query = Column(String, nullable=False)
     queried_at = Column(DateTime, default=datetime.now(), nullable=False)
 
+    # Serves both the per-user history page (keyset on queried_at, id) and the bulk delete by user_id
+    __table_args__ = (
+        Index("ix_user_search_history_user_id_queried_at", user_id, queried_at.desc(), id.desc()),
+    )
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+def encode_history_cursor(queried_at: datetime, record_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{queried_at.isoformat()}|{record_id}".encode("utf-8")).decode("utf-8")
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    queried_at, record_id = base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8").split("|")
+    return datetime.fromisoformat(queried_at), int(record_id)
+
+SEARCH_LOG_FLUSH_ROWS = int(env("SEARCH_LOG_FLUSH_ROWS", "200"))
+SEARCH_LOG_FLUSH_MS = int(env("SEARCH_LOG_FLUSH_MS", "500"))
+SEARCH_LOG_MAX_ATTEMPTS = int(env("SEARCH_LOG_MAX_ATTEMPTS", "5"))
+
+_SearchLogSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _insert_search_history_rows(rows: list[dict]) -> None:
+    db = _SearchLogSession()
+
+    try:
+        # A list of parameter dicts is sent as a single multi-row INSERT (insertmanyvalues)
+        db.execute(insert(UserSearchHistory), rows)
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+    # Re-ranking profiles are updated incrementally from the same batch. The rows are already
+    # committed, so a failure here must not propagate and cause the batch to be re-inserted.
+    try:
+        rank_profile_store.record_searches(rows)
+
+    except Exception:
+        logger.exception("Updating re-ranking profiles for %d search history rows failed", len(rows))
+
+# Connection-level failures are retried whole; anything else (e.g. an FK violation) is bisected down to the bad row
+def _is_transient_db_error(error: Exception) -> bool:
+    return (
+        isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError))
+        or (isinstance(error, DBAPIError) and error.connection_invalidated)
+    )
+
+# Shared by Database and AsyncDatabase; flushed every SEARCH_LOG_FLUSH_ROWS rows or SEARCH_LOG_FLUSH_MS, and on shutdown.
+# A row that still fails on its own after SEARCH_LOG_MAX_ATTEMPTS flushes is dropped and logged.
+search_history_buffer = WriteBehindBuffer(
+    _insert_search_history_rows,
+    max_rows=SEARCH_LOG_FLUSH_ROWS,
+    max_delay_ms=SEARCH_LOG_FLUSH_MS,
+    max_attempts=SEARCH_LOG_MAX_ATTEMPTS,
+    is_transient_error=_is_transient_db_error,
+)
+
+def serialize_user_profile(db_user: User, db_user_preference: Optional[UserPreferences]) -> dict:
+    return {
+        "user": {
+            "username": db_user.username,
+            "email": db_user.email,
+            "s3_pfp_url": db_user.s3_pfp_url,
+            "provider": db_user.provider,
+            "provider_id": db_user.provider_id,
+            "created_at": str(db_user.created_at),
+            "updated_at": str(db_user.updated_at),
+            "last_login_at": str(db_user.last_login_at),
+        },
+        "preferences": {
+            "theme": db_user_preference.theme,
+            "safesearch": db_user_preference.safesearch,
+            "updated_at": str(db_user_preference.updated_at),
+        } if db_user_preference else None,
+    }
+
+# Statement builders and result mapping shared by Database and AsyncDatabase (async_db.py); the two classes
+# only differ in how they get a session and await it
+def select_user(user_id: int):
+    return select(User).where(User.id == user_id)
+
+# Matches on username first, then email, in a single query
+def select_user_by_username_or_email(username_or_email: str):
+    return (
+        select(User)
+        .where(or_(User.username == username_or_email, User.email == username_or_email))
+        .order_by((User.username == username_or_email).desc())
+    )
+
+# users + user_preferences with one join
+def select_user_profile(user_id: int):
+    return (
+        select(User, UserPreferences)
+        .outerjoin(UserPreferences, UserPreferences.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+def select_user_preference(user_id: int):
+    return select(UserPreferences).where(UserPreferences.user_id == user_id)
+
+def new_user(username: str, email: str, provider: str, provider_id: str, password_hash: Optional[str]) -> User:
+    return User(
+        username=username,
+        password=password_hash,
+        email=email,
+        provider=provider,
+        provider_id=provider_id
+    )
+
+def apply_user_update(
+        db_user: User,
+        username: Optional[str] = None,
+        password_hash: Optional[str] = None,
+        email: Optional[str] = None,
+        last_login_at: Optional[datetime] = None,
+        s3_pfp_url: Optional[str] = None
+    ) -> None:
+
+    if username:
+        db_user.username = username
+    if password_hash:
+        db_user.password = password_hash
+    if email:
+        db_user.email = email
+    if last_login_at:
+        db_user.last_login_at = last_login_at
+    if s3_pfp_url:
+        db_user.s3_pfp_url = s3_pfp_url # If the user is changing their pfp, call storage.delete_pfp() to remove the old pfp, then get the key returned from upload_pfp and update it here
+
+def apply_user_preference_update(
+        db_user_preference: UserPreferences,
+        theme: Optional[str] = None,
+        safesearch: Optional[str] = None
+    ) -> None:
+
+    if theme:
+        db_user_preference.theme = theme
+    if safesearch:
+        db_user_preference.safesearch = safesearch
+
+def new_search_history_row(user_id: int, query: str) -> dict:
+    return {
+        "user_id": user_id,
+        "query": query,
+        "queried_at": datetime.now(),
+    }
+
+def clamp_history_limit(limit: int) -> int:
+    return max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+# One extra row tells us whether there is a next page without a COUNT
+def select_search_history_page(user_id: int, limit: int, cursor: Optional[str] = None):
+    history_query = (
+        select(UserSearchHistory.id, UserSearchHistory.query, UserSearchHistory.queried_at)
+        .where(UserSearchHistory.user_id == user_id)
+    )
+
+    if cursor:
+        history_query = history_query.where(
+            tuple_(UserSearchHistory.queried_at, UserSearchHistory.id) < tuple_(*decode_history_cursor(cursor))
+        )
+
+    return (
+        history_query
+        .order_by(UserSearchHistory.queried_at.desc(), UserSearchHistory.id.desc())
+        .limit(limit + 1)
+    )
+
+def serialize_search_history_page(rows: list, limit: int) -> dict[str, list[dict[str, str]] | str] | bool:
+    if not rows:
+        return False
+
+    page = rows[:limit]
+    last_record = page[-1]
+
+    return {
+        "history": [
+            { "query": query_record.query, "queried_at": str(query_record.queried_at) }
+            for query_record in page
+        ],
+        "next_cursor": (
+            encode_history_cursor(last_record.queried_at, last_record.id)
+            if len(rows) > limit else ""
+        ),
+    }
+
+def delete_search_history(user_id: int):
+    return delete(UserSearchHistory).where(UserSearchHistory.user_id == user_id)
+
+def is_search_history_row_of(user_id: int):
+    return lambda row: row["user_id"] == user_id
+
+def check_database() -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
 class Database:
     def __init__(self):
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.user_cache = UserCache()
+
+    # Called once from the lifespan in main.py rather than on every construction
+    def init_models(self) -> None:
         Base.metadata.create_all(bind=engine)
 
     # User table
@@ -66,16 +297,8 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            if password:
-                password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-            db_user = User(
-                username=username, 
-                password=password,
-                email=email, 
-                provider=provider, 
-                provider_id=provider_id
-            )
+            password_hash = password_hasher.hash(password) if password else None
+            db_user = new_user(username, email, provider, provider_id, password_hash)
 
             db.add(db_user)
             db.commit()
@@ -83,6 +306,10 @@ class Database:
 
             return db_user.id
 
+        except PasswordHasherOverloaded:
+            db.rollback()
+            raise
+
         except Exception:
             db.rollback()
             return False
@@ -90,31 +317,36 @@ class Database:
         finally:
             db.close()
 
-    def read_user(self, user_id: int) -> dict[str, str | int] | bool:
+    # Read-through: users + user_preferences are loaded together and cached in Redis
+    def read_user_profile(self, user_id: int) -> dict | bool:
+        cached_profile = self.user_cache.get_profile(user_id)
+
+        if cached_profile:
+            return cached_profile
+
         db = self.SessionLocal()
 
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
+            db_user_profile = db.execute(select_user_profile(user_id)).first()
 
-            if not db_user:
+            if not db_user_profile:
                 return False
 
-            return {
-                "username": db_user.username,
-                "email": db_user.email,
-                "s3_pfp_url": db_user.s3_pfp_url,
-                "provider": db_user.provider,
-                "provider_id": db_user.provider_id,
-                "created_at": str(db_user.created_at),
-                "updated_at": str(db_user.updated_at),
-                "last_login_at": str(db_user.last_login_at),
-            }
+            profile = serialize_user_profile(*db_user_profile)
+            self.user_cache.set_profile(user_id, profile)
+
+            return profile
 
         except Exception:
             return False
 
         finally:
             db.close()
+
+    def read_user(self, user_id: int) -> dict[str, str | int] | bool:
+        profile = self.read_user_profile(user_id)
+
+        return profile["user"] if profile else False
                 
     def update_user(
             self, 
@@ -129,27 +361,23 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
+            db_user = db.execute(select_user(user_id)).scalars().first()
 
             if not db_user:
                 return False
-            
-            if username:
-                db_user.username = username
-            if password:
-                db_user.password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-            if email:
-                db_user.email = email
-            if last_login_at:
-                db_user.last_login_at = last_login_at
-            if s3_pfp_url:
-                db_user.s3_pfp_url = s3_pfp_url # If the user is changing their pfp, call storage.delete_pfp() to remove the old pfp, then get the key returned from upload_pfp and update it here
+
+            password_hash = password_hasher.hash(password) if password else None
+            apply_user_update(db_user, username, password_hash, email, last_login_at, s3_pfp_url)
 
             db.commit()
-            db.refresh(db_user)
+            self.user_cache.invalidate(user_id)
             
             return True
 
+        except PasswordHasherOverloaded:
+            db.rollback()
+            raise
+
         except Exception:
             db.rollback()
             return False
@@ -161,13 +389,14 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user = db.query(User).filter(User.id == user_id).first()
+            db_user = db.execute(select_user(user_id)).scalars().first()
 
             if not db_user:
                 return False
 
             db.delete(db_user)
             db.commit()
+            self.user_cache.invalidate(user_id)
 
             return True
 
@@ -184,11 +413,9 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user_preference = UserPreferences(user_id=user_id)
-
-            db.add(db_user_preference)
+            db.add(UserPreferences(user_id=user_id))
             db.commit()
-            db.refresh(db_user_preference)
+            self.user_cache.invalidate(user_id)
 
             return True
         
@@ -200,25 +427,12 @@ class Database:
             db.close()
 
     def read_user_preference(self, user_id: int) -> dict[str, str] | bool:
-        db = self.SessionLocal()
+        profile = self.read_user_profile(user_id)
 
-        try:
-            db_user_preference = db.query(UserPreferences).filter(UserPreferences.user_id == user_id).first()
-
-            if not db_user_preference:
-                return False
-
-            return {
-                "theme": db_user_preference.theme,
-                "safesearch": db_user_preference.safesearch,
-                "updated_at": str(db_user_preference.updated_at),
-            }
-        
-        except Exception:
+        if not profile or not profile["preferences"]:
             return False
 
-        finally:
-            db.close()
+        return profile["preferences"]
 
     def update_user_preference(
             self, 
@@ -230,18 +444,15 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user_preference = db.query(UserPreferences).filter(UserPreferences.user_id == user_id).first()
+            db_user_preference = db.execute(select_user_preference(user_id)).scalars().first()
             
             if not db_user_preference:
                 return False
 
-            if theme:
-                db_user_preference.theme = theme
-            if safesearch:
-                db_user_preference.safesearch = safesearch
+            apply_user_preference_update(db_user_preference, theme, safesearch)
             
             db.commit()
-            db.refresh(db_user_preference)
+            self.user_cache.invalidate(user_id)
 
             return True
 
@@ -257,20 +468,33 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user = db.query(User).filter(User.username == username_or_email).first()
-
-            if not db_user:
-                db_user = db.query(User).filter(User.email == username_or_email).first()
+            db_user = db.execute(select_user_by_username_or_email(username_or_email)).scalars().first()
 
-            if not db_user:
+            if not db_user or not db_user.password:
                 return False
 
-            if not bcrypt.checkpw(password.encode("utf-8"), db_user.password.encode("utf-8")):
+            if not password_hasher.verify(password, db_user.password):
                 return False
 
+            # Upgrade hashes made with an older cost factor while we still have the plaintext;
+            # a failed upgrade must not fail an otherwise valid login
+            if password_hasher.needs_rehash(db_user.password):
+                try:
+                    db_user.password = password_hasher.hash(password)
+                    db.commit()
+
+                except Exception:
+                    db.rollback()
+
             return True
 
+        # A full hasher queue is not a wrong password; the app answers it with a 503 and Retry-After
+        except PasswordHasherOverloaded:
+            db.rollback()
+            raise
+
         except Exception:
+            db.rollback()
             return False
 
         finally:
@@ -280,15 +504,12 @@ class Database:
         db = self.SessionLocal()
 
         try:
-            db_user = db.query(User).filter(User.username == username_or_email).first()
-
-            if not db_user:
-                db_user = db.query(User).filter(User.email == username_or_email).first()
+            db_user = db.execute(select_user_by_username_or_email(username_or_email)).scalars().first()
 
             db_user.last_login_at = datetime.now()
 
             db.commit()
-            db.refresh(db_user)
+            self.user_cache.invalidate(db_user.id)
 
             return db_user.id
 
@@ -301,37 +522,23 @@ class Database:
 
     # UserSearchHistory table
     def log_user_search(self, user_id: int, query: str) -> bool:
-        db = self.SessionLocal()
-
-        try:
-            db_user_search_history = UserSearchHistory(user_id=user_id, query=query)
-
-            db.add(db_user_search_history)
-            db.commit()
-            db.refresh(db_user_search_history)
-
-            return True
-        
-        except Exception:
-            db.rollback()
-            return False
-        
-        finally:
-            db.close()
+        # Buffered write-behind; the row reaches Postgres on the next batch flush
+        return search_history_buffer.add(new_search_history_row(user_id, query))
     
-    def read_user_search_history(self, user_id: int) -> list[dict[str, str]] | bool:
+    def read_user_search_history(
+            self,
+            user_id: int,
+            limit: int = HISTORY_PAGE_SIZE,
+            cursor: Optional[str] = None
+        ) -> dict[str, list[dict[str, str]] | str] | bool:
+
         db = self.SessionLocal()
 
         try:
-            db_user_search_history = db.query(UserSearchHistory).filter(UserSearchHistory.user_id == user_id).all()
+            limit = clamp_history_limit(limit)
+            db_user_search_history = db.execute(select_search_history_page(user_id, limit, cursor)).all()
 
-            if not db_user_search_history:
-                return False
-
-            return [
-                { "query": query_record.query, "queried_at": str(query_record.queried_at) }
-                for query_record in db_user_search_history
-            ]
+            return serialize_search_history_page(db_user_search_history, limit)
         
         except Exception:
             return False
@@ -340,15 +547,18 @@ class Database:
             db.close()
 
     def delete_user_search_history(self, user_id: int) -> bool:
+        # Drop rows still waiting in the write-behind buffer so they don't reappear after the delete
+        search_history_buffer.discard(is_search_history_row_of(user_id))
+
         db = self.SessionLocal()
 
         try:
-            db_user_search_history = db.query(UserSearchHistory).filter(UserSearchHistory.user_id == user_id).all()
+            deleted_count = db.execute(delete_search_history(user_id)).rowcount
 
-            if not db_user_search_history:
+            if not deleted_count:
+                db.rollback()
                 return False
 
-            db.delete(db_user_search_history)
             db.commit()
 
             return True
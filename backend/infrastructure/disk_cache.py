@@ -0,0 +1,117 @@
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Files on local disk evicted least-recently-used once their total size passes max_bytes.
+# The index lives in memory and is rebuilt from modification times (touched on every hit) on start, so a
+# restarted worker keeps its cache; files are written to a temp name and renamed, so readers never see partial files.
+class DiskLRUCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _get_path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small
+        return self.directory / key[:2] / key
+
+    def _load_index(self) -> None:
+        entries = []
+
+        for path in self.directory.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+
+            try:
+                stat = path.stat()
+
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+
+            try:
+                self._get_path(key).unlink()
+
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._index:
+                return None
+
+            self._index.move_to_end(key)
+
+        path = self._get_path(key)
+
+        try:
+            value = path.read_bytes()
+            os.utime(path)
+
+            return value
+
+        except FileNotFoundError:
+            with self._lock:
+                size = self._index.pop(key, None)
+
+                if size is not None:
+                    self._total_bytes -= size
+
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        path = self._get_path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        try:
+            with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".", delete=False) as tmp_file:
+                tmp_file.write(value)
+
+            os.replace(tmp_file.name, path)
+
+        except OSError:
+            logger.exception("Could not write %s to the disk cache", key)
+            return
+
+        with self._lock:
+            self._total_bytes += len(value) - self._index.get(key, 0)
+            self._index[key] = len(value)
+            self._index.move_to_end(key)
+
+            self._evict()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._index), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
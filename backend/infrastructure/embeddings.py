@@ -0,0 +1,240 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from .tokens import estimate_tokens
+from .telemetry import span, traced
+
+load_dotenv()
+env = os.getenv
+
+# Point OAI_BASE_URL at a local stand-in server to run without the real API
+OAI_BASE_URL = env("OAI_BASE_URL", "https://api.openai.com/v1")
+EMBEDDING_MODEL = env("OAI_EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_RPM = int(env("OAI_EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = int(env("OAI_EMBEDDING_TPM", "1000000"))
+EMBEDDING_MAX_CONCURRENCY = int(env("OAI_EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_MAX_RETRIES = int(env("OAI_EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_TIMEOUT = float(env("OAI_EMBEDDING_TIMEOUT", "20"))
+
+# Provider request limits: inputs per request, tokens per request and tokens per input
+EMBEDDING_MAX_BATCH_INPUTS = 2048
+EMBEDDING_MAX_BATCH_TOKENS = 250000
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+class EmbeddingRequestError(Exception):
+    pass
+
+# The provider counted more tokens than estimate_tokens did and rejected the batch for its size
+class EmbeddingBatchTooLarge(EmbeddingRequestError):
+    pass
+
+def is_batch_too_large(res: httpx.Response) -> bool:
+    if res.status_code == 413:
+        return True
+
+    if res.status_code != 400:
+        return False
+
+    try:
+        error = res.json().get("error") or {}
+
+    except ValueError:
+        return False
+
+    return error.get("code") == "context_length_exceeded" or "token" in str(error.get("message", "")).lower()
+
+class TokenBucket:
+    def __init__(self, capacity_per_minute: int):
+        self.capacity = capacity_per_minute
+        self.refill_rate = capacity_per_minute / 60
+        self.tokens = float(capacity_per_minute)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: int) -> None:
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+                self.updated_at = now
+
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+
+                await asyncio.sleep((amount - self.tokens) / self.refill_rate)
+
+# All requests run on one background event loop so the rate limits and connection pool are shared
+# by sync callers (embed_sync) and by async callers on other loops (embed_async)
+class EmbeddingClient:
+    def __init__(
+        self,
+        base_url: str = OAI_BASE_URL,
+        model: str = EMBEDDING_MODEL,
+        requests_per_minute: int = EMBEDDING_RPM,
+        tokens_per_minute: int = EMBEDDING_TPM,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+    ):
+        self.base_url = base_url
+        self.model = model
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="embedding-client", daemon=True).start()
+
+                asyncio.run_coroutine_threadsafe(self._init_on_loop(), loop).result()
+                self._loop = loop
+
+        return self._loop
+
+    async def _init_on_loop(self) -> None:
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=EMBEDDING_TIMEOUT,
+            headers={"Authorization": f"Bearer {env('OAI_API_KEY')}"},
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+        )
+        self._request_bucket = TokenBucket(self.requests_per_minute)
+        self._token_bucket = TokenBucket(self.tokens_per_minute)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    @staticmethod
+    def _split_batches(texts: list[str]) -> list[list[str]]:
+        batches, current_batch, current_tokens = [], [], 0
+
+        for text in texts:
+            text_tokens = estimate_tokens(text)
+
+            if current_batch and (
+                len(current_batch) >= EMBEDDING_MAX_BATCH_INPUTS or
+                current_tokens + text_tokens > EMBEDDING_MAX_BATCH_TOKENS
+            ):
+                batches.append(current_batch)
+                current_batch, current_tokens = [], 0
+
+            current_batch.append(text)
+            current_tokens += text_tokens
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    @staticmethod
+    def _get_retry_delay(attempt: int, res: Optional[httpx.Response]) -> float:
+        retry_after = res.headers.get("retry-after") if res is not None else None
+
+        if retry_after:
+            try:
+                return float(retry_after)
+
+            except ValueError:
+                pass
+
+        # Full jitter keeps retrying workers from re-synchronizing into another 429 storm
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        batch_tokens = sum(estimate_tokens(text) for text in batch)
+
+        for attempt in range(self.max_retries + 1):
+            await self._request_bucket.acquire(1)
+            await self._token_bucket.acquire(batch_tokens)
+
+            res = None
+
+            try:
+                async with self._semaphore:
+                    with span("embeddings.http", inputs=len(batch), attempt=attempt) as stage_span:
+                        res = await self._http.post("/embeddings", json={"model": self.model, "input": batch})
+
+                        if res.status_code != 200:
+                            stage_span.outcome = str(res.status_code)
+
+            except httpx.TransportError:
+                pass
+
+            if res is not None:
+                if res.status_code == 200:
+                    data = sorted(res.json()["data"], key=lambda item: item["index"])
+                    return [item["embedding"] for item in data]
+
+                if is_batch_too_large(res):
+                    raise EmbeddingBatchTooLarge(f"Embedding batch of {len(batch)} inputs was too large")
+
+                if res.status_code != 429 and res.status_code < 500:
+                    raise EmbeddingRequestError(f"Embedding request failed with status {res.status_code}")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._get_retry_delay(attempt, res))
+
+        raise EmbeddingRequestError(f"Embedding request failed after {self.max_retries + 1} attempts")
+
+    # _split_batches only has the estimate to go on; a batch the provider rejects as too large is halved until it
+    # fits, down to a single input
+    async def _embed_splitting(self, batch: list[str]) -> list[list[float]]:
+        try:
+            return await self._embed_batch(batch)
+
+        except EmbeddingBatchTooLarge:
+            if len(batch) == 1:
+                raise
+
+        middle = len(batch) // 2
+        first_half, second_half = await asyncio.gather(
+            self._embed_splitting(batch[:middle]),
+            self._embed_splitting(batch[middle:]),
+        )
+
+        return first_half + second_half
+
+    @traced("embeddings.embed")
+    async def _embed(self, texts: list[str]) -> list[list[float]]:
+        # Inputs over the per-input limit are truncated rather than failing the whole request
+        max_chars = EMBEDDING_MAX_INPUT_TOKENS * 4
+        texts = [text[:max_chars] if text else " " for text in texts]
+
+        batch_results = await asyncio.gather(*(self._embed_splitting(batch) for batch in self._split_batches(texts)))
+
+        return [embedding for batch_result in batch_results for embedding in batch_result]
+
+    def embed_sync(self, texts: list[str]) -> list[list[float]]:
+        return asyncio.run_coroutine_threadsafe(self._embed(texts), self._ensure_loop()).result()
+
+    async def embed_async(self, texts: list[str]) -> list[list[float]]:
+        loop = self._loop
+
+        # Starting the background loop waits on its thread and the HTTP client, so the first call does that
+        # in an executor instead of blocking the caller's event loop
+        if loop is None:
+            loop = await asyncio.get_running_loop().run_in_executor(None, self._ensure_loop)
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._embed(texts), loop))
+
+embedding_client = EmbeddingClient()
@@ -0,0 +1,293 @@
+import os
+import math
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+GEO_INDEX_MAX_ENTRIES = int(env("GEO_INDEX_MAX_ENTRIES", "200000"))
+
+EARTH_RADIUS_KM = 6371.0088
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Geohash precisions kept in the index, from ~1250km (2) down to ~150m (7) cells
+PRECISIONS = (2, 3, 4, 5, 6, 7)
+# A bounding box query uses the finest precision that covers it with at most this many cells
+MAX_BBOX_CELLS = int(env("GEO_INDEX_MAX_BBOX_CELLS", "64"))
+
+def _cell_size(precision: int) -> tuple[float, float]:
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+CELL_SIZES = {precision: _cell_size(precision) for precision in PRECISIONS}
+
+# A cell is its (row, column) in the geohash grid of that precision, so neighbours are plain index arithmetic
+def _cell(lat: float, lon: float, precision: int) -> tuple[int, int]:
+    lat_size, lon_size = CELL_SIZES[precision]
+    rows = round(180.0 / lat_size)
+    columns = round(360.0 / lon_size)
+
+    return min(int((lat + 90.0) / lat_size), rows - 1), int((lon + 180.0) / lon_size) % columns
+
+def geohash(lat: float, lon: float, precision: int = 7) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(chars) < precision:
+        coord_range, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (coord_range[0] + coord_range[1]) / 2
+
+        value <<= 1
+
+        if coord >= mid:
+            value |= 1
+            coord_range[0] = mid
+        else:
+            coord_range[1] = mid
+
+        even = not even
+        bits += 1
+
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+
+    return "".join(chars)
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class GeoEntity:
+    __slots__ = ("entity_id", "kind", "name", "lat", "lon", "data")
+
+    def __init__(self, entity_id: str, kind: str, name: str, lat: float, lon: float, data: dict[str, Any]):
+        self.entity_id = entity_id
+        self.kind = kind
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.data = data
+
+    def to_dict(self, distance_km: Optional[float] = None) -> dict[str, Any]:
+        entity = {
+            "id": self.entity_id,
+            "kind": self.kind,
+            "name": self.name,
+            "lat": self.lat,
+            "lon": self.lon,
+            # Lets the map cluster markers by prefix without another round trip
+            "geohash": geohash(self.lat, self.lon),
+            **self.data,
+        }
+
+        if distance_km is not None:
+            entity["distance_km"] = round(distance_km, 3)
+
+        return entity
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+# In-process spatial index of places seen in enrichments (Wikipedia coordinates, Tripadvisor places).
+# Every entity sits in one geohash cell per precision in PRECISIONS; bounding boxes scan the cells of
+# one precision, k-nearest searches the 3x3 cells around the point from fine to coarse until the k-th
+# hit is provably closer than anything outside them. Upserts are incremental, the oldest entities go
+# first once GEO_INDEX_MAX_ENTRIES is reached.
+class GeoIndex:
+    def __init__(self, max_entries: int = GEO_INDEX_MAX_ENTRIES):
+        self.max_entries = max_entries
+
+        self._entities: OrderedDict[str, GeoEntity] = OrderedDict()
+        self._cells: dict[tuple[int, int, int], set[str]] = {}
+        self._names: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _link(self, entity: GeoEntity) -> None:
+        for precision in PRECISIONS:
+            self._cells.setdefault((precision, *_cell(entity.lat, entity.lon, precision)), set()).add(entity.entity_id)
+
+        self._names[normalize_name(entity.name)] = entity.entity_id
+
+    def _unlink(self, entity: GeoEntity) -> None:
+        for precision in PRECISIONS:
+            key = (precision, *_cell(entity.lat, entity.lon, precision))
+            cell = self._cells.get(key)
+
+            if cell is not None:
+                cell.discard(entity.entity_id)
+
+                if not cell:
+                    del self._cells[key]
+
+        name = normalize_name(entity.name)
+
+        if self._names.get(name) == entity.entity_id:
+            del self._names[name]
+
+    def add(self, entity_id: str, kind: str, name: str, lat: float, lon: float, **data: Any) -> bool:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return False
+
+        entity = GeoEntity(entity_id, kind, name, lat, lon, data)
+
+        with self._lock:
+            previous = self._entities.pop(entity_id, None)
+
+            if previous is not None:
+                self._unlink(previous)
+
+            self._entities[entity_id] = entity
+            self._link(entity)
+
+            while len(self._entities) > self.max_entries:
+                _, evicted = self._entities.popitem(last=False)
+                self._unlink(evicted)
+
+        return True
+
+    def get(self, entity_id: str) -> Optional[GeoEntity]:
+        with self._lock:
+            return self._entities.get(entity_id)
+
+    def find_by_name(self, name: str) -> Optional[GeoEntity]:
+        with self._lock:
+            entity_id = self._names.get(normalize_name(name))
+
+            return self._entities.get(entity_id) if entity_id else None
+
+    def _cell_ids(self, precision: int, row: int, column: int) -> set[str]:
+        return self._cells.get((precision, row, column), set())
+
+    def within_bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        kind: Optional[str] = None,
+        limit: int = 500,
+    ) -> list[GeoEntity]:
+
+        south, north = max(-90.0, min(south, north)), min(90.0, max(south, north))
+
+        # A box crossing the antimeridian has west > east
+        lon_spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+
+        precision = PRECISIONS[0]
+
+        for candidate_precision in reversed(PRECISIONS):
+            lat_size, lon_size = CELL_SIZES[candidate_precision]
+            rows = int((north - south) / lat_size) + 2
+            columns = sum(int((span_east - span_west) / lon_size) + 2 for span_west, span_east in lon_spans)
+
+            if rows * columns <= MAX_BBOX_CELLS:
+                precision = candidate_precision
+                break
+
+        results = []
+
+        with self._lock:
+            for span_west, span_east in lon_spans:
+                min_row, min_column = _cell(south, span_west, precision)
+                max_row, max_column = _cell(north, min(span_east, 179.999999), precision)
+
+                for row in range(min_row, max_row + 1):
+                    for column in range(min_column, max_column + 1):
+                        for entity_id in self._cell_ids(precision, row, column):
+                            entity = self._entities[entity_id]
+
+                            if (
+                                south <= entity.lat <= north
+                                and span_west <= entity.lon <= span_east
+                                and (kind is None or entity.kind == kind)
+                            ):
+                                results.append(entity)
+
+                                if len(results) >= limit:
+                                    return results
+
+        return results
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 10,
+        kind: Optional[str] = None,
+        max_distance_km: Optional[float] = None,
+        exclude: Optional[str] = None,
+    ) -> list[tuple[GeoEntity, float]]:
+
+        def matches(entity: GeoEntity) -> bool:
+            return entity.entity_id != exclude and (kind is None or entity.kind == kind)
+
+        with self._lock:
+            for precision in reversed(PRECISIONS):
+                lat_size, lon_size = CELL_SIZES[precision]
+                row, column = _cell(lat, lon, precision)
+                columns = round(360.0 / lon_size)
+
+                candidates = {
+                    entity_id
+                    for d_row in (-1, 0, 1)
+                    for d_column in (-1, 0, 1)
+                    for entity_id in self._cell_ids(precision, row + d_row, (column + d_column) % columns)
+                }
+
+                hits = [
+                    (haversine_km(lat, lon, entity.lat, entity.lon), entity)
+                    for entity in (self._entities[entity_id] for entity_id in candidates)
+                    if matches(entity)
+                ]
+
+                # Anything outside the 3x3 block is at least one cell edge away; longitude edges shrink with latitude
+                covered_km = math.radians(min(lat_size, lon_size * math.cos(math.radians(min(89.0, abs(lat) + 2 * lat_size))))) * EARTH_RADIUS_KM
+                nearest_hits = heapq.nsmallest(k, hits, key=lambda hit: hit[0])
+
+                if len(nearest_hits) == k and nearest_hits[-1][0] <= covered_km:
+                    break
+
+                if max_distance_km is not None and max_distance_km <= covered_km:
+                    break
+
+            else:
+                # Too sparse around the point for the coarsest cells: fall back to a full scan
+                nearest_hits = heapq.nsmallest(
+                    k,
+                    (
+                        (haversine_km(lat, lon, entity.lat, entity.lon), entity)
+                        for entity in self._entities.values()
+                        if matches(entity)
+                    ),
+                    key=lambda hit: hit[0],
+                )
+
+        return [
+            (entity, distance_km)
+            for distance_km, entity in nearest_hits
+            if max_distance_km is None or distance_km <= max_distance_km
+        ]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entities": len(self._entities), "cells": len(self._cells)}
+
+geo_index = GeoIndex()
@@ -0,0 +1,132 @@
+import os
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+LEXICAL_INDEX_MAX_NAMESPACES = int(env("LEXICAL_INDEX_MAX_NAMESPACES", "2000"))
+
+# Keeps tickers, versions, dates and decimals ("aapl", "3.5", "2024-06-07") as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/:][a-z0-9]+)*")
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def matches_filter(metadata: dict[str, Any], metadata_filter: Optional[dict[str, Any]]) -> bool:
+    # Subset of Pinecone's filter language: equality, $eq, $ne, $in, $nin
+    if not metadata_filter:
+        return True
+
+    for field, condition in metadata_filter.items():
+        value = metadata.get(field)
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+
+    return True
+
+class BM25Index:
+    def __init__(
+        self,
+        doc_ids: list[str],
+        texts: list[str],
+        metadatas: Optional[list[dict[str, Any]]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.doc_ids = doc_ids
+        self.texts = texts
+        self.metadatas = metadatas or [{} for _ in texts]
+        self.k1 = k1
+        self.b = b
+
+        self.term_freqs = [Counter(tokenize(text)) for text in texts]
+        self.doc_lengths = [sum(term_freq.values()) for term_freq in self.term_freqs]
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+        doc_freqs = Counter(term for term_freq in self.term_freqs for term in term_freq)
+        num_docs = len(texts)
+
+        self.idf = {
+            term: math.log(1 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            for term, doc_freq in doc_freqs.items()
+        }
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[dict[str, Any]] = None,
+    ) -> list[tuple[int, float]]:
+
+        query_terms = [term for term in set(tokenize(query)) if term in self.idf]
+
+        if not query_terms:
+            return []
+
+        scores = []
+
+        for i, term_freq in enumerate(self.term_freqs):
+            if not matches_filter(self.metadatas[i], metadata_filter):
+                continue
+
+            length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / (self.avg_doc_length or 1.0))
+            score = 0.0
+
+            for term in query_terms:
+                freq = term_freq.get(term)
+
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + length_norm)
+
+            if score > 0:
+                scores.append((i, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+
+        return scores[:top_k]
+
+# Per-namespace BM25 indexes built alongside the Pinecone upsert; bounded LRU, local to this worker
+class LexicalIndexStore:
+    def __init__(self, max_namespaces: int = LEXICAL_INDEX_MAX_NAMESPACES):
+        self.max_namespaces = max_namespaces
+        self._indexes: OrderedDict[str, BM25Index] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, namespace: str, index: BM25Index) -> None:
+        with self._lock:
+            self._indexes[namespace] = index
+            self._indexes.move_to_end(namespace)
+
+            while len(self._indexes) > self.max_namespaces:
+                self._indexes.popitem(last=False)
+
+    def get(self, namespace: str) -> BM25Index | None:
+        with self._lock:
+            index = self._indexes.get(namespace)
+
+            if index is not None:
+                self._indexes.move_to_end(namespace)
+
+            return index
+
+    def drop(self, namespace: str) -> None:
+        with self._lock:
+            self._indexes.pop(namespace, None)
+
+lexical_indexes = LexicalIndexStore()
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+STARTUP_TIMEOUT = float(env("STARTUP_TIMEOUT", "15"))
+HEALTH_CHECK_TIMEOUT = float(env("HEALTH_CHECK_TIMEOUT", "2"))
+
+logger = logging.getLogger(__name__)
+
+class Component:
+    def __init__(
+        self,
+        name: str,
+        start: Optional[Callable[[], object]],
+        check: Optional[Callable[[], object]],
+        stop: Optional[Callable[[], object]],
+        required: bool,
+    ):
+        self.name = name
+        self.start = start
+        self.check = check
+        self.stop = stop
+        self.required = required
+
+        self.ready = False
+        self.error: Optional[str] = None
+
+# Owns the external clients of one worker: starts them in parallel with a bounded timeout, reports
+# their health and stops them in reverse order. Optional components may fail; the worker then
+# serves in degraded mode and the failure shows up in health().
+class Lifecycle:
+    def __init__(
+        self,
+        startup_timeout: float = STARTUP_TIMEOUT,
+        health_check_timeout: float = HEALTH_CHECK_TIMEOUT,
+    ):
+        self.startup_timeout = startup_timeout
+        self.health_check_timeout = health_check_timeout
+
+        self.components: list[Component] = []
+
+    def register(
+        self,
+        name: str,
+        start: Optional[Callable[[], object]] = None,
+        check: Optional[Callable[[], object]] = None,
+        stop: Optional[Callable[[], object]] = None,
+        required: bool = True,
+    ) -> None:
+
+        self.components.append(Component(name, start, check, stop, required))
+
+    def is_ready(self, name: str) -> bool:
+        return any(component.name == name and component.ready for component in self.components)
+
+    @staticmethod
+    async def _call(fn: Callable[[], object], timeout: float) -> None:
+        # The clients are blocking; a timed-out call keeps its thread but no longer holds up startup
+        await asyncio.wait_for(asyncio.to_thread(fn), timeout)
+
+    async def _start_component(self, component: Component) -> None:
+        start_time = time.perf_counter()
+
+        try:
+            if component.start is not None:
+                await self._call(component.start, self.startup_timeout)
+
+            component.ready = True
+            component.error = None
+            logger.info("%s ready in %.0fms", component.name, (time.perf_counter() - start_time) * 1000)
+
+        except Exception as e:
+            component.ready = False
+            component.error = repr(e)
+            logger.warning("%s failed to start: %r", component.name, e)
+
+    async def startup(self) -> None:
+        await asyncio.gather(*(self._start_component(component) for component in self.components))
+
+        failed = [component.name for component in self.components if component.required and not component.ready]
+
+        if failed:
+            raise RuntimeError(f"Required components failed to start: {', '.join(failed)}")
+
+    async def _check_component(self, component: Component) -> dict:
+        if component.check is None:
+            return {"ok": component.ready, "required": component.required, **({"error": component.error} if component.error else {})}
+
+        start_time = time.perf_counter()
+
+        try:
+            await self._call(component.check, self.health_check_timeout)
+
+            return {"ok": True, "required": component.required, "latency_ms": round((time.perf_counter() - start_time) * 1000, 1)}
+
+        except Exception as e:
+            return {"ok": False, "required": component.required, "error": repr(e)}
+
+    async def health(self) -> tuple[bool, dict[str, dict]]:
+        results = await asyncio.gather(*(self._check_component(component) for component in self.components))
+        report = {component.name: result for component, result in zip(self.components, results)}
+
+        return all(result["ok"] for result in report.values() if result["required"]), report
+
+    async def shutdown(self) -> None:
+        for component in reversed(self.components):
+            if component.stop is None or not component.ready:
+                continue
+
+            try:
+                await self._call(component.stop, self.startup_timeout)
+
+            except Exception:
+                logger.exception("%s failed to stop cleanly", component.name)
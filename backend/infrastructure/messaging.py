@@ -1,43 +1,98 @@
 import os
 import json
 import time
+import logging
+import threading
+from typing import TYPE_CHECKING
 
-from confluent_kafka import Producer, Consumer
 from dotenv import load_dotenv
 
-from ..config import S3_CLIENT, BUCKET_NAME, PC_INDEX
+from ..config import get_s3_client, get_pinecone_index, BUCKET_NAME
+from .telemetry import span, observe_stage, observe_kafka_consume_lag
+
+# confluent_kafka loads librdkafka; it is imported when the first client is created
+if TYPE_CHECKING:
+    from confluent_kafka import Producer, Consumer
 
 load_dotenv()
 env = os.getenv
 
-kafka_producer = Producer({
-    "bootstrap.servers": env("KAFKA_BOOTSTRAP_SERVERS"),
-    "queue.buffering.max.messages": 100000,
-    "queue.buffering.max.ms": 500,
-    "compression.type": "lz4",
-    "security.protocol": "SASL_SSL",
-    "sasl.mechanisms": "PLAIN",
-    "sasl.username": env("KAFKA_API_KEY"),
-    "sasl.password": env("KAFKA_API_SECRET")
-})
-
-kafka_consumer = Consumer({
-    "bootstrap.servers": env("KAFKA_BOOTSTRAP_SERVERS"),
-    "group.id": "msg-queue-for-external-services",
-    "auto.offset.reset": "earliest",
-    "enable.auto.commit": False,
-    "security.protocol": "SASL_SSL",
-    "sasl.mechanisms": "PLAIN",
-    "sasl.username": env("KAFKA_API_KEY"),
-    "sasl.password": env("KAFKA_API_SECRET")
-})
-
-kafka_consumer.subscribe([
+logger = logging.getLogger(__name__)
+
+# Delivery reports arrive on poll()/flush(); msg.latency() is produce() to broker ack
+def _on_delivery(err, msg) -> None:
+    if err is not None:
+        logger.warning("Kafka delivery to %s failed: %s", msg.topic(), err)
+
+    observe_stage(f"kafka.produce.{msg.topic()}", msg.latency() or 0.0, "error" if err is not None else "ok")
+
+CONSUMER_TOPICS = [
     "s3.upload_pfp",
     "s3.delete_pfp",
     "vector.add_to_vector_db",
     "vector.delete_from_vector_db",
-])
+]
+
+_kafka_producer: "Producer | None" = None
+_kafka_consumer: "Consumer | None" = None
+_lock = threading.Lock()
+
+# Created on first use (or by the lifespan in main.py) so importing this module never touches the brokers
+def get_kafka_producer() -> "Producer":
+    global _kafka_producer
+
+    if _kafka_producer is None:
+        with _lock:
+            if _kafka_producer is None:
+                from confluent_kafka import Producer
+
+                _kafka_producer = Producer({
+                    "bootstrap.servers": env("KAFKA_BOOTSTRAP_SERVERS"),
+                    "queue.buffering.max.messages": 100000,
+                    "queue.buffering.max.ms": 500,
+                    "compression.type": "lz4",
+                    "security.protocol": "SASL_SSL",
+                    "sasl.mechanisms": "PLAIN",
+                    "sasl.username": env("KAFKA_API_KEY"),
+                    "sasl.password": env("KAFKA_API_SECRET"),
+                    "on_delivery": _on_delivery,
+                })
+
+    return _kafka_producer
+
+def get_kafka_consumer() -> "Consumer":
+    global _kafka_consumer
+
+    if _kafka_consumer is None:
+        with _lock:
+            if _kafka_consumer is None:
+                from confluent_kafka import Consumer
+
+                consumer = Consumer({
+                    "bootstrap.servers": env("KAFKA_BOOTSTRAP_SERVERS"),
+                    "group.id": "msg-queue-for-external-services",
+                    "auto.offset.reset": "earliest",
+                    "enable.auto.commit": False,
+                    "security.protocol": "SASL_SSL",
+                    "sasl.mechanisms": "PLAIN",
+                    "sasl.username": env("KAFKA_API_KEY"),
+                    "sasl.password": env("KAFKA_API_SECRET")
+                })
+
+                consumer.subscribe(CONSUMER_TOPICS)
+                _kafka_consumer = consumer
+
+    return _kafka_consumer
+
+def check_kafka() -> None:
+    get_kafka_producer().list_topics(timeout=2.0)
+
+def close_kafka() -> None:
+    if _kafka_producer is not None:
+        _kafka_producer.flush(5.0)
+
+    if _kafka_consumer is not None:
+        _kafka_consumer.close()
 
 BATCH_SIZE = 75
 RPS_LIMIT = 100
@@ -48,58 +103,64 @@ def process_batch(messages: list):
     
     for record in messages:
         if record.error():
-            # Once backend is completed, add log here
+            logger.warning("Kafka consume error: %s", record.error())
             continue
         
+        observe_kafka_consume_lag(record)
+        
         try:
             record_msg = json.loads(record.value().decode("utf-8"))
             operation = record_msg.get("operation")
-        
-            match operation:
-                case "upload_pfp":
-                    s3_key = record_msg["s3_key"]
-                    file_content = bytes.fromhex(record_msg["file_content"])
-                    content_type = record_msg["content_type"]
-                
-                    S3_CLIENT.put_object(
-                        Bucket=BUCKET_NAME,
-                        Key=s3_key,
-                        Body=file_content,
-                        ContentType=content_type,
-                        ACL='public-read'
-                    )
-
-                case "delete_pfp":
-                    s3_key = record_msg["s3_key"]
-                    
-                    S3_CLIENT.delete_object(
-                        Bucket=BUCKET_NAME,
-                        Key=s3_key
-                    )
-                    
-                case "add_to_vector_db":
-                    namespace = record_msg["namespace"]
-                    vector_data = record_msg["vector_data"]
-                    
-                    PC_INDEX.upsert(vectors=vector_data, namespace=namespace)
+            
+            # Topic rather than operation keeps the label set bounded when a message is malformed
+            with span(f"kafka.consume.{record.topic()}"):
+                match operation:
+                    case "upload_pfp":
+                        s3_key = record_msg["s3_key"]
+                        file_content = bytes.fromhex(record_msg["file_content"])
+                        content_type = record_msg["content_type"]
                     
-                case "delete_from_vector_db":
-                    namespace = record_msg["namespace"]
-                    PC_INDEX.delete(namespace=namespace)
-        
-                case _:
-                    # Once backend is completed, add log here
-                    continue
+                        get_s3_client().put_object(
+                            Bucket=BUCKET_NAME,
+                            Key=s3_key,
+                            Body=file_content,
+                            ContentType=content_type,
+                            ACL='public-read'
+                        )
+
+                    case "delete_pfp":
+                        s3_key = record_msg["s3_key"]
+                        
+                        get_s3_client().delete_object(
+                            Bucket=BUCKET_NAME,
+                            Key=s3_key
+                        )
+                        
+                    case "add_to_vector_db":
+                        namespace = record_msg["namespace"]
+                        vector_data = record_msg["vector_data"]
+                        
+                        get_pinecone_index().upsert(vectors=vector_data, namespace=namespace)
+                        
+                    case "delete_from_vector_db":
+                        namespace = record_msg["namespace"]
+                        get_pinecone_index().delete(namespace=namespace)
+            
+                    case _:
+                        logger.warning("Skipping Kafka message on %s with unknown operation %r", record.topic(), operation)
+                        continue
             
             success_messages.append(record)
         
-        except Exception as e:
-            # Once backend is completed, add log here
+        except Exception:
+            logger.exception("Failed to process Kafka message on %s", record.topic())
             continue
         
     return True if success_messages else False
 
 def run_consumer():
+    kafka_consumer = get_kafka_consumer()
+
     while True:
         try:
             start_time = time.time()
@@ -117,7 +178,7 @@ def run_consumer():
             elapsed_time = time.time() - start_time
             time.sleep(max(0.0, SECONDS_PER_BATCH - elapsed_time))
 
-        except Exception as e:
-            # Once backend is completed, add log here
+        except Exception:
+            logger.exception("Kafka consumer loop failed, retrying")
             time.sleep(1.0)
             continue
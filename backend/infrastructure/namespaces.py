@@ -0,0 +1,118 @@
+import os
+import time
+from dotenv import load_dotenv
+
+from .redis_client import get_redis_client
+
+load_dotenv()
+env = os.getenv
+
+NAMESPACE_TTL = int(env("PINECONE_NAMESPACE_TTL", str(60 * 60 * 2)))
+NAMESPACE_SWEEP_INTERVAL = float(env("PINECONE_NAMESPACE_SWEEP_INTERVAL", "60"))
+NAMESPACE_SWEEP_BATCH = int(env("PINECONE_NAMESPACE_SWEEP_BATCH", "50"))
+NAMESPACE_DELETE_RPS = float(env("PINECONE_NAMESPACE_DELETE_RPS", "10"))
+
+REGISTRY_KEY = "pinecone_namespaces"
+VECTOR_COUNT_KEY = "pinecone_namespaces:vector_count"
+META_KEY_PREFIX = "pinecone_namespace:"
+
+# Removes expired namespaces from the registry and returns them with their vector counts (flattened), so each one
+# is claimed by exactly one sweeper
+CLAIM_EXPIRED_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local claimed = {}
+for _, namespace in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], namespace)
+    local vector_count = redis.call('HGET', ARGV[3] .. namespace, 'vector_count')
+    if vector_count then
+        redis.call('DECRBY', KEYS[2], vector_count)
+    end
+    redis.call('DEL', ARGV[3] .. namespace)
+    table.insert(claimed, namespace)
+    table.insert(claimed, vector_count or '0')
+end
+return claimed
+"""
+
+UNREGISTER_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+if removed == 1 then
+    local vector_count = redis.call('HGET', KEYS[3], 'vector_count')
+    if vector_count then
+        redis.call('DECRBY', KEYS[2], vector_count)
+    end
+    redis.call('DEL', KEYS[3])
+end
+return removed
+"""
+
+# Registry of live Pinecone namespaces: a sorted set scored by expiry time plus a small hash per
+# namespace with its creation time and vector count
+class NamespaceRegistry:
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.claim_expired_script = self.redis_client.register_script(CLAIM_EXPIRED_SCRIPT)
+        self.unregister_script = self.redis_client.register_script(UNREGISTER_SCRIPT)
+
+    @staticmethod
+    def _get_meta_key(namespace: str) -> str:
+        return f"{META_KEY_PREFIX}{namespace}"
+
+    def register(self, namespace: str, vector_count: int) -> None:
+        now = time.time()
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.zadd(REGISTRY_KEY, {namespace: now + NAMESPACE_TTL})
+        pipe.hset(self._get_meta_key(namespace), mapping={"created_at": now, "vector_count": vector_count})
+        pipe.incrby(VECTOR_COUNT_KEY, vector_count)
+        pipe.execute()
+
+    def touch(self, namespace: str) -> None:
+        # XX: never resurrect a namespace that was already claimed for deletion
+        self.redis_client.zadd(REGISTRY_KEY, {namespace: time.time() + NAMESPACE_TTL}, xx=True, gt=True)
+
+    def unregister(self, namespace: str) -> bool:
+        return bool(self.unregister_script(
+            keys=[REGISTRY_KEY, VECTOR_COUNT_KEY, self._get_meta_key(namespace)],
+            args=[namespace],
+        ))
+
+    def claim_expired(self, limit: int = NAMESPACE_SWEEP_BATCH) -> list[tuple[str, int]]:
+        claimed = self.claim_expired_script(
+            keys=[REGISTRY_KEY, VECTOR_COUNT_KEY],
+            args=[time.time(), limit, META_KEY_PREFIX],
+        )
+
+        return [(namespace, int(vector_count)) for namespace, vector_count in zip(claimed[::2], claimed[1::2])]
+
+    # Puts claimed namespaces whose delete was never sent back in the registry, already expired, for the next sweep
+    def requeue(self, claimed: list[tuple[str, int]]) -> None:
+        if not claimed:
+            return
+
+        now = time.time()
+
+        pipe = self.redis_client.pipeline(transaction=True)
+
+        for namespace, vector_count in claimed:
+            pipe.zadd(REGISTRY_KEY, {namespace: now})
+            pipe.hset(self._get_meta_key(namespace), mapping={"created_at": now, "vector_count": vector_count})
+            pipe.incrby(VECTOR_COUNT_KEY, vector_count)
+
+        pipe.execute()
+
+    def stats(self) -> dict[str, int | float]:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zcard(REGISTRY_KEY)
+        pipe.get(VECTOR_COUNT_KEY)
+        pipe.zcount(REGISTRY_KEY, "-inf", time.time())
+
+        live_namespaces, live_vectors, expired_namespaces = pipe.execute()
+
+        return {
+            "live_namespaces": live_namespaces,
+            "live_vectors": int(live_vectors or 0),
+            "expired_pending_sweep": expired_namespaces,
+        }
+
+namespace_registry = NamespaceRegistry()
@@ -0,0 +1,217 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+import redis
+
+from .telemetry import register_stats
+
+load_dotenv()
+env = os.getenv
+
+SESSION_NEAR_CACHE_TTL_MS = int(env("SESSION_NEAR_CACHE_TTL_MS", "2000"))
+SESSION_NEAR_CACHE_MAX_ENTRIES = int(env("SESSION_NEAR_CACHE_MAX_ENTRIES", "10000"))
+
+# Flags the Redis server must have in notify-keyspace-events (set in its config, not by the app):
+# K = keyspace channel, g = DEL/EXPIRE, h = hash, l = list, x = expired, e = evicted
+KEYSPACE_EVENTS = "Kghlxe"
+KEYSPACE_CHANNEL_PATTERN = "__keyspace@*__:session:*"
+# Every read slides the session TTL, so EXPIRE never means the contents changed. "expired" (the key timed out
+# in Redis) and "evicted" are not in here: the session is gone and must not be served locally either.
+IGNORED_KEYSPACE_EVENTS = {"expire"}
+LISTENER_BACKOFF_BASE = 0.5
+LISTENER_BACKOFF_MAX = 30.0
+
+logger = logging.getLogger(__name__)
+
+# In-process LRU of session hashes. Entries live at most ttl_ms, and are dropped earlier when a
+# keyspace notification for the session (or its history list) arrives from Redis.
+class SessionNearCache:
+    def __init__(
+        self,
+        ttl_ms: int = SESSION_NEAR_CACHE_TTL_MS,
+        max_entries: int = SESSION_NEAR_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl_ms / 1000
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._invalidated_at: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+        # Without the subscription invalidations are missed, so nothing is cached until it is back
+        self._listener_connected = False
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        self.listener_errors = 0
+
+    @staticmethod
+    def _copy(session: dict) -> dict:
+        session_copy = dict(session)
+
+        if "logged_out_search_history" in session_copy:
+            session_copy["logged_out_search_history"] = list(session_copy["logged_out_search_history"])
+
+        return session_copy
+
+    def get(self, session_key: str) -> dict | None:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(session_key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            fetched_at, session = entry
+            age = now - fetched_at
+
+            if age > self.ttl:
+                del self._entries[session_key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_key)
+            self.hits += 1
+            self._served_age_total += age
+            self._served_age_max = max(self._served_age_max, age)
+
+            return self._copy(session)
+
+    # fetched_at is the monotonic time taken before the Redis read, so a read that raced
+    # with an invalidation is never cached
+    def set(self, session_key: str, session: dict, fetched_at: float) -> None:
+        if not session:
+            return
+
+        with self._lock:
+            if self._listener is not None and not self._listener_connected:
+                return
+
+            if self._invalidated_at.get(session_key, float("-inf")) >= fetched_at:
+                return
+
+            self._entries[session_key] = (fetched_at, self._copy(session))
+            self._entries.move_to_end(session_key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_key: str) -> None:
+        with self._lock:
+            self._invalidated_at[session_key] = time.monotonic()
+            self._invalidated_at.move_to_end(session_key)
+
+            while len(self._invalidated_at) > self.max_entries:
+                self._invalidated_at.popitem(last=False)
+
+            if self._entries.pop(session_key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations,
+                "avg_staleness_ms": round(self._served_age_total / self.hits * 1000, 2) if self.hits else 0.0,
+                "max_staleness_ms": round(self._served_age_max * 1000, 2),
+                "listener_connected": int(self._listener_connected),
+                "listener_errors": self.listener_errors,
+            }
+
+    def _handle_keyspace_message(self, message: dict) -> None:
+        if message["data"] in IGNORED_KEYSPACE_EVENTS:
+            return
+
+        # Channel is "__keyspace@<db>__:session:<id>" or "...:session:<id>:history"
+        key = message["channel"].split("__:", 1)[-1]
+
+        if key.endswith(":history"):
+            key = key[:-len(":history")]
+
+        self.invalidate(key)
+
+    def _set_listener_connected(self, connected: bool) -> None:
+        with self._lock:
+            self._listener_connected = connected
+
+            # Invalidations may have been missed while disconnected, so nothing cached can be trusted
+            if not connected:
+                self._entries.clear()
+
+    def _listen(self, redis_client: redis.Redis) -> None:
+        failures = 0
+
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+
+            try:
+                pubsub.psubscribe(KEYSPACE_CHANNEL_PATTERN)
+                self._set_listener_connected(True)
+                failures = 0
+
+                for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._handle_keyspace_message(message)
+
+            except Exception:
+                failures += 1
+
+                with self._lock:
+                    self.listener_errors += 1
+
+                logger.exception("Session near cache lost its keyspace subscription, reconnecting (attempt %d)", failures)
+
+            finally:
+                self._set_listener_connected(False)
+                pubsub.close()
+
+            time.sleep(min(LISTENER_BACKOFF_MAX, LISTENER_BACKOFF_BASE * 2 ** max(0, failures - 1)))
+
+    def start_invalidation_listener(self, redis_client: redis.Redis) -> None:
+        if self._listener is not None:
+            return
+
+        try:
+            enabled_events = redis_client.config_get("notify-keyspace-events").get("notify-keyspace-events", "")
+
+            # "A" is the alias for "g$lshzxetd"
+            enabled_events = enabled_events.replace("A", "g$lshzxetd")
+
+            if not set(KEYSPACE_EVENTS) <= set(enabled_events):
+                logger.warning(
+                    "Redis notify-keyspace-events is %r but the session near cache needs %r; "
+                    "cached sessions are only dropped by their TTL",
+                    enabled_events,
+                    KEYSPACE_EVENTS,
+                )
+
+        except Exception:
+            # Managed Redis may also disallow CONFIG GET
+            pass
+
+        self._listener = threading.Thread(target=self._listen, args=(redis_client,), daemon=True)
+        self._listener.start()
+
+session_near_cache = SessionNearCache()
+register_stats("session_near_cache", session_near_cache.stats)
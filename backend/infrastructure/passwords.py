@@ -0,0 +1,83 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+BCRYPT_ROUNDS = int(env("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(env("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_QUEUE = int(env("PASSWORD_HASH_MAX_QUEUE", "32"))
+# Sent as Retry-After on the 503 a login gets while the queue is full
+PASSWORD_HASH_RETRY_AFTER = int(env("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+class PasswordHasherOverloaded(Exception):
+    pass
+
+def _hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+# bcrypt releases the GIL while hashing, so a small thread pool gets real parallelism without
+# pickling overhead; the pool size caps how many cores a login burst can take from search traffic
+class PasswordHasher:
+    def __init__(
+        self,
+        rounds: int = BCRYPT_ROUNDS,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+    ):
+        self.rounds = rounds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        # Reject instead of queueing without bound; surfaces as a 503 rather than a failed login
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherOverloaded()
+
+        try:
+            future = self.executor.submit(fn, *args)
+
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+
+        return future
+
+    # For Database, whose callers are def routes running in Starlette's threadpool: waiting on the future
+    # ties up that threadpool thread, never the event loop, while the pool still caps bcrypt's CPU.
+    # AsyncDatabase and async routes use the *_async variants.
+    def hash(self, password: str) -> str:
+        return self._submit(_hash_password, password, self.rounds).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(_verify_password, password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash_password, password, self.rounds))
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify_password, password, hashed_password))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # bcrypt hashes look like $2b$<cost>$<salt+hash>
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from dotenv import load_dotenv
+
+from .redis_client import get_redis_client
+
+load_dotenv()
+env = os.getenv
+
+RANK_PROFILE_TTL = int(env("RANK_PROFILE_TTL", str(60 * 60 * 24 * 90)))
+RANK_PROFILE_LOCAL_MAX = int(env("RANK_PROFILE_LOCAL_MAX", "5000"))
+# Another worker's flush may have updated the profile in Redis, so local copies are re-read after this long
+RANK_PROFILE_LOCAL_TTL = float(env("RANK_PROFILE_LOCAL_TTL", "300"))
+
+PROFILE_TOPIC_DIM = 256
+PROFILE_MAX_HOSTS = 50
+PROFILE_DECAY = 0.92
+PROFILE_MIN_WEIGHT = 0.01
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.\-]*[a-z0-9]|[a-z0-9]")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "which", "who",
+    "why", "with", "you", "your", "vs", "near", "best", "top",
+})
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+# crc32 rather than hash() so buckets are stable across processes and restarts
+def hash_terms(tokens: Iterable[str], dim: int = PROFILE_TOPIC_DIM) -> dict[int, float]:
+    vector: dict[int, float] = {}
+
+    for token in tokens:
+        bucket = zlib.crc32(token.encode("utf-8")) % dim
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+
+    norm = sum(weight * weight for weight in vector.values()) ** 0.5
+
+    if not norm:
+        return {}
+
+    return {bucket: weight / norm for bucket, weight in vector.items()}
+
+def normalize_host(host: str) -> str:
+    host = host.lower()
+    return host[4:] if host.startswith("www.") else host
+
+# Compact per-user profile: decayed host affinities and a hashed bag-of-words topic vector
+class UserRankProfile:
+    def __init__(
+        self,
+        hosts: Optional[dict[str, float]] = None,
+        topic: Optional[dict[int, float]] = None,
+        num_searches: int = 0,
+    ):
+        self.hosts = hosts or {}
+        self.topic = topic or {}
+        self.num_searches = num_searches
+
+    def update(self, query: str) -> None:
+        tokens = tokenize(query)
+
+        # Exponential decay keeps recent interests dominant without storing the raw history
+        self.topic = {
+            bucket: weight * PROFILE_DECAY
+            for bucket, weight in self.topic.items()
+            if weight * PROFILE_DECAY >= PROFILE_MIN_WEIGHT
+        }
+
+        for bucket, weight in hash_terms(tokens).items():
+            self.topic[bucket] = self.topic.get(bucket, 0.0) + weight
+
+        self.hosts = {
+            host: weight * PROFILE_DECAY
+            for host, weight in self.hosts.items()
+            if weight * PROFILE_DECAY >= PROFILE_MIN_WEIGHT
+        }
+
+        # Domain-looking tokens ("github.com") count as an explicit host preference
+        for host in [normalize_host(token) for token in tokens if "." in token]:
+            self.hosts[host] = self.hosts.get(host, 0.0) + 1.0
+
+        if len(self.hosts) > PROFILE_MAX_HOSTS:
+            self.hosts = dict(sorted(self.hosts.items(), key=lambda item: item[1], reverse=True)[:PROFILE_MAX_HOSTS])
+
+        self.num_searches += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "hosts": {host: round(weight, 4) for host, weight in self.hosts.items()},
+            "topic": {str(bucket): round(weight, 4) for bucket, weight in self.topic.items()},
+            "num_searches": self.num_searches,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserRankProfile":
+        return cls(
+            hosts=dict(data.get("hosts", {})),
+            topic={int(bucket): weight for bucket, weight in data.get("topic", {}).items()},
+            num_searches=data.get("num_searches", 0),
+        )
+
+# Profiles persist in Redis under rank_profile:<user_id> and are kept in a small local LRU for the
+# re-ranking hot path. Updates arrive in batches from the search history write-behind flush.
+class RankProfileStore:
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self._local: OrderedDict[int, tuple[float, UserRankProfile]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_key(user_id: int) -> str:
+        return f"rank_profile:{user_id}"
+
+    def _remember(self, user_id: int, profile: UserRankProfile) -> None:
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + RANK_PROFILE_LOCAL_TTL, profile)
+            self._local.move_to_end(user_id)
+
+            while len(self._local) > RANK_PROFILE_LOCAL_MAX:
+                self._local.popitem(last=False)
+
+    def get_profile(self, user_id: int) -> UserRankProfile | None:
+        with self._lock:
+            entry = self._local.get(user_id)
+
+            if entry is not None and entry[0] < time.monotonic():
+                del self._local[user_id]
+                entry = None
+
+        if entry is not None:
+            return entry[1]
+
+        try:
+            cached_profile = self.redis_client.get(self._get_key(user_id))
+
+        except Exception:
+            return None
+
+        if not cached_profile:
+            return None
+
+        profile = UserRankProfile.from_dict(json.loads(cached_profile))
+        self._remember(user_id, profile)
+
+        return profile
+
+    def record_searches(self, rows: Iterable[dict]) -> None:
+        queries_by_user: dict[int, list[str]] = {}
+
+        for row in rows:
+            queries_by_user.setdefault(row["user_id"], []).append(row["query"])
+
+        if not queries_by_user:
+            return
+
+        user_ids = list(queries_by_user)
+        cached_profiles = self.redis_client.mget([self._get_key(user_id) for user_id in user_ids])
+
+        pipe = self.redis_client.pipeline(transaction=False)
+
+        for user_id, cached_profile in zip(user_ids, cached_profiles):
+            profile = UserRankProfile.from_dict(json.loads(cached_profile)) if cached_profile else UserRankProfile()
+
+            for query in queries_by_user[user_id]:
+                profile.update(query)
+
+            pipe.set(self._get_key(user_id), json.dumps(profile.to_dict()), ex=RANK_PROFILE_TTL)
+            self._remember(user_id, profile)
+
+        pipe.execute()
+
+rank_profile_store = RankProfileStore()
@@ -0,0 +1,172 @@
+import os
+import math
+import time
+import logging
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+from fastapi import HTTPException, Request
+
+from .redis_client import get_async_redis_client
+from .sessions import RedisSession
+from .telemetry import span
+
+load_dotenv()
+env = os.getenv
+
+RATE_LIMIT_WINDOW = int(env("RATE_LIMIT_WINDOW", "60"))
+# Share of a scope's global capacity above which anonymous clients get only RATE_LIMIT_ANONYMOUS_FACTOR of their quota
+RATE_LIMIT_PRESSURE_THRESHOLD = float(env("RATE_LIMIT_PRESSURE_THRESHOLD", "0.8"))
+RATE_LIMIT_ANONYMOUS_FACTOR = float(env("RATE_LIMIT_ANONYMOUS_FACTOR", "0.25"))
+# Only behind a proxy that overwrites X-Forwarded-For, otherwise clients pick their own key
+RATE_LIMIT_TRUST_FORWARDED_FOR = env("RATE_LIMIT_TRUST_FORWARDED_FOR", "0") == "1"
+
+# Requests per client and per worker fleet within RATE_LIMIT_WINDOW; suggest fires on every keystroke,
+# search and llm each spend paid upstream quota, image misses cost a fetch and a transcode
+QUOTAS: dict[str, tuple[int, int]] = {
+    "suggest": (int(env("RATE_LIMIT_SUGGEST", "300")), int(env("RATE_LIMIT_SUGGEST_GLOBAL", "30000"))),
+    "search": (int(env("RATE_LIMIT_SEARCH", "60")), int(env("RATE_LIMIT_SEARCH_GLOBAL", "6000"))),
+    "llm": (int(env("RATE_LIMIT_LLM", "10")), int(env("RATE_LIMIT_LLM_GLOBAL", "600"))),
+    "image": (int(env("RATE_LIMIT_IMAGE", "600")), int(env("RATE_LIMIT_IMAGE_GLOBAL", "60000"))),
+}
+
+KEY_PREFIX = "ratelimit:"
+
+# Sliding window counter: the previous fixed window is weighted by how much of it still overlaps the
+# sliding window. KEYS are the client's and the scope's current and previous window counters.
+# Anonymous clients are throttled once the scope nears its global capacity and shed once it is full;
+# logged-in users keep their full quota. Returns {allowed, current, previous, limit}.
+SLIDING_WINDOW_SCRIPT = """
+local overlap = 1 - tonumber(ARGV[4])
+local window_ms = tonumber(ARGV[5])
+
+local global_current = tonumber(redis.call('GET', KEYS[3]) or '0')
+local global_used = global_current + tonumber(redis.call('GET', KEYS[4]) or '0') * overlap
+
+local limit = tonumber(ARGV[1])
+if ARGV[6] == '0' then
+    local global_limit = tonumber(ARGV[2])
+    if global_used >= global_limit then
+        limit = 0
+    elseif global_used >= global_limit * tonumber(ARGV[3]) then
+        limit = math.floor(limit * tonumber(ARGV[7]))
+    end
+end
+
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+
+if current + previous * overlap + 1 > limit then
+    return {0, current, previous, limit}
+end
+
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], window_ms * 2)
+redis.call('INCR', KEYS[3])
+redis.call('PEXPIRE', KEYS[3], window_ms * 2)
+
+return {1, current + 1, previous, limit}
+"""
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    def __init__(self, window: int = RATE_LIMIT_WINDOW):
+        self.window = window
+        self.async_redis_client = get_async_redis_client()
+        self.sliding_window_script = self.async_redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    # Seconds until one more request fits: the current window has to end if it alone is over the limit,
+    # otherwise the previous window has to slide out far enough
+    def _get_retry_after(self, current: int, previous: int, limit: int, elapsed: float) -> int:
+        if limit <= 0:
+            return max(1, math.ceil((1 - elapsed) * self.window))
+
+        if current + 1 > limit:
+            next_window_elapsed = max(0.0, 1 - (limit - 1) / current)
+            return max(1, math.ceil((1 - elapsed + next_window_elapsed) * self.window))
+
+        required_elapsed = 1 - (limit - 1 - current) / previous
+
+        return max(1, math.ceil((required_elapsed - elapsed) * self.window))
+
+    # Returns 0 when the request is allowed, otherwise the Retry-After in seconds
+    async def hit(self, scope: str, client_key: str, priority: bool) -> int:
+        limit, global_limit = QUOTAS[scope]
+
+        now = time.time()
+        window_index, elapsed = divmod(now / self.window, 1)
+        window_index = int(window_index)
+
+        client_prefix = f"{KEY_PREFIX}{scope}:{client_key}"
+        global_prefix = f"{KEY_PREFIX}{scope}:global"
+
+        allowed, current, previous, effective_limit = await self.sliding_window_script(
+            keys=[
+                f"{client_prefix}:{window_index}",
+                f"{client_prefix}:{window_index - 1}",
+                f"{global_prefix}:{window_index}",
+                f"{global_prefix}:{window_index - 1}",
+            ],
+            args=[
+                limit,
+                global_limit,
+                RATE_LIMIT_PRESSURE_THRESHOLD,
+                elapsed,
+                self.window * 1000,
+                1 if priority else 0,
+                RATE_LIMIT_ANONYMOUS_FACTOR,
+            ],
+        )
+
+        if allowed:
+            return 0
+
+        return self._get_retry_after(int(current), int(previous), int(effective_limit), elapsed)
+
+rate_limiter = RateLimiter()
+sessions = RedisSession()
+
+def get_client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+
+        if forwarded_for:
+            return forwarded_for.split(",", 1)[0].strip()
+
+    return request.client.host if request.client else "unknown"
+
+# FastAPI dependency, e.g. Depends(rate_limit("search")). Logged-in users are keyed by user id so the
+# quota follows them across sessions; everyone else by IP, since anonymous sessions are free to mint.
+# The session it loads is left on request.state.session for the route to reuse.
+def rate_limit(scope: str) -> Callable:
+    async def dependency(request: Request, session_key: Optional[str] = None) -> None:
+        retry_after = 0
+
+        with span(f"ratelimit.{scope}") as stage_span:
+            try:
+                session = await sessions.get_session_async(session_key) if session_key else {}
+                request.state.session = session
+                user_id = int(session.get("user_id", -1))
+
+                if user_id != -1:
+                    retry_after = await rate_limiter.hit(scope, f"user:{user_id}", priority=True)
+                else:
+                    retry_after = await rate_limiter.hit(scope, f"ip:{get_client_ip(request)}", priority=False)
+
+            # Fail open: losing Redis must not take search down with it
+            except Exception:
+                logger.exception("Rate limiter unavailable for %s", scope)
+                stage_span.outcome = "error"
+
+            if retry_after:
+                stage_span.outcome = "limited"
+
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="You are sending requests too quickly, please wait a moment and try again",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+    return dependency
@@ -0,0 +1,43 @@
+import os
+from dotenv import load_dotenv
+
+import redis
+import redis.asyncio as async_redis
+
+load_dotenv()
+env = os.getenv
+
+REDIS_MAX_CONNECTIONS = int(env("REDIS_MAX_CONNECTIONS", "50"))
+
+_connection_kwargs = {
+    "host": env("REDIS_HOST"),
+    "port": env("REDIS_PORT"),
+    "decode_responses": True,
+    "username": "default",
+    "password": env("REDIS_USER_PASS"),
+    "max_connections": REDIS_MAX_CONNECTIONS,
+    "health_check_interval": 30,
+}
+
+_pool: redis.ConnectionPool | None = None
+_async_pool: async_redis.ConnectionPool | None = None
+
+# One pool per process (sync) and per event loop (async) shared by sessions and caches
+def get_redis_client() -> redis.Redis:
+    global _pool
+
+    if _pool is None:
+        _pool = redis.ConnectionPool(**_connection_kwargs)
+
+    return redis.Redis(connection_pool=_pool)
+
+def get_async_redis_client() -> async_redis.Redis:
+    global _async_pool
+
+    if _async_pool is None:
+        _async_pool = async_redis.ConnectionPool(**_connection_kwargs)
+
+    return async_redis.Redis(connection_pool=_async_pool)
+
+def check_redis() -> None:
+    get_redis_client().ping()
@@ -0,0 +1,230 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import brotli
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+load_dotenv()
+env = os.getenv
+
+COMPRESSION_MIN_SIZE = int(env("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(env("GZIP_LEVEL", "6"))
+# Quality 4-5 is the usual sweet spot for dynamic content: close to gzip -9 in size at gzip -6 speed
+BROTLI_QUALITY = int(env("BROTLI_QUALITY", "5"))
+COMPRESSED_CACHE_ENTRIES = int(env("COMPRESSED_CACHE_ENTRIES", "256"))
+ENCODED_BUNDLE_CACHE_ENTRIES = int(env("ENCODED_BUNDLE_CACHE_ENTRIES", "256"))
+
+# Browsers keep the payload for back/forward and tab switches but always revalidate it
+RESULTS_CACHE_CONTROL = env("RESULTS_CACHE_CONTROL", "private, no-cache")
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+# Small thread-safe LRU; values are immutable bytes or bundles that are never mutated once cached
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any | None:
+        with self._lock:
+            value = self._entries.get(key)
+
+            if value is not None:
+                self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_encoded_bundles = _LRU(ENCODED_BUNDLE_CACHE_ENTRIES)
+
+def _serialize(bundle: Any) -> bytes:
+    return json.dumps(bundle, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+# Weak: the same payload is served gzip, brotli or identity encoded
+def make_etag(*parts: str | bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        digest.update(b"\0")
+
+    return f'W/"{digest.hexdigest()}"'
+
+# Serializes a result bundle and derives its ETag from the bytes. Only shared bundles, i.e. the entries of
+# the semantic cache, which are never mutated, are kept: repeat fetches of the same object reuse both, and
+# the entry keeps the bundle alive so its id cannot be reused while cached. A bundle built per request
+# would never be hit again and would only push shared ones out.
+def encode_bundle(bundle: Any, shared: bool = False) -> tuple[bytes, str]:
+    cached = _encoded_bundles.get(id(bundle)) if shared else None
+
+    if cached is not None and cached[0] is bundle:
+        return cached[1], cached[2]
+
+    body = _serialize(bundle)
+    etag = make_etag(body)
+
+    if shared:
+        _encoded_bundles.set(id(bundle), (bundle, body, etag))
+
+    return body, etag
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return _strip_weak(etag) in {_strip_weak(candidate.strip()) for candidate in if_none_match.split(",")}
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": RESULTS_CACHE_CONTROL})
+
+# etag is for callers that derive the validator up front (e.g. from a shared bundle plus what personalizes it),
+# so the bundle is only serialized, never hashed
+def conditional_json_response(request: Request, bundle: Any, shared: bool = False, etag: Optional[str] = None) -> Response:
+    if etag is None:
+        body, etag = encode_bundle(bundle, shared)
+    else:
+        body = None
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag)
+
+    return Response(
+        content=body if body is not None else _serialize(bundle),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": RESULTS_CACHE_CONTROL},
+    )
+
+def _parse_accept_encoding(accept_encoding: str) -> dict[str, float]:
+    qualities = {}
+
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+
+            except ValueError:
+                quality = 0.0
+
+        if coding:
+            qualities[coding] = quality
+
+    return qualities
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    qualities = _parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+
+    candidates = [(qualities.get(coding, wildcard), coding) for coding in ("br", "gzip")]
+    quality, coding = max(candidates, key=lambda candidate: candidate[0])
+
+    return coding if quality > 0 else None
+
+# gzip / brotli for complete responses above COMPRESSION_MIN_SIZE. Streaming responses (the LLM answer)
+# pass through untouched so tokens are not held back by the compressor. Responses with an ETag are
+# compressed once per encoding and reused from an LRU.
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self._compressed = _LRU(COMPRESSED_CACHE_ENTRIES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+
+            # Shared caches must key on Accept-Encoding whenever the response could have been compressed, including
+            # when this one was not (client without gzip, body under minimum_size, 304)
+            if self._is_compressible(start["status"], headers):
+                headers.add_vary_header("Accept-Encoding")
+
+            if (
+                encoding is None
+                or message.get("more_body", False)
+                or not self._should_compress(start["status"], headers, body)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding, headers.get("etag"))
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _is_compressible(status: int, headers: MutableHeaders) -> bool:
+        return (
+            "content-encoding" not in headers
+            and (status == 304 or headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES))
+        )
+
+    def _should_compress(self, status: int, headers: MutableHeaders, body: bytes) -> bool:
+        return status == 200 and len(body) >= self.minimum_size and self._is_compressible(status, headers)
+
+    def _compress(self, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+        cache_key = (etag, encoding)
+
+        if etag:
+            compressed = self._compressed.get(cache_key)
+
+            if compressed is not None:
+                return compressed
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+        if etag:
+            self._compressed.set(cache_key, compressed)
+
+        return compressed
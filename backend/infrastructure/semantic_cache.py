@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import threading
+from typing import Any, Callable, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+SEMANTIC_CACHE_MAX_ENTRIES = int(env("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL = int(env("SEMANTIC_CACHE_TTL", "900"))
+EMBEDDING_DIM = 1536
+
+# Cosine similarity needed to reuse another query's results; time-sensitive verticals are stricter.
+# Override per vertical with SEMANTIC_CACHE_THRESHOLD_<VERTICAL>, e.g. SEMANTIC_CACHE_THRESHOLD_WEB=0.9
+DEFAULT_THRESHOLDS = {
+    "web": 0.93,
+    "news": 0.96,
+    "video": 0.94,
+    "suggest": 0.97,
+}
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", query.lower()).strip()
+
+def get_threshold(vertical: str) -> float:
+    return float(env(f"SEMANTIC_CACHE_THRESHOLD_{vertical.upper()}", DEFAULT_THRESHOLDS.get(vertical, 0.95)))
+
+# Fixed-size ring of unit-normalized query embeddings; a lookup is one matrix-vector product. The matrix
+# is allocated on the first stored embedding, so exact-only partitions such as "suggest" never pay for it.
+class _Partition:
+    def __init__(self, capacity: int, dim: int):
+        self.dim = dim
+        self.embeddings: Optional[np.ndarray] = None
+        self.queries: list[Optional[str]] = [None] * capacity
+        self.bundles: list[Any] = [None] * capacity
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.exact: dict[str, int] = {}
+        self.next_slot = 0
+        self.size = 0
+
+    def store(self, query: str, embedding: Optional[np.ndarray], bundle: Any, expires_at: float) -> None:
+        slot = self.next_slot
+        evicted_query = self.queries[slot]
+
+        if evicted_query is not None and self.exact.get(evicted_query) == slot:
+            del self.exact[evicted_query]
+
+        if embedding is not None and self.embeddings is None:
+            self.embeddings = np.zeros((len(self.queries), self.dim), dtype=np.float32)
+
+        # A zero row never reaches a similarity threshold, so the slot only serves exact repeats
+        if self.embeddings is not None:
+            self.embeddings[slot] = embedding if embedding is not None else 0.0
+        self.queries[slot] = query
+        self.bundles[slot] = bundle
+        self.expires_at[slot] = expires_at
+        self.exact[query] = slot
+
+        self.next_slot = (slot + 1) % len(self.queries)
+        self.size = min(self.size + 1, len(self.queries))
+
+class SemanticCache:
+    def __init__(
+        self,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        dim: int = EMBEDDING_DIM,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+
+        self._partitions: dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _to_unit_vector(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm else vector
+
+    def _get_partition(self, partition_key: str) -> _Partition:
+        partition = self._partitions.get(partition_key)
+
+        if partition is None:
+            partition = _Partition(self.max_entries, self.dim)
+            self._partitions[partition_key] = partition
+
+        return partition
+
+    # partition_key separates result sets that must never be shared, e.g. "web:strict" vs "web:off".
+    # count_miss is off when a semantic lookup follows and counts the miss itself.
+    def lookup_exact(self, partition_key: str, query: str, count_miss: bool = True) -> Any | None:
+        normalized_query = normalize_query(query)
+
+        with self._lock:
+            partition = self._partitions.get(partition_key)
+            slot = partition.exact.get(normalized_query) if partition else None
+
+            if slot is None or partition.expires_at[slot] < time.time():
+                if count_miss:
+                    self.misses += 1
+
+                return None
+
+            self.exact_hits += 1
+
+            return partition.bundles[slot]
+
+    # Presence check for background work; unlike the lookups it does not count towards the hit ratio
+    def contains(self, partition_key: str, query: str) -> bool:
+        with self._lock:
+            partition = self._partitions.get(partition_key)
+            slot = partition.exact.get(normalize_query(query)) if partition else None
+
+            return slot is not None and partition.expires_at[slot] >= time.time()
+
+    def lookup_similar(self, partition_key: str, vertical: str, embedding: list[float]) -> Any | None:
+        query_vector = self._to_unit_vector(embedding)
+
+        with self._lock:
+            partition = self._partitions.get(partition_key)
+
+            if partition is None or partition.embeddings is None:
+                self.misses += 1
+                return None
+
+            similarities = partition.embeddings[:partition.size] @ query_vector
+            similarities[partition.expires_at[:partition.size] < time.time()] = -1.0
+
+            best_slot = int(np.argmax(similarities))
+
+            if similarities[best_slot] < get_threshold(vertical):
+                self.misses += 1
+                return None
+
+            self.semantic_hits += 1
+
+            return partition.bundles[best_slot]
+
+    def store(self, partition_key: str, query: str, embedding: Optional[list[float]], bundle: Any) -> None:
+        # Without an embedding the entry can still serve exact repeats
+        query_vector = self._to_unit_vector(embedding) if embedding else None
+
+        with self._lock:
+            self._get_partition(partition_key).store(
+                normalize_query(query),
+                query_vector,
+                bundle,
+                time.time() + self.ttl,
+            )
+
+    def get_or_fetch(
+        self,
+        vertical: str,
+        partition_key: str,
+        query: str,
+        embed_fn: Callable[[str], list[float]],
+        fetch_fn: Callable[[], Any],
+    ) -> Any:
+
+        # Literal repeats never pay for an embedding call
+        bundle = self.lookup_exact(partition_key, query, count_miss=False)
+
+        if bundle is not None:
+            return bundle
+
+        try:
+            embedding = embed_fn(query)
+
+        except Exception:
+            embedding = None
+
+        if embedding:
+            bundle = self.lookup_similar(partition_key, vertical, embedding)
+
+            if bundle is not None:
+                return bundle
+
+        else:
+            with self._lock:
+                self.misses += 1
+
+        bundle = fetch_fn()
+
+        if bundle:
+            self.store(partition_key, query, embedding, bundle)
+
+        return bundle
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+
+            return {
+                "entries": sum(partition.size for partition in self._partitions.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.exact_hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+semantic_cache = SemanticCache()
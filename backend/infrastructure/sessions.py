@@ -1,41 +1,125 @@
 import os
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 from typing import Optional
 import uuid
 
-import redis
+from .redis_client import get_redis_client, get_async_redis_client
+from .near_cache import session_near_cache
+from .telemetry import traced
 
 load_dotenv()
+env = os.getenv
 
+SESSION_TTL = int(env("SESSION_TTL", str(60 * 60 * 24 * 7)))
+SESSION_HISTORY_MAX = int(env("SESSION_HISTORY_MAX", "100"))
+
+# A session is two keys: the hash "session:<id>" and the capped list "session:<id>:history" (newest first).
+# Every public method below is a single pipelined round trip and slides the TTL of both keys.
+# Reads are served from the in-process session_near_cache when fresh.
 class RedisSession:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST"),
-            port=os.getenv("REDIS_PORT"),
-            decode_responses=True,
-            username="default",
-            password=os.getenv("REDIS_USER_PASS"),
-        )
+        self.redis_client = get_redis_client()
+        self.async_redis_client = get_async_redis_client()
 
-    def add_new_session(self) -> str:
-        session_id = str(uuid.uuid4())
-        session_key = f"session:{session_id}"
-        
-        self.redis_client.hset(session_key, mapping={
+    @staticmethod
+    def _get_history_key(session_key: str) -> str:
+        return f"{session_key}:history"
+
+    @staticmethod
+    def _new_session_mapping() -> dict[str, str | int]:
+        return {
             "user_id": -1,
             "last_pinecone_vector_namespace": "",
-            "logged_out_search_history": [],
             "logged_out_theme": "light",
             "logged_out_safesearch": "moderate",
-            "created_at": datetime.now(),
-        })
+            "created_at": datetime.now().isoformat(),
+        }
+
+    def _queue_touch(self, pipe, session_key: str) -> None:
+        pipe.expire(session_key, SESSION_TTL)
+        pipe.expire(self._get_history_key(session_key), SESSION_TTL)
+
+    def _queue_modify(
+        self,
+        pipe,
+        session_key: str,
+        updated_user_id: Optional[int],
+        updated_pinecone_vector_namespace: Optional[str],
+        new_query: Optional[str],
+        updated_theme: Optional[str],
+        updated_safesearch_mode: Optional[str],
+        updated_user_safesearch: Optional[str],
+    ) -> None:
+
+        updated_fields = {}
+
+        if updated_user_id is not None:
+            updated_fields["user_id"] = updated_user_id
+        if updated_pinecone_vector_namespace:
+            updated_fields["last_pinecone_vector_namespace"] = updated_pinecone_vector_namespace
+        if updated_theme:
+            updated_fields["logged_out_theme"] = updated_theme
+        if updated_safesearch_mode:
+            updated_fields["logged_out_safesearch"] = updated_safesearch_mode
+        if updated_user_safesearch:
+            updated_fields["user_safesearch"] = updated_user_safesearch
+
+        if updated_fields:
+            pipe.hset(session_key, mapping=updated_fields)
+
+        if new_query:
+            history_key = self._get_history_key(session_key)
+
+            pipe.lpush(history_key, new_query)
+            pipe.ltrim(history_key, 0, SESSION_HISTORY_MAX - 1)
+
+        self._queue_touch(pipe, session_key)
+
+    @staticmethod
+    def _build_session(session: dict, history: list[str]) -> dict:
+        if not session:
+            return {}
+
+        session["logged_out_search_history"] = history
+
+        return session
+
+    @traced("redis.session.add")
+    def add_new_session(self) -> str:
+        session_id = str(uuid.uuid4())
+        session_key = f"session:{session_id}"
+
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hset(session_key, mapping=self._new_session_mapping())
+        pipe.expire(session_key, SESSION_TTL)
+        pipe.execute()
 
         return session_key
 
+    @traced("redis.session.get")
     def get_session(self, session_key: str) -> dict:
-        return self.redis_client.hgetall(session_key)
+        cached_session = session_near_cache.get(session_key)
+
+        if cached_session is not None:
+            return cached_session
+
+        fetched_at = time.monotonic()
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(session_key)
+        pipe.lrange(self._get_history_key(session_key), 0, -1)
+        self._queue_touch(pipe, session_key)
+
+        session, history, *_ = pipe.execute()
+        session = self._build_session(session, history)
+
+        session_near_cache.set(session_key, session, fetched_at)
+
+        return session
 
+    @traced("redis.session.modify")
     def modify_session(
         self,
         session_key: str,
@@ -44,22 +128,93 @@ class RedisSession:
         new_query: Optional[str] = None,
         updated_theme: Optional[str] = None,
         updated_safesearch_mode: Optional[str] = None,
+        updated_user_safesearch: Optional[str] = None,
     ) -> None:
-        
-        if updated_user_id:
-            self.redis_client.hset(session_key, "user_id", updated_user_id)
-        if updated_pinecone_vector_namespace:
-            self.redis_client.hset(session_key, "last_pinecone_vector_namespace", updated_pinecone_vector_namespace)
-        if new_query:
-            self.redis_client.hset(
-                session_key, 
-                "logged_out_search_history", 
-                self.redis_client.hgetall(session_key)["logged_out_search_history"].append(new_query)
-            )
-        if updated_theme:
-            self.redis_client.hset(session_key, "logged_out_theme", updated_theme)
-        if updated_safesearch_mode:
-            self.redis_client.hset(session_key, "logged_out_safesearch", updated_safesearch_mode)
 
+        pipe = self.redis_client.pipeline(transaction=True)
+
+        self._queue_modify(
+            pipe,
+            session_key,
+            updated_user_id,
+            updated_pinecone_vector_namespace,
+            new_query,
+            updated_theme,
+            updated_safesearch_mode,
+            updated_user_safesearch,
+        )
+
+        pipe.execute()
+        session_near_cache.invalidate(session_key)
+
+    @traced("redis.session.delete")
     def delete_session(self, session_key: str) -> None:
-        self.redis_client.delete(session_key)
+        self.redis_client.delete(session_key, self._get_history_key(session_key))
+        session_near_cache.invalidate(session_key)
+
+    # Async variants for use from async routes
+    @traced("redis.session.add")
+    async def add_new_session_async(self) -> str:
+        session_id = str(uuid.uuid4())
+        session_key = f"session:{session_id}"
+
+        pipe = self.async_redis_client.pipeline(transaction=True)
+        pipe.hset(session_key, mapping=self._new_session_mapping())
+        pipe.expire(session_key, SESSION_TTL)
+        await pipe.execute()
+
+        return session_key
+
+    @traced("redis.session.get")
+    async def get_session_async(self, session_key: str) -> dict:
+        cached_session = session_near_cache.get(session_key)
+
+        if cached_session is not None:
+            return cached_session
+
+        fetched_at = time.monotonic()
+
+        pipe = self.async_redis_client.pipeline(transaction=False)
+        pipe.hgetall(session_key)
+        pipe.lrange(self._get_history_key(session_key), 0, -1)
+        self._queue_touch(pipe, session_key)
+
+        session, history, *_ = await pipe.execute()
+        session = self._build_session(session, history)
+
+        session_near_cache.set(session_key, session, fetched_at)
+
+        return session
+
+    @traced("redis.session.modify")
+    async def modify_session_async(
+        self,
+        session_key: str,
+        updated_user_id: Optional[int] = None,
+        updated_pinecone_vector_namespace: Optional[str] = None,
+        new_query: Optional[str] = None,
+        updated_theme: Optional[str] = None,
+        updated_safesearch_mode: Optional[str] = None,
+        updated_user_safesearch: Optional[str] = None,
+    ) -> None:
+
+        pipe = self.async_redis_client.pipeline(transaction=True)
+
+        self._queue_modify(
+            pipe,
+            session_key,
+            updated_user_id,
+            updated_pinecone_vector_namespace,
+            new_query,
+            updated_theme,
+            updated_safesearch_mode,
+            updated_user_safesearch,
+        )
+
+        await pipe.execute()
+        session_near_cache.invalidate(session_key)
+
+    @traced("redis.session.delete")
+    async def delete_session_async(self, session_key: str) -> None:
+        await self.async_redis_client.delete(session_key, self._get_history_key(session_key))
+        session_near_cache.invalidate(session_key)
@@ -3,12 +3,11 @@ import uuid
 import json
 from datetime import datetime
 
-from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 from fastapi import UploadFile
 
 from ..config import BUCKET_NAME
-from .messaging import kafka_producer
+from .messaging import get_kafka_producer
 
 load_dotenv()
 env = os.getenv
@@ -39,16 +38,16 @@ class S3Storage:
                 "content_type": file.content_type,
             }
             
-            kafka_producer.produce(
+            get_kafka_producer().produce(
                 topic="s3.upload_pfp",
                 value=json.dumps(message).encode("utf-8"),
             )
             
-            kafka_producer.flush()
+            get_kafka_producer().flush()
             
             return f"https://{BUCKET_NAME}.s3.{env('AWS_REGION')}.amazonaws.com/{s3_key}"
         
-        except ClientError:
+        except Exception:
             return False
 
     @staticmethod
@@ -59,13 +58,13 @@ class S3Storage:
                 "s3_key": s3_key,
             }
 
-            kafka_producer.produce(
+            get_kafka_producer().produce(
                 topic="s3.delete_pfp",
                 value=json.dumps(message).encode("utf-8"),
             )
             
-            kafka_producer.flush()
+            get_kafka_producer().flush()
             return True
 
-        except ClientError:
+        except Exception:
             return False
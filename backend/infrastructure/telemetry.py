@@ -0,0 +1,217 @@
+import os
+import re
+import time
+import hashlib
+import inspect
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from dotenv import load_dotenv
+from opentelemetry import trace
+from prometheus_client import REGISTRY, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+env = os.getenv
+
+LOG_LEVEL = env("LOG_LEVEL", "INFO")
+
+# 1ms to 30s; upstream APIs and embeddings dominate the tail, Redis and the near cache the head
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+STAGE_DURATION = Histogram(
+    "huggypanda_stage_duration_seconds",
+    "Duration of one stage of request handling or background work",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+KAFKA_CONSUME_LAG = Histogram(
+    "huggypanda_kafka_consume_lag_seconds",
+    "Time between a Kafka message being produced and being consumed",
+    ["topic"],
+    buckets=LAG_BUCKETS,
+)
+
+RAG_DEDUP_TOKENS = Counter(
+    "huggypanda_rag_dedup_tokens",
+    "Estimated tokens of RAG snippets before dedup (input) and dropped by it (saved)",
+    ["kind"],
+)
+
+RAG_DEDUP_DUPLICATES = Counter(
+    "huggypanda_rag_dedup_duplicates",
+    "RAG snippets and chunks dropped as exact or near duplicates",
+    ["kind"],
+)
+
+# User queries in query strings: provider URLs quoted in exception messages and our own routes in access logs
+QUERY_PARAM_PATTERN = re.compile(r"([?&](?:q|query|searchQuery)=)[^&\s'\"]*")
+
+# Spans are no-ops until an OpenTelemetry SDK and exporter are configured in the process
+tracer = trace.get_tracer("huggypanda")
+
+def redact_queries(text: str) -> str:
+    return QUERY_PARAM_PATTERN.sub(r"\1<redacted>", text)
+
+class RedactQueriesFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str):
+            record.msg = redact_queries(record.msg)
+
+        if isinstance(record.args, tuple):
+            record.args = tuple(redact_queries(arg) if isinstance(arg, str) else arg for arg in record.args)
+
+        # The traceback is formatted here so the redacted text is what every handler prints
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+
+        if record.exc_text:
+            record.exc_text = redact_queries(record.exc_text)
+
+        return True
+
+def configure_logging() -> None:
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    redact_filter = RedactQueriesFilter()
+
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(redact_filter)
+
+    # uvicorn logs requests, query string included, through its own handler
+    logging.getLogger("uvicorn.access").addFilter(redact_filter)
+
+# Logs carry this instead of the raw user query, so repeats of one query can still be correlated
+def query_digest(query: str) -> str:
+    return hashlib.blake2b(" ".join(query.lower().split()).encode("utf-8"), digest_size=6).hexdigest()
+
+def observe_stage(stage: str, seconds: float, outcome: str = "ok") -> None:
+    STAGE_DURATION.labels(stage, outcome).observe(seconds)
+
+class StageSpan:
+    __slots__ = ("otel_span", "outcome")
+
+    def __init__(self, otel_span: trace.Span):
+        self.otel_span = otel_span
+        self.outcome = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.otel_span.set_attribute(key, value)
+
+# Records one histogram observation per stage, labelled "ok", "error" (raised) or any outcome set by the caller
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[StageSpan]:
+    start = time.perf_counter()
+
+    with tracer.start_as_current_span(stage, attributes=attributes) as otel_span:
+        stage_span = StageSpan(otel_span)
+
+        try:
+            yield stage_span
+
+        except BaseException:
+            stage_span.outcome = "error"
+            raise
+
+        finally:
+            observe_stage(stage, time.perf_counter() - start, stage_span.outcome)
+
+def _get_outcome(result: Any) -> str:
+    # The services swallow their own errors and return False / {} / [], so an empty result is its own outcome
+    return "empty" if result is not None and not result else "ok"
+
+def traced(stage: str) -> Callable[[Callable], Callable]:
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage) as stage_span:
+                    result = await fn(*args, **kwargs)
+                    stage_span.outcome = _get_outcome(result)
+
+                    return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage) as stage_span:
+                result = fn(*args, **kwargs)
+                stage_span.outcome = _get_outcome(result)
+
+                return result
+
+        return wrapper
+
+    return decorator
+
+# One span and observation per statement, labelled by its verb, e.g. "db.select" or "db.insert".
+# For the async engine pass async_engine.sync_engine.
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stage = f"db.{statement.split(None, 1)[0].lower() if statement else 'unknown'}"
+
+        context._telemetry = (stage, time.perf_counter(), tracer.start_span(stage))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _finish_statement(context, "ok")
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        if exception_context.execution_context is not None:
+            _finish_statement(exception_context.execution_context, "error")
+
+def _finish_statement(context: Any, outcome: str) -> None:
+    telemetry: Optional[tuple] = getattr(context, "_telemetry", None)
+
+    if telemetry is None:
+        return
+
+    stage, start, otel_span = telemetry
+    context._telemetry = None
+
+    observe_stage(stage, time.perf_counter() - start, outcome)
+    otel_span.end()
+
+def record_dedup_report(report: dict[str, int]) -> None:
+    RAG_DEDUP_TOKENS.labels("input").inc(report["input_tokens"])
+    RAG_DEDUP_TOKENS.labels("saved").inc(report["tokens_saved"])
+    RAG_DEDUP_DUPLICATES.labels("exact").inc(report["exact_duplicates"])
+    RAG_DEDUP_DUPLICATES.labels("near").inc(report["near_duplicates"])
+
+def observe_kafka_consume_lag(record: Any) -> None:
+    timestamp_type, timestamp_ms = record.timestamp()
+
+    # 0 is TIMESTAMP_NOT_AVAILABLE
+    if timestamp_type != 0 and timestamp_ms > 0:
+        KAFKA_CONSUME_LAG.labels(record.topic()).observe(max(0.0, time.time() - timestamp_ms / 1000))
+
+# Exposes a component's stats() dict as gauges read at scrape time, e.g. huggypanda_session_near_cache_hit_ratio
+class StatsCollector:
+    def __init__(self, name: str, stats_fn: Callable[[], dict[str, int | float]]):
+        self.name = name
+        self.stats_fn = stats_fn
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        try:
+            stats = self.stats_fn()
+
+        except Exception:
+            return
+
+        for key, value in stats.items():
+            yield GaugeMetricFamily(f"huggypanda_{self.name}_{key}", f"{self.name} {key.replace('_', ' ')}", value=value)
+
+def register_stats(name: str, stats_fn: Callable[[], dict[str, int | float]]) -> None:
+    REGISTRY.register(StatsCollector(name, stats_fn))
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
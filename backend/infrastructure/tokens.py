@@ -0,0 +1,4 @@
+# ~4 characters per token for English text, rounded up so it errs slightly high. Shared by the embedding batcher
+# and the RAG chunk and context budgets so both count the same way, without a tokenizer dependency.
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4 + 1)
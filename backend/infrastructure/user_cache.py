@@ -0,0 +1,65 @@
+import os
+import json
+from dotenv import load_dotenv
+
+from .redis_client import get_redis_client, get_async_redis_client
+
+load_dotenv()
+env = os.getenv
+
+USER_CACHE_TTL = int(env("USER_CACHE_TTL", "300"))
+
+# Cached value is the combined profile: { "user": {...}, "preferences": {...} | None }
+class UserCache:
+    def __init__(self):
+        self.redis_client = get_redis_client()
+        self.async_redis_client = get_async_redis_client()
+
+    @staticmethod
+    def _get_key(user_id: int) -> str:
+        return f"user_profile:{user_id}"
+
+    # A cache outage must never fail the request, so every call degrades to a miss / no-op
+    def get_profile(self, user_id: int) -> dict | None:
+        try:
+            cached_profile = self.redis_client.get(self._get_key(user_id))
+            return json.loads(cached_profile) if cached_profile else None
+
+        except Exception:
+            return None
+
+    def set_profile(self, user_id: int, profile: dict) -> None:
+        try:
+            self.redis_client.set(self._get_key(user_id), json.dumps(profile), ex=USER_CACHE_TTL)
+
+        except Exception:
+            pass
+
+    def invalidate(self, user_id: int) -> None:
+        try:
+            self.redis_client.delete(self._get_key(user_id))
+
+        except Exception:
+            pass
+
+    async def get_profile_async(self, user_id: int) -> dict | None:
+        try:
+            cached_profile = await self.async_redis_client.get(self._get_key(user_id))
+            return json.loads(cached_profile) if cached_profile else None
+
+        except Exception:
+            return None
+
+    async def set_profile_async(self, user_id: int, profile: dict) -> None:
+        try:
+            await self.async_redis_client.set(self._get_key(user_id), json.dumps(profile), ex=USER_CACHE_TTL)
+
+        except Exception:
+            pass
+
+    async def invalidate_async(self, user_id: int) -> None:
+        try:
+            await self.async_redis_client.delete(self._get_key(user_id))
+
+        except Exception:
+            pass
@@ -1,54 +1,95 @@
 import os
+import time
 import uuid
+import logging
 from dotenv import load_dotenv
 import json
+from typing import Any, Iterator, Optional
 
-import openai
-
-from .messaging import kafka_producer
-from ..config import PC_INDEX
+from .messaging import get_kafka_producer
+from .embeddings import embedding_client
+from .namespaces import namespace_registry, NAMESPACE_SWEEP_BATCH, NAMESPACE_SWEEP_INTERVAL, NAMESPACE_DELETE_RPS
+from .lexical_index import BM25Index, lexical_indexes
+from ..config import get_pinecone_index
 
 load_dotenv()
 env = os.getenv
 
-openai.api_key = env("OAI_API_KEY")
+logger = logging.getLogger(__name__)
+
+# Upper bound on one vector.add_to_vector_db message; librdkafka rejects messages over message.max.bytes
+# (1MB by default) and a 1536-dim vector is ~35KB of JSON, so a batch holds ~25 vectors
+VECTOR_MESSAGE_MAX_BYTES = int(env("VECTOR_MESSAGE_MAX_BYTES", "900000"))
+
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+# Each retriever returns more candidates than top_k so fusion has something to re-order
+HYBRID_CANDIDATE_MULTIPLIER = 3
+
 class Vector:
+    # One JSON message per batch of vectors, each vector serialized once and batches cut by encoded size
+    @staticmethod
+    def _batch_vector_messages(namespace: str, vector_data: list[dict[str, Any]]) -> Iterator[bytes]:
+        prefix = json.dumps({"operation": "add_to_vector_db", "namespace": namespace})[:-1].encode("utf-8") + b', "vector_data": ['
+        suffix = b"]}"
+
+        batch: list[bytes] = []
+        batch_size = len(prefix) + len(suffix)
+
+        for vector in vector_data:
+            encoded_vector = json.dumps(vector).encode("utf-8")
+
+            if batch and batch_size + len(encoded_vector) + 1 > VECTOR_MESSAGE_MAX_BYTES:
+                yield prefix + b",".join(batch) + suffix
+
+                batch = []
+                batch_size = len(prefix) + len(suffix)
+
+            batch.append(encoded_vector)
+            batch_size += len(encoded_vector) + 1
+
+        if batch:
+            yield prefix + b",".join(batch) + suffix
+
     @staticmethod
     def convert_to_vector_embed(texts: list[str]) -> list[list[float]]:
-        response = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts,
-        )
-    
-        return [e.embedding for e in response.data]
+        return embedding_client.embed_sync(texts)
+
+    @staticmethod
+    async def convert_to_vector_embed_async(texts: list[str]) -> list[list[float]]:
+        return await embedding_client.embed_async(texts)
 
     @staticmethod
     def add_to_vector_db(texts: list[str], vector_embeds: list[list[float]]) -> str | bool:
         try:
             namespace = str(uuid.uuid4())
-            count = 0
             
-            for text, vector_embed in zip(texts, vector_embeds):
-                vector_id = namespace + "_vector_" + str(count)
-                
-                message = {
-                    "operation": "add_to_vector_db",
-                    "namespace": namespace,
-                    "vector_data": [{
-                        "id": vector_id,
-                        "values": vector_embed,
-                        "metadata": {"original_text": text},
-                    }],
+            vector_data = [
+                {
+                    "id": namespace + "_vector_" + str(count),
+                    "values": vector_embed,
+                    "metadata": {"original_text": text},
                 }
-        
-                kafka_producer.produce(
+                for count, (text, vector_embed) in enumerate(zip(texts, vector_embeds))
+            ]
+            
+            # Registered before anything is produced, so a namespace left half-written by a failed produce is still swept
+            namespace_registry.register(namespace, len(vector_data))
+            
+            # One message (and one Pinecone upsert) per batch of vectors, and a single flush for all of them
+            for message in Vector._batch_vector_messages(namespace, vector_data):
+                get_kafka_producer().produce(
                     topic="vector.add_to_vector_db",
-                    value=json.dumps(message).encode("utf-8"),
+                    value=message,
                 )
                 
-                kafka_producer.flush()
-                
-                count += 1
+            get_kafka_producer().flush()
+            
+            lexical_indexes.put(namespace, BM25Index(
+                [vector["id"] for vector in vector_data],
+                [vector["metadata"]["original_text"] for vector in vector_data],
+                [vector["metadata"] for vector in vector_data],
+            ))
         
             return namespace
     
@@ -57,42 +98,130 @@ class Vector:
 
     @staticmethod
     def convert_query_to_vector_embed(query: str) -> list[float]:
-        response = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=query,
-        )
-    
-        return response.data[0].embedding
+        return embedding_client.embed_sync([query])[0]
+
+    @staticmethod
+    async def convert_query_to_vector_embed_async(query: str) -> list[float]:
+        return (await embedding_client.embed_async([query]))[0]
 
     @staticmethod
-    def query_from_vector_db(vector_query: list[float], namespace: str) -> list[str] | bool:
+    def query_from_vector_db(
+        vector_query: list[float],
+        namespace: str,
+        query_text: str = "",
+        top_k: int = 5,
+        metadata_filter: Optional[dict[str, Any]] = None,
+    ) -> list[dict[str, Any]] | bool:
+        
         try:
-            results = PC_INDEX.query(
+            namespace_registry.touch(namespace)
+            
+            candidate_count = top_k * HYBRID_CANDIDATE_MULTIPLIER
+            
+            dense_results = get_pinecone_index().query(
                 vector=vector_query,
                 namespace=namespace,
-                top_k=5,
+                top_k=candidate_count,
+                filter=metadata_filter,
                 include_metadata=True,
                 include_values=False,
             )
+            
+            hits: dict[str, dict[str, Any]] = {}
+            
+            for rank, result in enumerate(dense_results["matches"], start=1):
+                hits[result["id"]] = {
+                    "id": result["id"],
+                    "text": result["metadata"]["original_text"],
+                    "metadata": result["metadata"],
+                    "score": 1 / (RRF_K + rank),
+                    "dense_rank": rank,
+                    "dense_score": result["score"],
+                    "lexical_rank": None,
+                    "lexical_score": None,
+                }
+            
+            # The BM25 index only exists on the worker that indexed the namespace; elsewhere this is dense-only
+            lexical_index = lexical_indexes.get(namespace) if query_text else None
+            
+            if lexical_index is not None:
+                for rank, (doc, lexical_score) in enumerate(
+                    lexical_index.search(query_text, candidate_count, metadata_filter),
+                    start=1,
+                ):
+                    doc_id = lexical_index.doc_ids[doc]
+                    
+                    hit = hits.setdefault(doc_id, {
+                        "id": doc_id,
+                        "text": lexical_index.texts[doc],
+                        "metadata": lexical_index.metadatas[doc],
+                        "score": 0.0,
+                        "dense_rank": None,
+                        "dense_score": None,
+                    })
+                    
+                    hit["score"] += 1 / (RRF_K + rank)
+                    hit["lexical_rank"] = rank
+                    hit["lexical_score"] = lexical_score
         
-            return [
-                f"{count}. {result['metadata']['original_text']}" 
-                for count, result in enumerate(results['matches'], start=1)
-            ]
+            return sorted(hits.values(), key=lambda hit: hit["score"], reverse=True)[:top_k]
     
         except Exception:
             return False
 
     @staticmethod
-    def delete_from_vector_db(namespace: str) -> None:
+    def _produce_delete(namespace: str) -> None:
         message = {
             "operation": "delete_from_vector_db",
             "namespace": namespace,
         }
     
-        kafka_producer.produce(
+        get_kafka_producer().produce(
             topic="vector.delete_from_vector_db",
             value=json.dumps(message).encode("utf-8"),
         )
-    
-        kafka_producer.flush()
+
+    @staticmethod
+    def delete_from_vector_db(namespace: str) -> None:
+        namespace_registry.unregister(namespace)
+        lexical_indexes.drop(namespace)
+        
+        Vector._produce_delete(namespace)
+        get_kafka_producer().flush()
+
+# Garbage-collects namespaces whose TTL lapsed (abandoned sessions never call delete_from_vector_db).
+# Deletes go through the existing Kafka topic, paced at NAMESPACE_DELETE_RPS.
+def run_namespace_sweeper():
+    while True:
+        claimed = []
+
+        try:
+            claimed = namespace_registry.claim_expired(NAMESPACE_SWEEP_BATCH)
+
+            for namespace, _ in claimed:
+                Vector._produce_delete(namespace)
+                time.sleep(1.0 / NAMESPACE_DELETE_RPS)
+
+            if claimed:
+                get_kafka_producer().flush()
+
+            # Only dropped once the deletes are out; the BM25 index may live on this worker
+            for namespace, _ in claimed:
+                lexical_indexes.drop(namespace)
+
+            # A full batch means there is a backlog, so keep going without waiting for the next interval
+            if len(claimed) < NAMESPACE_SWEEP_BATCH:
+                time.sleep(NAMESPACE_SWEEP_INTERVAL)
+
+        except Exception:
+            logger.exception("Namespace sweep failed, requeueing %d claimed namespaces", len(claimed))
+
+            # The claim already took them out of the registry; without this they would never be deleted.
+            # Any delete that did go out is harmless to repeat.
+            try:
+                namespace_registry.requeue(claimed)
+
+            except Exception:
+                logger.exception("Requeueing claimed namespaces failed: %s", [namespace for namespace, _ in claimed])
+
+            time.sleep(NAMESPACE_SWEEP_INTERVAL)
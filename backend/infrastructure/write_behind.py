@@ -0,0 +1,161 @@
+import atexit
+import logging
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Buffered rows are kept as (row, failed writes) so a row that keeps failing on its own can be dropped
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        flush_fn: Callable[[list[dict[str, Any]]], None],
+        max_rows: int = 200,
+        max_delay_ms: int = 500,
+        max_pending: int = 50000,
+        max_attempts: int = 5,
+        is_transient_error: Callable[[Exception], bool] = lambda error: False,
+    ):
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.is_transient_error = is_transient_error
+
+        self.dropped = 0
+
+        self._rows: list[tuple[dict[str, Any], int]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+            atexit.register(self.close)
+
+    def add(self, row: dict[str, Any]) -> bool:
+        if self._stop.is_set():
+            return False
+
+        self._ensure_started()
+
+        with self._lock:
+            if len(self._rows) >= self.max_pending:
+                return False
+
+            self._rows.append((row, 0))
+            should_flush = len(self._rows) >= self.max_rows
+
+        if should_flush:
+            self._wake.set()
+
+        return True
+
+    def discard(self, predicate: Callable[[dict[str, Any]], bool]) -> int:
+        # Holding the flush lock means no matching row is mid-flush when this returns
+        with self._flush_lock:
+            with self._lock:
+                kept_rows = [entry for entry in self._rows if not predicate(entry[0])]
+                discarded_count = len(self._rows) - len(kept_rows)
+                self._rows = kept_rows
+
+        return discarded_count
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    # Writes the entries, bisecting a failed batch until the rows that fail it are alone. Returns the number
+    # of rows written and the entries to retry, in buffer order. A transient error (e.g. the database is
+    # unreachable) says nothing about the rows, so everything not written yet is retried without counting it.
+    def _write(self, entries: list[tuple[dict[str, Any], int]]) -> tuple[int, list[tuple[dict[str, Any], int]]]:
+        written_count = 0
+        retry_entries = []
+        batches = [entries]
+
+        while batches:
+            batch = batches.pop()
+
+            try:
+                self.flush_fn([row for row, _ in batch])
+                written_count += len(batch)
+                continue
+
+            except Exception as error:
+                if self.is_transient_error(error):
+                    retry_entries.extend(batch)
+
+                    while batches:
+                        retry_entries.extend(batches.pop())
+
+                    break
+
+                if len(batch) > 1:
+                    middle = len(batch) // 2
+                    batches.append(batch[middle:])
+                    batches.append(batch[:middle])
+                    continue
+
+                row, failed_writes = batch[0]
+
+                if failed_writes + 1 < self.max_attempts:
+                    retry_entries.append((row, failed_writes + 1))
+                    continue
+
+                self.dropped += 1
+                logger.error("Dropping a buffered row after %d failed writes", self.max_attempts, exc_info=error)
+
+        return written_count, retry_entries
+
+    def flush(self) -> int:
+        # Only one flush in flight at a time so rows are written in the order they were buffered
+        with self._flush_lock:
+            with self._lock:
+                entries, self._rows = self._rows, []
+
+            if not entries:
+                return 0
+
+            written_count, retry_entries = self._write(entries)
+
+            if retry_entries:
+                # Put them back in front of anything buffered since, within the pending cap
+                with self._lock:
+                    self._rows = (retry_entries + self._rows)[-self.max_pending:]
+
+            return written_count
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.max_delay)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+
+        self._stop.set()
+        self._wake.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+
+        # A few attempts so a transient DB error at shutdown doesn't drop the tail of the buffer
+        for _ in range(3):
+            if not self.pending():
+                break
+
+            self.flush()
@@ -1,10 +1,93 @@
+import time
 import threading
+from contextlib import asynccontextmanager
 
-from infrastructure.messaging import run_consumer
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from .config import get_s3_client, get_pinecone_index, check_s3, check_pinecone
+from .routers import search, llm, auth, images, maps
+from .infrastructure.messaging import run_consumer, get_kafka_producer, get_kafka_consumer, check_kafka, close_kafka
+from .infrastructure.db import search_history_buffer, check_database
+from .infrastructure.passwords import password_hasher, PasswordHasherOverloaded, PASSWORD_HASH_RETRY_AFTER
+from .infrastructure.near_cache import session_near_cache
+from .infrastructure.redis_client import get_redis_client, check_redis
+from .infrastructure.vector import run_namespace_sweeper
+from .infrastructure.lifecycle import Lifecycle
+from .infrastructure.telemetry import configure_logging, observe_stage, render_metrics
+from .infrastructure.responses import CompressionMiddleware
 
 # initalize classes from infrastructure and services here
 
-@app.on_event("startup")
-def start_kafka_consumer():
-    thread = threading.Thread(target=run_consumer, daemon=True)
-    thread.start()
+configure_logging()
+
+# Every client below is created here, in parallel and under STARTUP_TIMEOUT, rather than at import.
+# Search needs Postgres and Redis; without the others the worker still serves, minus RAG indexing and uploads.
+lifecycle = Lifecycle()
+lifecycle.register("postgres", start=search.database.init_models, check=check_database)
+lifecycle.register("redis", start=check_redis, check=check_redis)
+lifecycle.register("pinecone", start=get_pinecone_index, check=check_pinecone, required=False)
+lifecycle.register("s3", start=get_s3_client, check=check_s3, required=False)
+lifecycle.register("kafka", start=lambda: (get_kafka_producer(), get_kafka_consumer()), check=check_kafka, stop=close_kafka, required=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await lifecycle.startup()
+
+    if lifecycle.is_ready("kafka"):
+        threading.Thread(target=run_consumer, daemon=True).start()
+        threading.Thread(target=run_namespace_sweeper, daemon=True).start()
+
+    session_near_cache.start_invalidation_listener(get_redis_client())
+
+    yield
+
+    search.prefetcher.shutdown()
+    search_history_buffer.close()
+    password_hasher.shutdown()
+
+    await lifecycle.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+app.include_router(search.router)
+app.include_router(llm.router)
+app.include_router(auth.router)
+app.include_router(images.router)
+app.include_router(maps.router)
+
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency; for streaming routes this is time to first byte, the stream itself is traced in its stages
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    outcome = "error"
+
+    try:
+        response = await call_next(request)
+        outcome = "error" if response.status_code >= 500 else "ok"
+
+        return response
+
+    finally:
+        route = request.scope.get("route")
+        observe_stage(f"http {request.method} {route.path if route else 'unmatched'}", time.perf_counter() - start, outcome)
+
+@app.exception_handler(PasswordHasherOverloaded)
+async def password_hasher_overloaded(request: Request, exc: PasswordHasherOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "We're handling a lot of sign-ins right now, please try again in a moment"},
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    healthy, components = await lifecycle.health()
+    return JSONResponse(status_code=200 if healthy else 503, content={"healthy": healthy, "components": components})
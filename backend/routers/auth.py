@@ -4,4 +4,24 @@
 
 # if the user successfully logs in, in this file, call the redis session class method to update the user_id. make sure the api route asks for a query parameter of the cookie session_id
 # the only way that a user can log out is by clicking on the "log out" button. make a logout route. call the redis method here to update the user_id to -1 again. the frontend will detect that the user_id is now -1, and it will begin calling the routes to fetch the logged_out_search_history and user preferences again
-# if the function returns falsy, send a notice to the user
\ No newline at end of file
+# if the function returns falsy, send a notice to the user
+from typing import Optional
+
+from fastapi import APIRouter
+
+from .search import redis_session
+
+router = APIRouter()
+
+@router.post("/session")
+def get_or_create_session(session_key: Optional[str] = None):
+    if session_key:
+        session = redis_session.get_session(session_key)
+
+        if session:
+            return {"session_key": session_key, "session": session}
+
+    # No cookie, or the session expired: start a fresh logged-out session
+    session_key = redis_session.add_new_session()
+
+    return {"session_key": session_key, "session": redis_session.get_session(session_key)}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..services.image_proxy import image_proxy, ImageProxyError, WIDTHS
+from ..infrastructure.rate_limit import rate_limit
+from ..infrastructure.responses import etag_matches
+
+router = APIRouter()
+
+# Variants are keyed by source URL, width and format, so the response never changes for a given URL + Accept
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/image", dependencies=[Depends(rate_limit("image"))])
+def proxy_image(request: Request, url: str, width: int = Query(WIDTHS[3], ge=1, le=WIDTHS[-1])):
+    try:
+        key, image_format = image_proxy.get_variant(url, width, request.headers.get("accept", ""))
+        headers = {"ETag": f'"{key}"', "Cache-Control": IMAGE_CACHE_CONTROL, "Vary": "Accept"}
+
+        # The key is derived from the request alone, so a revalidation never reads the disk cache or refetches
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        image, image_format, key = image_proxy.get_image(url, width, request.headers.get("accept", ""))
+
+    except ImageProxyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return Response(content=image, media_type=f"image/{image_format}", headers=headers)
@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from .search import brave, redis_session, get_safesearch_mode, get_request_session
+from ..services.rag import rag_pipeline
+from ..services.openrouter import OpenRouterError
+from ..infrastructure.vector import Vector
+from ..infrastructure.semantic_cache import semantic_cache, normalize_query
+from ..infrastructure.rate_limit import rate_limit
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def format_event(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Server-sent events: "delta" per piece of the answer, then "done", or "error" if the LLM stream breaks off
+def stream_answer_events(deltas: Iterator[str]) -> Iterator[str]:
+    try:
+        for delta in deltas:
+            yield format_event("delta", {"text": delta})
+
+    except OpenRouterError:
+        logger.warning("Answer stream was interrupted", exc_info=True)
+        yield format_event("error", {"detail": "The answer was cut off, please try again"})
+        return
+
+    yield format_event("done", {})
+
+@router.get("/llm/answer", dependencies=[Depends(rate_limit("llm"))])
+def answer(request: Request, query: str, session_key: str):
+    session = get_request_session(request, session_key)
+
+    if not session:
+        raise HTTPException(status_code=401, detail="Your session has expired, please refresh the page")
+
+    safesearch_mode = get_safesearch_mode(session)
+    partition_key = f"web:{safesearch_mode}"
+
+    # Normally a cache hit: the frontend requests the answer right after /search
+    results = semantic_cache.get_or_fetch(
+        "web",
+        partition_key,
+        query,
+        Vector.convert_query_to_vector_embed,
+        lambda: brave.get_web_results(query, safesearch_mode),
+    )
+
+    if not results:
+        raise HTTPException(
+            status_code=502,
+            detail="Something went wrong with our system, please check your connection and try again",
+        )
+
+    snippets = results["extra_snippets"] + [
+        web_res["snippet"]
+        for web_res in results["search_results"]["web_results"]
+        if web_res["snippet"]
+    ]
+
+    previous_namespace = session.get("last_pinecone_vector_namespace", "")
+
+    def on_indexed(namespace: str) -> None:
+        redis_session.modify_session(session_key, updated_pinecone_vector_namespace=namespace)
+
+        if previous_namespace:
+            Vector.delete_from_vector_db(previous_namespace)
+
+    try:
+        deltas = rag_pipeline.stream_answer(
+            f"{partition_key}:{normalize_query(query)}",
+            query,
+            snippets,
+            on_indexed=on_indexed,
+            follow_up_namespace=previous_namespace,
+        )
+
+    except OpenRouterError:
+        logger.warning("Answer could not be started", exc_info=True)
+
+        raise HTTPException(
+            status_code=502,
+            detail="The answer could not be generated right now, please try again",
+        )
+
+    return StreamingResponse(stream_answer_events(deltas), media_type="text/event-stream")
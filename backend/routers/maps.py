@@ -0,0 +1,32 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from ..services.mapbox import mapbox
+
+router = APIRouter()
+
+@router.get("/map/places")
+def places_in_view(
+    south: float = Query(ge=-90, le=90),
+    west: float = Query(ge=-180, le=180),
+    north: float = Query(ge=-90, le=90),
+    east: float = Query(ge=-180, le=180),
+    kind: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+):
+    return mapbox.get_places_in_view(south, west, north, east, kind, limit)
+
+@router.get("/map/nearby")
+def nearby_places(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    kind: Optional[str] = None,
+    max_distance_km: Optional[float] = Query(None, gt=0),
+):
+    return mapbox.get_nearby_places(lat, lon, k, kind, max_distance_km)
+
+@router.get("/map/near")
+def near_query(query: str, k: int = Query(10, ge=1, le=100)):
+    return mapbox.get_near_query_results(query, k)
@@ -4,4 +4,151 @@
 # search on google for reference: openrouter api streaming python fastapi to frontend exxmaple
 # post endpoint will be sent back as a package, with brave search results and brave image results (images displayed on right side)
 # in the same route that calls the brave api, in the end of the route, if the user isn't logged in, update the redis session and store the user query to the logged out search history; if they are logged in, call the rds method for entering the user query to the user_search_history. do this by asking for a query parameter of the session id
-# if the function returns falsy, send a notice to the user; make sure it tells all possible scenarios ex: make sure to use a compatible file type (.jpeg, .pdf, .png, .jpg) and/or check your connection, something went wrong with our system, etc.
\ No newline at end of file
+# if the function returns falsy, send a notice to the user; make sure it tells all possible scenarios ex: make sure to use a compatible file type (.jpeg, .pdf, .png, .jpg) and/or check your connection, something went wrong with our system, etc.
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ..services.brave import Brave
+from ..services.reranker import reranker
+from ..services.prefetch import Prefetcher
+from ..infrastructure.db import Database
+from ..infrastructure.sessions import RedisSession
+from ..infrastructure.vector import Vector
+from ..infrastructure.semantic_cache import semantic_cache
+from ..infrastructure.rank_profiles import rank_profile_store, UserRankProfile
+from ..infrastructure.telemetry import span
+from ..infrastructure.rate_limit import rate_limit
+from ..infrastructure.responses import conditional_json_response, encode_bundle, etag_matches, make_etag, not_modified_response
+
+router = APIRouter()
+
+brave = Brave()
+database = Database()
+redis_session = RedisSession()
+prefetcher = Prefetcher(brave)
+
+# The session the rate_limit dependency already loaded, or a fresh read if it could not
+def get_request_session(request: Request, session_key: str) -> dict:
+    session = getattr(request.state, "session", None)
+
+    return session if session is not None else redis_session.get_session(session_key)
+
+# allow_cached takes a signed-in user's mode from the session, as last written by /search; good enough for
+# speculative work such as prefetching, while /search and /llm/answer read the preference itself
+def get_safesearch_mode(session: dict, allow_cached: bool = False) -> str:
+    user_id = int(session["user_id"])
+
+    if user_id == -1:
+        return session["logged_out_safesearch"]
+
+    if allow_cached and session.get("user_safesearch"):
+        return session["user_safesearch"]
+
+    preferences = database.read_user_preference(user_id)
+
+    return preferences["safesearch"] if preferences else "moderate"
+
+# A signed-in user's ranking depends on the shared bundle and their rank profile, so the validator is derived from
+# both and is known before re-ranking; num_searches changes with every profile update
+def get_results_etag(results: dict, user_id: int, profile: Optional[UserRankProfile]) -> str:
+    _, shared_etag = encode_bundle(results, shared=True)
+
+    if user_id == -1:
+        return shared_etag
+
+    return make_etag(shared_etag, str(user_id), str(profile.num_searches if profile else 0))
+
+def record_search(session: dict, session_key: str, user_id: int, query: str, safesearch_mode: str) -> None:
+    if user_id == -1:
+        redis_session.modify_session(session_key, new_query=query)
+        return
+
+    database.log_user_search(user_id, query)
+
+    if session.get("user_safesearch") != safesearch_mode:
+        redis_session.modify_session(session_key, updated_user_safesearch=safesearch_mode)
+
+@router.get("/search", dependencies=[Depends(rate_limit("search"))])
+def search(request: Request, query: str, session_key: str):
+    session = get_request_session(request, session_key)
+
+    if not session:
+        raise HTTPException(status_code=401, detail="Your session has expired, please refresh the page")
+
+    user_id = int(session["user_id"])
+    safesearch_mode = get_safesearch_mode(session)
+    partition_key = f"web:{safesearch_mode}"
+    profile = rank_profile_store.get_profile(user_id) if user_id != -1 else None
+
+    # A revalidation of results that are still cached is answered from their ETag, before the prefetch join, the
+    # embedding and fetch, the re-rank or any encoding
+    results = (
+        semantic_cache.lookup_exact(partition_key, query, count_miss=False)
+        if request.headers.get("if-none-match") else None
+    )
+
+    if results is not None:
+        etag = get_results_etag(results, user_id, profile)
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            record_search(session, session_key, user_id, query, safesearch_mode)
+            return not_modified_response(etag)
+
+    else:
+        # Usually the suggestion the user just picked; wait for its prefetch rather than fetching it twice
+        prefetcher.join(partition_key, query)
+
+        # Cached bundles are shared between users and near-identical queries, so never mutate them here
+        with span("search.results"):
+            results = semantic_cache.get_or_fetch(
+                "web",
+                partition_key,
+                query,
+                Vector.convert_query_to_vector_embed,
+                lambda: brave.get_web_results(query, safesearch_mode),
+            )
+
+    if not results:
+        raise HTTPException(
+            status_code=502,
+            detail="Something went wrong with our system, please check your connection and try again",
+        )
+
+    record_search(session, session_key, user_id, query, safesearch_mode)
+
+    if user_id == -1:
+        return conditional_json_response(request, results, shared=True)
+
+    with span("search.rerank"):
+        web_results = reranker.rerank(results["search_results"]["web_results"], profile)
+
+    return conditional_json_response(request, {
+        **results,
+        "search_results": {
+            **results["search_results"],
+            "web_results": web_results,
+        },
+    }, etag=get_results_etag(results, user_id, profile))
+
+@router.get("/search/suggest", dependencies=[Depends(rate_limit("suggest"))])
+def suggest(request: Request, query: str, session_key: Optional[str] = None):
+    # Suggestions are prefix-driven, so only literal repeats are reused; an embedding per keystroke would cost more than it saves
+    suggestions = semantic_cache.lookup_exact("suggest", query)
+
+    if suggestions is None:
+        suggestions = brave.get_suggest_results(query)
+
+        if suggestions:
+            semantic_cache.store("suggest", query, None, suggestions)
+
+    if suggestions is False:
+        raise HTTPException(status_code=502, detail="Something went wrong with our system, please try again")
+
+    # Without a session there is no way to tell when the user diverges from the suggestions, so no prefetch
+    session = get_request_session(request, session_key) if session_key and suggestions else None
+
+    if session:
+        prefetcher.on_suggest(session_key, query, suggestions, get_safesearch_mode(session, allow_cached=True))
+
+    return suggestions
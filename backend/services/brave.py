@@ -1,18 +1,32 @@
 import os
+import time
+import logging
 from socket import getservbyport
+from typing import Optional
 
 import requests as req
 from dotenv import load_dotenv
 
-from .wiki import get_wiki_result
-from .tripadvisor import get_place_results
-from .tmdb import get_tmdb_results
+from .wiki import Wiki
+from .tripadvisor import Tripadvisor
+from .tmdb import TMDB
+from .image_proxy import proxied_image_url, THUMBNAIL_WIDTH
+from ..infrastructure.telemetry import span, traced, query_digest
 
 load_dotenv()
 env = os.getenv
 
+logger = logging.getLogger(__name__)
+
+# Overridable so benchmarks can point the service at benchmarks/mock_upstream.py
+BRAVE_API_BASE_URL = env("BRAVE_API_BASE_URL", "https://api.search.brave.com/res/v1")
+
 class Brave:
     def __init__(self):
+        self.wiki = Wiki()
+        self.tripadvisor = Tripadvisor()
+        self.tmdb = TMDB()
+
         self.search_headers = {
             "X-Subscription-Token": env("BRAVE_SEARCH_API_KEY"),
             "User-Agent": f"HuggyPanda/0.1.0 (https://huggypanda.com; {env("EMAIL")})",
@@ -21,6 +35,10 @@ class Brave:
             "Accept-Language": "en-US",
         }
         
+        # Latest search quota reported by Brave, read by the prefetcher before spending any of it
+        self.quota_remaining: Optional[int] = None
+        self.rate_limited_until = 0.0
+
         self.suggest_headers = {
             "X-Subscription-Token": env("BRAVE_SUGGEST_API_KEY"),
             "User-Agent": f"HuggyPanda/0.1.0 (https://huggypanda.com; {env("EMAIL")})",
@@ -30,8 +48,30 @@ class Brave:
         }
         
     def _get_url(self, search_type: str) -> str:
-        return f"https://api.search.brave.com/res/v1/{search_type}/search"
+        return f"{BRAVE_API_BASE_URL}/{search_type}/search"
+
+    # Brave reports one comma-separated value per window, shortest first, e.g. "1, 14820" for per-second and per-month
+    def _record_quota(self, res: req.Response) -> None:
+        try:
+            remaining = res.headers.get("X-RateLimit-Remaining")
+
+            if remaining:
+                self.quota_remaining = int(remaining.split(",")[-1])
+
+            if res.status_code == 429:
+                reset = res.headers.get("X-RateLimit-Reset", "1")
+                self.rate_limited_until = time.monotonic() + max(1, int(reset.split(",")[0]))
+
+        except ValueError:
+            pass
+
+    def has_spare_quota(self, min_remaining: int) -> bool:
+        if time.monotonic() < self.rate_limited_until:
+            return False
+
+        return self.quota_remaining is None or self.quota_remaining >= min_remaining
             
+    @traced("brave.web")
     def get_web_results(
         self,
         query: str,
@@ -39,18 +79,22 @@ class Brave:
     ) -> dict[str, dict[str, str] | list[dict[str, str]]] | bool:
         
         try:
-            res = req.get(
-                self._get_url("web"),
-                headers=self.search_headers,
-                params={
-                    "q": query,
-                    "safesearch": safesearch_mode,
-                    "units": "imperial",
-                    "extra_snippets": True,
-                },
-            )
+            with span("brave.web.http"):
+                res = req.get(
+                    self._get_url("web"),
+                    headers=self.search_headers,
+                    params={
+                        "q": query,
+                        "safesearch": safesearch_mode,
+                        "units": "imperial",
+                        "extra_snippets": True,
+                    },
+                )
+
+            self._record_quota(res)
             
             if res.status_code != 200:
+                logger.warning("Brave web search returned %s for query %s", res.status_code, query_digest(query))
                 return False
             
             data = res.json()
@@ -84,11 +128,11 @@ class Brave:
                         "url_path_from_homepage_to_result": news_res["meta_url"]["path"],
                         "is_breaking_news": news_res["breaking"],
                         "is_live": news_res["is_live"],
-                        "thumbnail": news_res["thumbnail"]["original"],
+                        "thumbnail": proxied_image_url(news_res["thumbnail"]["original"], THUMBNAIL_WIDTH),
                         "age": news_res["age"],
                     })
                     
-                    extra_snippets + news_res["extra_snippets"]
+                    extra_snippets.extend(news_res.get("extra_snippets", []))
                 
                 search_results["news_cluster"] = news_res_filtered
                     
@@ -131,7 +175,7 @@ class Brave:
                 
                 if site_name == "Wikipedia":
                     if "- Wikipedia" in title:
-                        wiki_result = get_wiki_result(title, url)
+                        wiki_result = self.wiki.get_wiki_result(title, url)
 
                         if "wikipedia" not in blended_results:
                             blended_results["wikipedia"] = []
@@ -145,7 +189,7 @@ class Brave:
                     title_lower = title.lower()
                     
                     if "all you" in title_lower or "before you go" in title_lower:
-                        tripadvisor_results = get_place_results(title_lower, from_title=True)
+                        tripadvisor_results = self.tripadvisor.get_place_results(title_lower, from_title=True)
                         
                         if "tripadvisor" not in blended_results:
                             blended_results["tripadvisor"] = []
@@ -154,7 +198,7 @@ class Brave:
                 
                 if site_name == "IMDb":
                     if "(" in title and "|" in title:
-                        tmdb_result = get_tmdb_results(title)
+                        tmdb_result = self.tmdb.get_tmdb_results(title)
                         
                         if "tmdb" not in blended_results:
                             blended_results["tmdb"] = []
@@ -233,10 +277,10 @@ class Brave:
                     "site_homepage": web_res["meta_url"]["hostname"],
                     "url_path_from_homepage_to_result": web_res["meta_url"]["path"],
                     "age": web_res["age"] if web_res["age"] else "",
-                    "thumbnail": web_res["thumbnail"]["original"] if web_res["thumbnail"] else "",
+                    "thumbnail": proxied_image_url(web_res["thumbnail"]["original"], THUMBNAIL_WIDTH) if web_res["thumbnail"] else "",
                 })
                 
-                extra_snippets + web_res["extra_snippets"]
+                extra_snippets.extend(web_res.get("extra_snippets", []))
             
             search_results["web_results"] = web_res_filtered
             
@@ -281,7 +325,7 @@ class Brave:
                         .replace(" at ", "")
                     )
                     
-                    tripadvisor_results = get_place_results(filtered_query)
+                    tripadvisor_results = self.tripadvisor.get_place_results(filtered_query)
                     
                     if "tripadvisor" not in blended_results:
                         blended_results["tripadvisor"] = []
@@ -320,7 +364,7 @@ class Brave:
                         .replace(" at ", "")
                     )
                         
-                    tripadvisor_results = get_place_results(filtered_query, True)
+                    tripadvisor_results = self.tripadvisor.get_place_results(filtered_query, True)
                     
                     if "tripadvisor" not in blended_results:
                         blended_results["tripadvisor"] = []
@@ -334,8 +378,10 @@ class Brave:
             }
         
         except Exception:
+            logger.exception("Brave web search failed for query %s", query_digest(query))
             return False
 
+    @traced("brave.suggest")
     def get_suggest_results(self, query: str) -> list[str] | bool:
         try:
             res = req.get(
@@ -348,6 +394,7 @@ class Brave:
             )
 
             if res.status_code != 200:
+                logger.warning("Brave suggest returned %s for query %s", res.status_code, query_digest(query))
                 return []
             
             data = res.json()
@@ -360,4 +407,5 @@ class Brave:
             return suggested_queries
         
         except Exception:
+            logger.exception("Brave suggest failed for query %s", query_digest(query))
             return False
@@ -0,0 +1,107 @@
+import re
+import hashlib
+
+import numpy as np
+
+from ..infrastructure.tokens import estimate_tokens
+
+NORMALIZE_PATTERN = re.compile(r"[^a-z0-9]+")
+
+SHINGLE_SIZE = 2
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+NEAR_DUPLICATE_JACCARD = 0.7
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; products stay below 2**64
+MINHASH_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240607)
+_MINHASH_A = _rng.integers(1, 2**32 - 5, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_MINHASH_B = _rng.integers(0, 2**32 - 5, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+def normalize_text(text: str) -> str:
+    return NORMALIZE_PATTERN.sub(" ", text.lower()).strip()
+
+def _shingle_hashes(normalized_text: str) -> np.ndarray:
+    words = normalized_text.split()
+
+    if len(words) > SHINGLE_SIZE:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    else:
+        shingles = {normalized_text}
+
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big") for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+def minhash(normalized_text: str) -> np.ndarray:
+    shingle_hashes = _shingle_hashes(normalized_text)
+
+    # (permutations x shingles) in one vectorized pass, then the minimum per permutation
+    return ((_MINHASH_A[:, None] * shingle_hashes[None, :] + _MINHASH_B[:, None]) % MINHASH_PRIME).min(axis=1)
+
+# Exact duplicates are caught by hashing the normalized text; near duplicates (syndicated copies with
+# small edits) by MinHash signatures over word shingles. LSH banding (16 bands x 4 rows) limits the
+# full signature comparison to texts that collide in at least one band.
+def dedupe_texts(texts: list[str]) -> tuple[list[str], dict[str, int]]:
+    seen_digests = set()
+    band_buckets: dict[tuple[int, bytes], list[int]] = {}
+    kept_signatures: list[np.ndarray] = []
+    kept_texts = []
+
+    exact_duplicates = 0
+    near_duplicates = 0
+    input_tokens = 0
+    kept_tokens = 0
+
+    for text in texts:
+        text_tokens = estimate_tokens(text)
+        input_tokens += text_tokens
+
+        normalized_text = normalize_text(text)
+
+        if not normalized_text:
+            continue
+
+        digest = hashlib.blake2b(normalized_text.encode("utf-8"), digest_size=16).digest()
+
+        if digest in seen_digests:
+            exact_duplicates += 1
+            continue
+
+        seen_digests.add(digest)
+
+        signature = minhash(normalized_text)
+        signature_bands = [
+            (band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes())
+            for band in range(LSH_BANDS)
+        ]
+
+        candidates = {candidate for band in signature_bands for candidate in band_buckets.get(band, ())}
+
+        # Fraction of equal MinHash values estimates the Jaccard similarity of the shingle sets
+        if any(
+            np.count_nonzero(kept_signatures[candidate] == signature) / MINHASH_PERMUTATIONS >= NEAR_DUPLICATE_JACCARD
+            for candidate in candidates
+        ):
+            near_duplicates += 1
+            continue
+
+        for band in signature_bands:
+            band_buckets.setdefault(band, []).append(len(kept_signatures))
+
+        kept_signatures.append(signature)
+        kept_texts.append(text)
+        kept_tokens += text_tokens
+
+    return kept_texts, {
+        "input_count": len(texts),
+        "kept_count": len(kept_texts),
+        "exact_duplicates": exact_duplicates,
+        "near_duplicates": near_duplicates,
+        "input_tokens": input_tokens,
+        "kept_tokens": kept_tokens,
+        "tokens_saved": input_tokens - kept_tokens,
+    }
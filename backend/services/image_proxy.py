@@ -0,0 +1,236 @@
+import os
+import re
+import logging
+import time
+import threading
+from io import BytesIO
+from typing import Optional
+from urllib.parse import urlencode, urljoin, urlsplit
+
+import requests as req
+from dotenv import load_dotenv
+from PIL import Image, ImageOps, features
+
+from ..infrastructure.disk_cache import DiskLRUCache
+from ..infrastructure.telemetry import span, traced
+
+load_dotenv()
+env = os.getenv
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = env("IMAGE_CACHE_DIR", "/tmp/huggypanda-images")
+IMAGE_CACHE_MAX_BYTES = int(env("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Per connect / read timeout, and a cap on the whole fetch including redirects so a slow drip cannot hold a worker
+IMAGE_FETCH_TIMEOUT = float(env("IMAGE_FETCH_TIMEOUT", "5"))
+IMAGE_FETCH_DEADLINE = float(env("IMAGE_FETCH_DEADLINE", "10"))
+IMAGE_MAX_REDIRECTS = int(env("IMAGE_MAX_REDIRECTS", "3"))
+IMAGE_MAX_SOURCE_BYTES = int(env("IMAGE_MAX_SOURCE_BYTES", str(20 * 1024 ** 2)))
+IMAGE_MAX_SOURCE_PIXELS = int(env("IMAGE_MAX_SOURCE_PIXELS", str(40_000_000)))
+WEBP_QUALITY = int(env("IMAGE_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(env("IMAGE_AVIF_QUALITY", "60"))
+
+# Only hosts the providers return images from, so the endpoint is not an open proxy. Checked on every redirect hop too.
+ALLOWED_HOSTS = frozenset(env(
+    "IMAGE_PROXY_ALLOWED_HOSTS",
+    "imgs.search.brave.com,image.tmdb.org,upload.wikimedia.org,media-cdn.tripadvisor.com,"
+    "dynamic-media-cdn.tripadvisor.com,static.tacdn.com,www.tripadvisor.com",
+).split(","))
+
+# Requested widths snap up to one of these so each source has a handful of cached variants at most
+WIDTHS = (64, 128, 256, 384, 512, 768, 1024, 1280)
+
+# Result payloads point their images at the proxy (served from the API origin) at these display widths
+IMAGE_PROXY_PATH = env("IMAGE_PROXY_PATH", "/image")
+THUMBNAIL_WIDTH = 256
+POSTER_WIDTH = 512
+PHOTO_WIDTH = 768
+BACKDROP_WIDTH = 1280
+
+# TMDB serves pre-scaled renditions; fetching the smallest one that covers the target skips megabytes of transfer
+TMDB_SIZES = (92, 154, 185, 342, 500, 780, 1280)
+TMDB_ORIGINAL_PATTERN = re.compile(r"^(https://image\.tmdb\.org/t/p/)original/")
+
+REDIRECT_STATUS_CODES = frozenset((301, 302, 303, 307, 308))
+
+class ImageProxyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def is_allowed_url(url: str) -> bool:
+    parsed_url = urlsplit(url)
+
+    return parsed_url.scheme == "https" and parsed_url.hostname in ALLOWED_HOSTS
+
+def snap_width(width: int) -> int:
+    return next((snapped for snapped in WIDTHS if snapped >= width), WIDTHS[-1])
+
+# Hosts outside the allowlist (and empty URLs) are left as they are; the proxy would refuse them
+def proxied_image_url(url: str, width: int) -> str:
+    if not url or not is_allowed_url(url):
+        return url
+
+    return f"{IMAGE_PROXY_PATH}?{urlencode({'url': url, 'width': snap_width(width)})}"
+
+# Most preferred format the client accepts and this Pillow build can write
+def choose_format(accept: str) -> str:
+    if "image/avif" in accept and features.check("avif"):
+        return "avif"
+
+    if "image/webp" in accept and features.check("webp"):
+        return "webp"
+
+    return "jpeg"
+
+class ImageProxy:
+    def __init__(self) -> None:
+        self.headers = {
+            "User-Agent": f"HuggyPanda/0.1.0 (https://huggypanda.com; {env("EMAIL")})",
+            "Accept": "image/avif,image/webp,image/*",
+        }
+
+        self.cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+
+        # Concurrent misses for the same variant wait for the first one instead of fetching again
+        self._inflight: dict[str, threading.Lock] = {}
+        self._inflight_lock = threading.Lock()
+
+    @staticmethod
+    def _get_source_url(url: str, width: int) -> str:
+        match = TMDB_ORIGINAL_PATTERN.match(url)
+
+        if not match:
+            return url
+
+        tmdb_width = next((size for size in TMDB_SIZES if size >= width), None)
+
+        return TMDB_ORIGINAL_PATTERN.sub(rf"\g<1>w{tmdb_width}/", url) if tmdb_width else url
+
+    # Redirects are followed by hand so each hop is held to the allowlist, not just the first URL
+    def _fetch(self, url: str) -> bytes:
+        deadline = time.monotonic() + IMAGE_FETCH_DEADLINE
+
+        with span("image_proxy.fetch"):
+            try:
+                for _ in range(IMAGE_MAX_REDIRECTS + 1):
+                    timeout = min(IMAGE_FETCH_TIMEOUT, deadline - time.monotonic())
+
+                    if timeout <= 0:
+                        raise ImageProxyError(504, "The image took too long to load")
+
+                    with req.get(url, headers=self.headers, timeout=timeout, stream=True, allow_redirects=False) as res:
+                        if res.status_code in REDIRECT_STATUS_CODES:
+                            url = urljoin(url, res.headers.get("Location", ""))
+
+                            if not is_allowed_url(url):
+                                raise ImageProxyError(502, "The image could not be loaded")
+
+                            continue
+
+                        if res.status_code != 200:
+                            raise ImageProxyError(502, "The image could not be loaded")
+
+                        if int(res.headers.get("Content-Length") or 0) > IMAGE_MAX_SOURCE_BYTES:
+                            raise ImageProxyError(413, "The image is too large")
+
+                        chunks = []
+                        size = 0
+
+                        for chunk in res.iter_content(64 * 1024):
+                            size += len(chunk)
+
+                            if size > IMAGE_MAX_SOURCE_BYTES:
+                                raise ImageProxyError(413, "The image is too large")
+
+                            if time.monotonic() > deadline:
+                                raise ImageProxyError(504, "The image took too long to load")
+
+                            chunks.append(chunk)
+
+                        return b"".join(chunks)
+
+                raise ImageProxyError(502, "The image could not be loaded")
+
+            except req.RequestException:
+                raise ImageProxyError(502, "The image could not be loaded")
+
+    @staticmethod
+    @traced("image_proxy.transcode")
+    def transcode(source: bytes, width: int, image_format: str) -> bytes:
+        try:
+            image = Image.open(BytesIO(source))
+
+            # open() only reads the header, so oversized sources are refused before any pixels are decoded. Checked
+            # here rather than via Image.MAX_IMAGE_PIXELS, a process-wide global that only raises at twice its value.
+            if image.width * image.height > IMAGE_MAX_SOURCE_PIXELS:
+                raise ImageProxyError(413, "The image is too large")
+
+            # JPEG decodes at 1/2, 1/4 or 1/8 scale for free when the target is that much smaller
+            image.draft("RGB", (width, width * 4))
+            image = ImageOps.exif_transpose(image)
+
+            if image.width > width:
+                image.thumbnail((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+            if image_format == "jpeg" or not has_alpha:
+                image = image.convert("RGB")
+            else:
+                image = image.convert("RGBA")
+
+            output = BytesIO()
+
+            if image_format == "avif":
+                image.save(output, "AVIF", quality=AVIF_QUALITY)
+            elif image_format == "webp":
+                image.save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+            else:
+                image.save(output, "JPEG", quality=WEBP_QUALITY, optimize=True, progressive=True)
+
+            return output.getvalue()
+
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise ImageProxyError(422, "The image format is not supported")
+
+    # The variant's cache key, which doubles as a strong ETag, and its output format. Depends only on the request,
+    # so a revalidation can be answered before anything is read or fetched.
+    @staticmethod
+    def get_variant(url: str, width: int, accept: str) -> tuple[str, str]:
+        if not is_allowed_url(url):
+            raise ImageProxyError(400, "Images from this host cannot be displayed")
+
+        image_format = choose_format(accept)
+
+        return DiskLRUCache.make_key(url, str(snap_width(width)), image_format), image_format
+
+    # Returns the resized image, its format and its cache key
+    def get_image(self, url: str, width: int, accept: str) -> tuple[bytes, str, str]:
+        key, image_format = self.get_variant(url, width, accept)
+        width = snap_width(width)
+
+        image = self.cache.get(key)
+
+        if image is not None:
+            return image, image_format, key
+
+        with self._inflight_lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                image = self.cache.get(key)
+
+                if image is None:
+                    image = self.transcode(self._fetch(self._get_source_url(url, width)), width, image_format)
+                    self.cache.set(key, image)
+
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+
+        return image, image_format, key
+
+image_proxy = ImageProxy()
@@ -1 +1,83 @@
-# if mediawiki api has coordinates, apply the lat and long to mapbox and display the universal result
\ No newline at end of file
+import re
+from typing import Any, Optional
+
+from ..infrastructure.geo_index import geo_index
+from ..infrastructure.telemetry import traced
+
+# "hotels near eiffel tower", "restaurants near the louvre"
+NEAR_QUERY_PATTERN = re.compile(r"^\s*(?:(.*?)\s+)?(?:near|nearby|close to|around)\s+(?:the\s+)?(.+?)\s*$", re.IGNORECASE)
+
+KIND_KEYWORDS = {
+    "tripadvisor": ("hotel", "hostel", "resort", "motel", "stay", "restaurant", "food", "eat", "dining"),
+}
+
+# Map cards and "near X" answers served from the in-process geo index, which is filled as Wikipedia and
+# Tripadvisor enrichments come in, so none of these lookups calls an upstream API
+class Mapbox:
+    @staticmethod
+    def _get_kind(subject: str) -> Optional[str]:
+        subject = subject.lower()
+
+        for kind, keywords in KIND_KEYWORDS.items():
+            if any(keyword in subject for keyword in keywords):
+                return kind
+
+        return None
+
+    @traced("map.bbox")
+    def get_places_in_view(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        kind: Optional[str] = None,
+        limit: int = 200,
+    ) -> list[dict[str, Any]]:
+
+        return [entity.to_dict() for entity in geo_index.within_bbox(south, west, north, east, kind, limit)]
+
+    @traced("map.nearby")
+    def get_nearby_places(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 10,
+        kind: Optional[str] = None,
+        max_distance_km: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+
+        return [
+            entity.to_dict(distance_km)
+            for entity, distance_km in geo_index.nearest(lat, lon, k, kind, max_distance_km)
+        ]
+
+    # Answers "<subject> near <place>" when <place> is already indexed; {} otherwise
+    @traced("map.near_query")
+    def get_near_query_results(self, query: str, k: int = 10, max_distance_km: float = 25.0) -> dict[str, Any]:
+        match = NEAR_QUERY_PATTERN.match(query)
+
+        if not match:
+            return {}
+
+        subject, place = match.group(1) or "", match.group(2)
+        anchor = geo_index.find_by_name(place)
+
+        if anchor is None:
+            return {}
+
+        nearby = geo_index.nearest(
+            anchor.lat,
+            anchor.lon,
+            k,
+            kind=self._get_kind(subject),
+            max_distance_km=max_distance_km,
+            exclude=anchor.entity_id,
+        )
+
+        return {
+            "anchor": anchor.to_dict(),
+            "places": [entity.to_dict(distance_km) for entity, distance_km in nearby],
+        }
+
+mapbox = Mapbox()
@@ -1 +1,91 @@
-# No need to implement messaging queue since the api will only run if brave api runs, in which case, the brave api has a messaging queue in place
\ No newline at end of file
+import os
+import json
+from typing import Iterator
+
+import requests as req
+from dotenv import load_dotenv
+
+load_dotenv()
+env = os.getenv
+
+class OpenRouterError(Exception):
+    pass
+
+class OpenRouter:
+    def __init__(self) -> None:
+        self.headers = {
+            "Authorization": f"Bearer {env('OPENROUTER_API_KEY')}",
+            "HTTP-Referer": "https://huggypanda.com",
+            "X-Title": "HuggyPanda",
+            "Accept": "text/event-stream",
+            "Content-Type": "application/json",
+        }
+
+        self.model = env("OPENROUTER_MODEL", "google/gemma-3-12b-it")
+
+    def _build_messages(self, query: str, context: list[str]) -> list[dict[str, str]]:
+        numbered_context = "\n".join(f"{count}. {snippet}" for count, snippet in enumerate(context, start=1))
+
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are a search assistant. Answer the user's query concisely using only the numbered "
+                    "search snippets provided. If the snippets do not contain the answer, say so."
+                ),
+            },
+            {
+                "role": "user",
+                "content": f"Search snippets:\n{numbered_context}\n\nQuery: {query}",
+            },
+        ]
+
+    # Connects before returning, so a failed request or non-200 status raises OpenRouterError here instead of
+    # yielding an empty stream; the returned iterator raises it if the stream breaks off part way
+    def stream_answer(self, query: str, context: list[str]) -> Iterator[str]:
+        try:
+            res = req.post(
+                "https://openrouter.ai/api/v1/chat/completions",
+                headers=self.headers,
+                json={
+                    "model": self.model,
+                    "messages": self._build_messages(query, context),
+                    "stream": True,
+                },
+                stream=True,
+                timeout=(5, 60),
+            )
+
+        except req.RequestException as error:
+            raise OpenRouterError("OpenRouter could not be reached") from error
+
+        if res.status_code != 200:
+            res.close()
+            raise OpenRouterError(f"OpenRouter returned {res.status_code}")
+
+        return self._iter_deltas(res)
+
+    @staticmethod
+    def _iter_deltas(res: req.Response) -> Iterator[str]:
+        try:
+            # Server-sent events: "data: {...}" lines, ": ..." keep-alive comments, and a final "data: [DONE]".
+            # An error after the 200 arrives as a data line with "error" instead of "choices".
+            for line in res.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+
+                data = line[len("data: "):]
+
+                if data == "[DONE]":
+                    break
+
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+
+                if delta:
+                    yield delta
+
+        except (req.RequestException, ValueError, KeyError, IndexError) as error:
+            raise OpenRouterError("OpenRouter stream was interrupted") from error
+
+        finally:
+            res.close()
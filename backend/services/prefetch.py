@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dotenv import load_dotenv
+
+from .brave import Brave
+from ..infrastructure.vector import Vector
+from ..infrastructure.semantic_cache import semantic_cache, normalize_query
+from ..infrastructure.telemetry import span, query_digest
+
+load_dotenv()
+env = os.getenv
+
+logger = logging.getLogger(__name__)
+
+# Spare-capacity budget: a couple of background workers, a cap on queued work and on prefetches per minute
+PREFETCH_MAX_WORKERS = int(env("PREFETCH_MAX_WORKERS", "2"))
+PREFETCH_MAX_PENDING = int(env("PREFETCH_MAX_PENDING", "8"))
+PREFETCH_PER_MINUTE = int(env("PREFETCH_PER_MINUTE", "60"))
+PREFETCH_TOP_SUGGESTIONS = int(env("PREFETCH_TOP_SUGGESTIONS", "1"))
+# Stop speculating once the monthly Brave quota gets this low
+PREFETCH_MIN_QUOTA_REMAINING = int(env("PREFETCH_MIN_QUOTA_REMAINING", "1000"))
+PREFETCH_BACKOFF_BASE = float(env("PREFETCH_BACKOFF_BASE", "30"))
+PREFETCH_BACKOFF_MAX = float(env("PREFETCH_BACKOFF_MAX", "900"))
+# How long a search waits for an in-flight prefetch of the same query before fetching it itself
+PREFETCH_JOIN_TIMEOUT = float(env("PREFETCH_JOIN_TIMEOUT", "3"))
+
+# Warms the web result cache for the suggestions a user is most likely to pick. A prefetch is the same
+# semantic_cache.get_or_fetch the search route runs, so it also runs the Wikipedia / Tripadvisor / TMDB
+# enrichments inside Brave.get_web_results. Queued prefetches are cancelled once the user types past
+# them; one already talking to Brave finishes and still lands in the cache.
+class Prefetcher:
+    def __init__(self, brave: Brave):
+        self.brave = brave
+        self.executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._by_session: dict[str, list[tuple[str, Future]]] = {}
+        self._started_at: deque[float] = deque()
+        # Re-entrant: a done callback added to an already finished future runs on the submitting thread
+        self._lock = threading.RLock()
+
+        self._failures = 0
+        self._backoff_until = 0.0
+
+    def _is_backing_off(self) -> bool:
+        return time.monotonic() < self._backoff_until or not self.brave.has_spare_quota(PREFETCH_MIN_QUOTA_REMAINING)
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+
+        while self._started_at and self._started_at[0] < now - 60:
+            self._started_at.popleft()
+
+        if len(self._started_at) >= PREFETCH_PER_MINUTE or len(self._inflight) >= PREFETCH_MAX_PENDING:
+            return False
+
+        self._started_at.append(now)
+
+        return True
+
+    # Drops the session's queued prefetches that neither match what is being typed nor are still suggested
+    def _cancel_diverged(self, session_key: str, typed_query: str, suggestions: list[str]) -> None:
+        typed_query = normalize_query(typed_query)
+        suggested = {normalize_query(suggestion) for suggestion in suggestions}
+
+        kept = []
+
+        for query, future in self._by_session.pop(session_key, []):
+            if future.done():
+                continue
+
+            if query in suggested or query.startswith(typed_query):
+                kept.append((query, future))
+            else:
+                future.cancel()
+
+        if kept:
+            self._by_session[session_key] = kept
+
+    def on_suggest(self, session_key: str, typed_query: str, suggestions: list[str], safesearch_mode: str) -> None:
+        partition_key = f"web:{safesearch_mode}"
+
+        with self._lock:
+            self._cancel_diverged(session_key, typed_query, suggestions)
+
+            if self._is_backing_off():
+                return
+
+            for suggestion in suggestions[:PREFETCH_TOP_SUGGESTIONS]:
+                key = (partition_key, normalize_query(suggestion))
+
+                if key in self._inflight or semantic_cache.contains(partition_key, suggestion):
+                    continue
+
+                if not self._take_budget():
+                    return
+
+                future = self.executor.submit(self._prefetch, key, suggestion, safesearch_mode)
+                self._inflight[key] = future
+                self._by_session.setdefault(session_key, []).append((key[1], future))
+
+                # Also runs when a queued future is cancelled
+                future.add_done_callback(lambda _, key=key: self._forget(key, session_key))
+
+    def _forget(self, key: tuple[str, str], session_key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+            pending = [(query, future) for query, future in self._by_session.get(session_key, []) if not future.done()]
+
+            if pending:
+                self._by_session[session_key] = pending
+            else:
+                self._by_session.pop(session_key, None)
+
+    def _prefetch(self, key: tuple[str, str], query: str, safesearch_mode: str) -> None:
+        partition_key, _ = key
+
+        with span("prefetch.web") as stage_span:
+            try:
+                bundle = semantic_cache.get_or_fetch(
+                    "web",
+                    partition_key,
+                    query,
+                    Vector.convert_query_to_vector_embed,
+                    lambda: self.brave.get_web_results(query, safesearch_mode),
+                )
+
+            # Nobody may ever join this future, so the error is logged here rather than left on it
+            except Exception:
+                logger.exception("Prefetch of query %s failed", query_digest(query))
+                stage_span.outcome = "error"
+                bundle = None
+
+            with self._lock:
+                if bundle:
+                    self._failures = 0
+                    return
+
+                # Brave swallows its errors, so an empty result counts as upstream pressure just like an exception
+                self._failures += 1
+                backoff = min(PREFETCH_BACKOFF_MAX, PREFETCH_BACKOFF_BASE * 2 ** (self._failures - 1))
+                self._backoff_until = time.monotonic() + backoff
+
+            if stage_span.outcome == "ok":
+                stage_span.outcome = "empty"
+
+            logger.warning("Prefetch of query %s failed or came back empty, pausing prefetches for %.0fs", query_digest(query), backoff)
+
+    # Lets a search for a query that is being prefetched reuse that request instead of sending its own
+    def join(self, partition_key: str, query: str) -> None:
+        with self._lock:
+            future = self._inflight.get((partition_key, normalize_query(query)))
+
+        if future is None or future.cancelled():
+            return
+
+        try:
+            future.result(timeout=PREFETCH_JOIN_TIMEOUT)
+
+        except (FutureTimeoutError, CancelledError):
+            pass
+
+        except Exception:
+            logger.exception("Prefetch of query %s failed", query_digest(query))
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,255 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .openrouter import OpenRouter
+from .dedup import dedupe_texts
+from ..infrastructure.vector import Vector
+from ..infrastructure.tokens import estimate_tokens
+from ..infrastructure.telemetry import record_dedup_report
+
+load_dotenv()
+env = os.getenv
+
+RAG_CHUNK_TOKENS = int(env("RAG_CHUNK_TOKENS", "120"))
+RAG_CONTEXT_TOKEN_BUDGET = int(env("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+RAG_TOP_K = int(env("RAG_TOP_K", "8"))
+RAG_ANSWER_CACHE_TTL = int(env("RAG_ANSWER_CACHE_TTL", "900"))
+RAG_ANSWER_CACHE_MAX = int(env("RAG_ANSWER_CACHE_MAX", "1000"))
+# Chunks from the session's previous answer that a follow-up question can pull back into its context
+RAG_FOLLOW_UP_TOP_K = int(env("RAG_FOLLOW_UP_TOP_K", "3"))
+# Cosine similarity a previous chunk needs to the new query; keeps unrelated earlier context out of the prompt
+RAG_FOLLOW_UP_MIN_SCORE = float(env("RAG_FOLLOW_UP_MIN_SCORE", "0.5"))
+# The follow-up lookup runs alongside the chunk embedding; once the new results are ranked the answer waits at most
+# this long for it before streaming without the earlier chunks
+RAG_FOLLOW_UP_WAIT = float(env("RAG_FOLLOW_UP_WAIT", "0.2"))
+RAG_FOLLOW_UP_WORKERS = int(env("RAG_FOLLOW_UP_WORKERS", "4"))
+# Size of the deltas a cached answer is replayed in
+RAG_CACHED_DELTA_CHARS = int(env("RAG_CACHED_DELTA_CHARS", "80"))
+
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Whitespace-aligned pieces of about max_chars, so a cached answer renders progressively like a streamed one
+def split_answer(answer: str, max_chars: int = RAG_CACHED_DELTA_CHARS) -> Iterator[str]:
+    start = 0
+
+    while start < len(answer):
+        end = start + max_chars
+
+        if end < len(answer):
+            boundary = answer.rfind(" ", start + 1, end + 1)
+            end = boundary if boundary > start else end
+
+        yield answer[start:end]
+        start = end
+
+def chunk_snippets(snippets: list[str], max_tokens: int = RAG_CHUNK_TOKENS) -> list[str]:
+    chunks = []
+
+    for snippet in snippets:
+        current_chunk, current_tokens = [], 0
+
+        for sentence in SENTENCE_BOUNDARY_PATTERN.split(snippet.strip()):
+            if not sentence:
+                continue
+
+            sentence_tokens = estimate_tokens(sentence)
+
+            if current_chunk and current_tokens + sentence_tokens > max_tokens:
+                chunks.append(" ".join(current_chunk))
+                current_chunk, current_tokens = [], 0
+
+            current_chunk.append(sentence)
+            current_tokens += sentence_tokens
+
+        if current_chunk:
+            chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+class RagPipeline:
+    def __init__(self) -> None:
+        self.llm = OpenRouter()
+
+        self._answers: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.follow_up_executor = ThreadPoolExecutor(max_workers=RAG_FOLLOW_UP_WORKERS, thread_name_prefix="rag-follow-up")
+
+    def _get_cached_answer(self, cache_key: str) -> str | None:
+        with self._lock:
+            entry = self._answers.get(cache_key)
+
+            if entry is None or entry[0] < time.time():
+                return None
+
+            self._answers.move_to_end(cache_key)
+
+            return entry[1]
+
+    def _cache_answer(self, cache_key: str, answer: str) -> None:
+        with self._lock:
+            self._answers[cache_key] = (time.time() + RAG_ANSWER_CACHE_TTL, answer)
+            self._answers.move_to_end(cache_key)
+
+            while len(self._answers) > RAG_ANSWER_CACHE_MAX:
+                self._answers.popitem(last=False)
+
+    # Hybrid (dense + BM25) search over the namespace the session's previous answer was indexed into. Embeds the
+    # query on its own so it does not wait for the chunk embedding.
+    @staticmethod
+    def _retrieve_follow_ups(query: str, namespace: str) -> list[str]:
+        query_embed = Vector.convert_query_to_vector_embed(query)
+        hits = Vector.query_from_vector_db(query_embed, namespace, query_text=query, top_k=RAG_FOLLOW_UP_TOP_K)
+
+        if not hits:
+            return []
+
+        return [hit["text"] for hit in hits if (hit["dense_score"] or 0.0) >= RAG_FOLLOW_UP_MIN_SCORE]
+
+    def retrieve(
+        self,
+        query: str,
+        snippets: list[str],
+        follow_up_namespace: Optional[str] = None,
+    ) -> tuple[list[str], list[str], list[list[float]], bool]:
+
+        # Syndicated copies are dropped before chunking (whole snippets) and again after (shared sentences),
+        # so they never reach the embeddings API, Pinecone or the LLM context
+        unique_snippets, snippet_report = dedupe_texts(snippets)
+        chunks, chunk_report = dedupe_texts(chunk_snippets(unique_snippets))
+
+        # Exported as huggypanda_rag_dedup_tokens_total / huggypanda_rag_dedup_duplicates_total
+        record_dedup_report(snippet_report)
+        record_dedup_report({
+            **chunk_report,
+            # Chunk-level input was already counted at the snippet level
+            "input_tokens": 0,
+        })
+
+        if not chunks:
+            return [], [], [], False
+
+        follow_up_future = (
+            self.follow_up_executor.submit(self._retrieve_follow_ups, query, follow_up_namespace)
+            if follow_up_namespace else None
+        )
+
+        try:
+            # The query rides along in the same embeddings request as the chunks
+            embeddings = Vector.convert_to_vector_embed(chunks + [query])
+            chunk_embeds, query_embed = embeddings[:-1], np.asarray(embeddings[-1], dtype=np.float32)
+
+            chunk_matrix = np.asarray(chunk_embeds, dtype=np.float32)
+            norms = np.linalg.norm(chunk_matrix, axis=1) * (np.linalg.norm(query_embed) or 1.0)
+            ranked_chunks = np.argsort(-(chunk_matrix @ query_embed) / np.where(norms == 0, 1.0, norms))
+
+        except Exception:
+            # Without embeddings, fall back to Brave's snippet order and skip indexing
+            chunk_embeds, ranked_chunks = [], range(len(chunks))
+
+        follow_ups = []
+
+        if follow_up_future is not None:
+            try:
+                current_chunks = set(chunks)
+                follow_ups = [
+                    chunk
+                    for chunk in follow_up_future.result(timeout=RAG_FOLLOW_UP_WAIT)
+                    if chunk not in current_chunks
+                ]
+
+            # Slow or failed: answer from the new results alone
+            except Exception:
+                pass
+
+        context = []
+        used_tokens = 0
+
+        # Relevant earlier chunks go first, then the new results best-first, until top_k chunks or the token budget
+        # is reached; oversize chunks are skipped, not truncated
+        for chunk in follow_ups + [chunks[i] for i in ranked_chunks]:
+            if len(context) >= RAG_TOP_K:
+                break
+
+            chunk_tokens = estimate_tokens(chunk)
+
+            if used_tokens + chunk_tokens > RAG_CONTEXT_TOKEN_BUDGET:
+                continue
+
+            context.append(chunk)
+            used_tokens += chunk_tokens
+
+        used_follow_ups = any(chunk in follow_ups for chunk in context)
+
+        return context, chunks if chunk_embeds else [], chunk_embeds, used_follow_ups
+
+    def _index_for_follow_ups(
+        self,
+        chunks: list[str],
+        chunk_embeds: list[list[float]],
+        on_indexed: Optional[Callable[[str], None]],
+    ) -> None:
+
+        try:
+            namespace = Vector.add_to_vector_db(chunks, chunk_embeds)
+
+            if namespace and on_indexed:
+                on_indexed(namespace)
+
+        except Exception:
+            pass
+
+    # Retrieval runs and the LLM stream is opened before this returns, so an unavailable LLM raises
+    # OpenRouterError to the caller rather than surfacing as an empty stream
+    def stream_answer(
+        self,
+        cache_key: str,
+        query: str,
+        snippets: list[str],
+        on_indexed: Optional[Callable[[str], None]] = None,
+        follow_up_namespace: Optional[str] = None,
+    ) -> Iterator[str]:
+
+        cached_answer = self._get_cached_answer(cache_key)
+
+        if cached_answer is not None:
+            return split_answer(cached_answer)
+
+        context, chunks, chunk_embeds, used_follow_ups = self.retrieve(query, snippets, follow_up_namespace)
+
+        # Pinecone indexing (for follow-up questions) proceeds in parallel with answer generation
+        if chunks:
+            threading.Thread(
+                target=self._index_for_follow_ups,
+                args=(chunks, chunk_embeds, on_indexed),
+                daemon=True,
+            ).start()
+
+        deltas = self.llm.stream_answer(query, context)
+
+        # The cache is shared across sessions, so an answer built on one session's earlier context stays out of it
+        if used_follow_ups:
+            return deltas
+
+        return self._stream_and_cache(cache_key, deltas)
+
+    # An answer cut off by an OpenRouterError is never cached
+    def _stream_and_cache(self, cache_key: str, deltas: Iterator[str]) -> Iterator[str]:
+        answer_parts = []
+
+        for delta in deltas:
+            answer_parts.append(delta)
+            yield delta
+
+        if answer_parts:
+            self._cache_answer(cache_key, "".join(answer_parts))
+
+rag_pipeline = RagPipeline()
@@ -0,0 +1,66 @@
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from ..infrastructure.rank_profiles import UserRankProfile, tokenize, hash_terms, normalize_host
+
+load_dotenv()
+env = os.getenv
+
+RERANK_BUDGET_US = int(env("RERANK_BUDGET_US", "1000"))
+RERANK_HOST_WEIGHT = float(env("RERANK_HOST_WEIGHT", "0.06"))
+RERANK_TOPIC_WEIGHT = float(env("RERANK_TOPIC_WEIGHT", "0.08"))
+
+class Reranker:
+    def __init__(
+        self,
+        budget_us: int = RERANK_BUDGET_US,
+        host_weight: float = RERANK_HOST_WEIGHT,
+        topic_weight: float = RERANK_TOPIC_WEIGHT,
+    ):
+        self.budget_ns = budget_us * 1000
+        self.host_weight = host_weight
+        self.topic_weight = topic_weight
+
+    def _topic_similarity(self, topic: dict[int, float], topic_norm: float, text: str) -> float:
+        result_vector = hash_terms(tokenize(text))
+        dot = sum(weight * topic.get(bucket, 0.0) for bucket, weight in result_vector.items())
+
+        return dot / topic_norm
+
+    def rerank(self, web_results: list[dict], profile: Optional[UserRankProfile]) -> list[dict]:
+        if not profile or not web_results or (not profile.hosts and not profile.topic):
+            return web_results
+
+        deadline = time.perf_counter_ns() + self.budget_ns
+
+        max_host_weight = max(profile.hosts.values(), default=0.0) or 1.0
+        topic_norm = sum(weight * weight for weight in profile.topic.values()) ** 0.5 or 1.0
+
+        scored = []
+
+        for rank, web_result in enumerate(web_results):
+            # Out of budget: keep Brave's order for everything not yet scored
+            if time.perf_counter_ns() > deadline:
+                return [result for _, _, result in sorted(scored, key=lambda item: (-item[0], item[1]))] + web_results[rank:]
+
+            # Rank prior keeps Brave's order unless the personal signal is strong
+            score = 1.0 / (rank + 10)
+
+            host = normalize_host(web_result.get("site_homepage", ""))
+            score += self.host_weight * profile.hosts.get(host, 0.0) / max_host_weight
+
+            if profile.topic:
+                score += self.topic_weight * self._topic_similarity(
+                    profile.topic,
+                    topic_norm,
+                    f"{web_result.get('title', '')} {web_result.get('snippet', '')}",
+                )
+
+            scored.append((score, rank, web_result))
+
+        return [result for _, _, result in sorted(scored, key=lambda item: (-item[0], item[1]))]
+
+reranker = Reranker()
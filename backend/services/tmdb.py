@@ -1,11 +1,19 @@
 import os
+import logging
 
 import requests as req
 from dotenv import load_dotenv
 
+from .image_proxy import proxied_image_url, POSTER_WIDTH, BACKDROP_WIDTH
+from ..infrastructure.telemetry import traced
+
 load_dotenv()
 env = os.getenv
 
+logger = logging.getLogger(__name__)
+
+TMDB_API_BASE_URL = env("TMDB_API_BASE_URL", "https://api.themoviedb.org/3")
+
 class TMDB:
     def __init__(self) -> None:
         self.headers = {
@@ -19,7 +27,7 @@ class TMDB:
     def get_content_summary(self, title: str) -> dict[str, str | int | float | list[dict[str, str]]]:
         try:
             res = req.get(
-                "https://api.themoviedb.org/3/search/multi",
+                f"{TMDB_API_BASE_URL}/search/multi",
                 headers=self.headers,
                 params={
                     "query": title,
@@ -38,14 +46,14 @@ class TMDB:
                 return {
                     "is_adult": data["adult"],
                     "backdrop_url": (
-                        f"https://image.tmdb.org/t/p/original{data["backdrop_path"]}"
+                        proxied_image_url(f"https://image.tmdb.org/t/p/original{data["backdrop_path"]}", BACKDROP_WIDTH)
                         if data["backdrop_path"] else ""
                     ),
                     "title": data["title"],
                     "og_title": data["original_title"],
                     "description": data["overview"],
                     "poster_url": (
-                        f"https://image.tmdb.org/t/p/original{data["poster_path"]}"
+                        proxied_image_url(f"https://image.tmdb.org/t/p/original{data["poster_path"]}", POSTER_WIDTH)
                         if data["poster_path"] else ""
                     ),
                     "og_language": data["original_language"],
@@ -62,7 +70,7 @@ class TMDB:
                     "name": data["name"],
                     "og_name": data["original_name"],
                     "pfp_url": (
-                        f"https://image.tmdb.org/t/p/original{data["profile_path"]}"
+                        proxied_image_url(f"https://image.tmdb.org/t/p/original{data["profile_path"]}", POSTER_WIDTH)
                         if data["profile_path"] else ""
                     ),
                     "known_for_movies_and_tv": [
@@ -70,8 +78,8 @@ class TMDB:
                             "title": content["title"],
                             "og_title": content["original_title"],
                             "poster_url": (
-                                f"https://image.tmdb.org/t/p/original{data["poster_path"]}"
-                                if data["poster_path"] else ""
+                                proxied_image_url(f"https://image.tmdb.org/t/p/original{content["poster_path"]}", POSTER_WIDTH)
+                                if content.get("poster_path") else ""
                             ),
                             "release_date": content["release_date"],
                         }
@@ -82,6 +90,7 @@ class TMDB:
                 }
 
         except Exception:
+            logger.exception("TMDB search failed for %r", title)
             return {}
         
     def get_content_details(self, id: int, type: str) -> dict[str, str | list[str]]:
@@ -89,11 +98,11 @@ class TMDB:
             req_url = None
             
             if type == "movie":
-                req_url = f"https://api.themoviedb.org/3/movie/{id}"
+                req_url = f"{TMDB_API_BASE_URL}/movie/{id}"
             elif type == "tv":
-                req_url = f"https://api.themoviedb.org/3/tv/{id}"
+                req_url = f"{TMDB_API_BASE_URL}/tv/{id}"
             else:
-                req_url = f"https://api.themoviedb.org/3/person/{id}"
+                req_url = f"{TMDB_API_BASE_URL}/person/{id}"
             
             res = req.get(
                 req_url,
@@ -127,7 +136,7 @@ class TMDB:
                             "name": creator["name"],
                             "og_name": creator["original_name"],
                             "pfp_url": (
-                                f"https://image.tmdb.org/t/p/original{data["profile_path"]}"
+                                proxied_image_url(f"https://image.tmdb.org/t/p/original{data["profile_path"]}", POSTER_WIDTH)
                                 if data["profile_path"] else ""
                             ),
                         }
@@ -154,7 +163,8 @@ class TMDB:
                     "place_of_birth": data["place_of_birth"],
                 }
         
-        except:
+        except Exception:
+            logger.exception("TMDB details lookup failed for %s", id)
             return {}
         
     def get_content_images(self, id: int, type: str) -> list[str]:
@@ -162,11 +172,11 @@ class TMDB:
             req_url = None
             
             if type == "movie":
-                req_url = f"https://api.themoviedb.org/3/movie/{id}/images"
+                req_url = f"{TMDB_API_BASE_URL}/movie/{id}/images"
             elif type == "tv":
-                req_url = f"https://api.themoviedb.org/3/tv/{id}/images"
+                req_url = f"{TMDB_API_BASE_URL}/tv/{id}/images"
             else:
-                req_url = f"https://api.themoviedb.org/3/person/{id}/images"
+                req_url = f"{TMDB_API_BASE_URL}/person/{id}/images"
             
             res = req.get(
                 req_url,
@@ -184,11 +194,12 @@ class TMDB:
                 if i > 3:
                     break
                 
-                images.append(f"https://image.tmdb.org/t/p/original{image["file_path"]}")
+                images.append(proxied_image_url(f"https://image.tmdb.org/t/p/original{image["file_path"]}", BACKDROP_WIDTH))
             
             return images
         
         except Exception:
+            logger.exception("TMDB images lookup failed for %s", id)
             return []
     
     def get_content_reviews(self, id: int, type: str) -> list[dict[str, str]]:
@@ -196,9 +207,9 @@ class TMDB:
             req_url = None
             
             if type == "movie":
-                req_url = f"https://api.themoviedb.org/3/movie/{id}/reviews"
+                req_url = f"{TMDB_API_BASE_URL}/movie/{id}/reviews"
             elif type == "tv":
-                req_url = f"https://api.themoviedb.org/3/tv/{id}/reviews"
+                req_url = f"{TMDB_API_BASE_URL}/tv/{id}/reviews"
             else:
                 return []
             
@@ -228,15 +239,21 @@ class TMDB:
             return reviews
         
         except Exception:
+            logger.exception("TMDB reviews lookup failed for %s", id)
             return []
         
+    @traced("enrich.tmdb")
     def get_tmdb_results(self, title: str) -> dict[str, str | dict[str, str]]:
         title = title.split("(")[0].strip()
         
-        content_summary = get_content_summary(title)
-        content_details = get_content_details(content_summary["_id"], content_summary["_type"])
-        content_images = get_content_images(content_summary["_id"], content_summary["_type"])
-        content_reviews = get_content_reviews(content_summary["_id"], content_summary["_type"])
+        content_summary = self.get_content_summary(title)
+
+        if not content_summary:
+            return {}
+
+        content_details = self.get_content_details(content_summary["_id"], content_summary["_type"])
+        content_images = self.get_content_images(content_summary["_id"], content_summary["_type"])
+        content_reviews = self.get_content_reviews(content_summary["_id"], content_summary["_type"])
         
         content_info = {}
         
@@ -1,12 +1,21 @@
 import os
+import logging
 from datetime import datetime
 
 import requests as req
 from dotenv import load_dotenv
 
+from .image_proxy import proxied_image_url, PHOTO_WIDTH
+from ..infrastructure.geo_index import geo_index
+from ..infrastructure.telemetry import traced, query_digest
+
 load_dotenv()
 env = os.getenv
 
+logger = logging.getLogger(__name__)
+
+TRIPADVISOR_API_BASE_URL = env("TRIPADVISOR_API_BASE_URL", "https://api.content.tripadvisor.com/api/v1")
+
 class Tripadvisor:
     def __init__(self):
         self.headers = {
@@ -36,7 +45,7 @@ class Tripadvisor:
     def _query_places(self, query: str, place_type: str) -> list[dict[str, str]]:
         try:
             res = req.get(
-                "https://api.content.tripadvisor.com/api/v1/location/search",
+                f"{TRIPADVISOR_API_BASE_URL}/location/search",
                 headers=self.headers,
                 params={
                     "key": env("TRIPADVISOR_API_KEY"),
@@ -64,7 +73,8 @@ class Tripadvisor:
             return places_results
         
         except Exception:
-            raise []
+            logger.exception("Tripadvisor location search failed for query %s", query_digest(query))
+            return []
     
     def _get_place_details(
         self,
@@ -78,7 +88,7 @@ class Tripadvisor:
                 id = place["_id"]
             
                 res = req.get(
-                    f"https://api.content.tripadvisor.com/api/v1/location/{id}/details",
+                    f"{TRIPADVISOR_API_BASE_URL}/location/{id}/details",
                     headers=self.headers,
                     params={
                         "key": env("TRIPADVISOR_API_KEY"),
@@ -108,6 +118,8 @@ class Tripadvisor:
                     "description": data["description"],
                     "price_level": data["price_level"],
                     "url_to_listing": data["web_url"],
+                    "latitude": data.get("latitude", ""),
+                    "longitude": data.get("longitude", ""),
                     "phone_num": data["phone"] if data["phone"] else "",
                     "url_to_lister": data["website"] if data["website"] else "",
                     "email": data["email"] if data["email"] else "",
@@ -133,6 +145,7 @@ class Tripadvisor:
             return places_details_results
         
         except Exception:
+            logger.exception("Tripadvisor place details lookup failed")
             return []
         
     def _get_place_images(
@@ -147,7 +160,7 @@ class Tripadvisor:
                 id = place["_id"]
                     
                 res = req.get(
-                    f"https://api.content.tripadvisor.com/api/v1/location/{id}/photos",
+                    f"{TRIPADVISOR_API_BASE_URL}/location/{id}/photos",
                     headers=self.headers,
                     params={
                         "key": env("TRIPADVISOR_API_KEY"),
@@ -165,7 +178,7 @@ class Tripadvisor:
                 
                 for image_data in data["data"]:
                     place_images.append({
-                        "image": image_data["images"]["original"]["url"],
+                        "image": proxied_image_url(image_data["images"]["original"]["url"], PHOTO_WIDTH),
                         "date": (datetime.fromisoformat(image_data["published_date"]
                                                         .replace("Z", "+00:00"))
                                 .strftime(r"%Y-%m-%d"))
@@ -176,6 +189,7 @@ class Tripadvisor:
             return places_images_results
             
         except Exception:
+            logger.exception("Tripadvisor place images lookup failed")
             return []
         
     def _get_place_reviews(
@@ -190,7 +204,7 @@ class Tripadvisor:
                 id = place["_id"]
                 
                 res = req.get(
-                    f"https://api.content.tripadvisor.com/api/v1/location/{id}/reviews",
+                    f"{TRIPADVISOR_API_BASE_URL}/location/{id}/reviews",
                     headers=self.headers,
                     params={
                         "key": env("TRIPADVISOR_API_KEY"),
@@ -221,11 +235,11 @@ class Tripadvisor:
                         "reviewer_pfp": review_data["user"]["avatar"]["original"],
                         "summary_rating": [
                             {
-                                "category": data["subratings"][k]["localized_name"],
-                                "rating_image": data["subratings"][k]["rating_image_url"],
-                                "rating": data["subratings"][k]["value"],
+                                "category": subrating["localized_name"],
+                                "rating_image": subrating["rating_image_url"],
+                                "rating": subrating["value"],
                             }
-                            for k in data["subratings"].keys()
+                            for subrating in review_data.get("subratings", {}).values()
                         ],
                         "owner_response_snippet": review_data["owner_response"]["title"],
                         "owner_response_title": review_data["owner_response"]["text"],
@@ -238,8 +252,29 @@ class Tripadvisor:
             return places_reviews_results
         
         except Exception:
+            logger.exception("Tripadvisor place reviews lookup failed")
             return []
 
+    @staticmethod
+    def _index_place(place: dict) -> None:
+        try:
+            lat, lon = float(place["latitude"]), float(place["longitude"])
+
+        except (KeyError, TypeError, ValueError):
+            return
+
+        geo_index.add(
+            f"tripadvisor:{place["_id"]}",
+            "tripadvisor",
+            place["name"],
+            lat,
+            lon,
+            address=place["address"],
+            url=place["url_to_listing"],
+            rating=place["rating"],
+        )
+
+    @traced("enrich.tripadvisor")
     def get_place_results(
         self,
         query: str,
@@ -274,6 +309,7 @@ class Tripadvisor:
             concat_place["reviews"] = reviews[i]
             
             results.append(concat_place)
+            self._index_place(concat_place)
         
         return results
 
@@ -1,13 +1,23 @@
 import os
-import re
+import logging
+from io import StringIO
+from typing import Optional
 
 import requests as req
-import pandas as pd
 from dotenv import load_dotenv
 
+from .wikitext import normalize_infobox_row, extract_see_also_titles, parse_coordinates
+from .image_proxy import proxied_image_url, THUMBNAIL_WIDTH
+from ..infrastructure.geo_index import geo_index
+from ..infrastructure.telemetry import traced
+
 load_dotenv()
 env = os.getenv
 
+logger = logging.getLogger(__name__)
+
+WIKIPEDIA_BASE_URL = env("WIKIPEDIA_BASE_URL", "https://en.wikipedia.org")
+
 class Wiki:
     def __init__(self) -> None:
         self.headers = {
@@ -20,11 +30,11 @@ class Wiki:
     def _get_wiki_summary_result(self, title: str) -> dict[str, str]:
         try:
             res = req.get(
-                "https://en.wikipedia.org/w/api.php",
+                f"{WIKIPEDIA_BASE_URL}/w/api.php",
                 headers = self.headers,
                 params={
                     "action": "query",
-                    "props": "extracts|pageimages",
+                    "prop": "extracts|pageimages",
                     "titles": title,
                     "explaintext": True,
                     "format": "json",
@@ -37,53 +47,35 @@ class Wiki:
             
             res_data = res.json()
             
-            res_page_data_key = res_data["query"]["pages"].keys()
-            data = res_data["query"]["pages"][res_page_data_key[0]]
+            data = next(iter(res_data["query"]["pages"].values()))
             
             return {
                 "title": data["title"],
                 "snippet": data["extract"].split("==")[0].replace(r"\n", " "),
-                "thumbnail": data["thumbnail"]["source"],
+                "thumbnail": proxied_image_url(data["thumbnail"]["source"], THUMBNAIL_WIDTH),
             }
             
         except Exception:
+            logger.exception("Wikipedia summary lookup failed for %r", title)
             return {}
             
-    def _filter_infobox_coords(self, coord: str) -> str:
-        coord_split = coord.split('/')[-1]
-
-        decimal_coord = ''
-
-        for val in coord_split:
-            if val == '.' or val == ' ':
-                decimal_coord += val
-                continue
-            elif (
-                val == 'N' or
-                val == 'S' or
-                val == 'E' or
-                val == 'W'
-            ):
-                decimal_coord += '°' + val
-                continue
-
-            try:
-                int(val)
-                decimal_coord += val
-            except:
-                continue
+    # The infobox rows, plus the coordinates parsed from the raw Coordinates cell since the displayed
+    # value has lost its signs
+    def _get_wiki_infobox_result(self, url: str) -> tuple[dict[str, str], Optional[tuple[float, float]]]:
+        # pandas is only needed here and costs ~250ms to import, so it loads on the first infobox
+        import pandas as pd
 
-        decimal_coord_split = decimal_coord.strip().split(' ')
+        try:
+            # Fetched with requests (not by read_html itself) so the configured base URL and headers apply
+            res = req.get(
+                url.replace("https://en.wikipedia.org", WIKIPEDIA_BASE_URL, 1),
+                headers=self.headers,
+            )
 
-        for i in range(len(decimal_coord_split)):
-            if 'S' in decimal_coord_split[i] or 'W' in decimal_coord_split[i]:
-                decimal_coord_split[i] = '-' + decimal_coord_split[i]
+            if res.status_code != 200:
+                return {}, None
 
-        return ' '.join(decimal_coord_split)
-    
-    def _get_wiki_infobox_result(self, url: str) -> dict[str, str]:
-        try:
-            infoboxes = pd.read_html(url, attrs={"class": "infobox"})
+            infoboxes = pd.read_html(StringIO(res.text), attrs={"class": "infobox"})
             
             if infoboxes:
                 infobox = infoboxes[0]
@@ -91,120 +83,36 @@ class Wiki:
                 infobox_len = len(infobox) - 1
 
                 filtered_wiki_infobox = {}
+                coordinates = None
 
                 for i in range(infobox_len):
                     first_col_row = infobox[infobox_keys[0]][i]
                     second_col_row = infobox[infobox_keys[1]][i]
 
-                    if (
-                        pd.isna(first_col_row) or
-                        pd.isna(second_col_row) or
-                        any(x in first_col_row for x in ["Dependencies", "Subsidaries", "Subordinated", "Latitude", "Longitude"])
-                    ):
+                    if pd.isna(first_col_row) or pd.isna(second_col_row):
                         continue
 
-                    if "Coordinates" in first_col_row:
-                        filtered_wiki_infobox["Coordinates"] = self._filter_infobox_coords(second_col_row)
-                        continue
-
-                    if (
-                        len(first_col_row) > 45 or
-                        len(second_col_row) > 45 or
-                        first_col_row == second_col_row
-                    ):
-                        continue
-
-                    if "Capital and largest city" in first_col_row:
-                        first_col_row = "Capital and largest city"
-
-                    if "Assembly members" in first_col_row:
-                        first_col_row = "Assembly members"
-
-                    first_col_row = (
-                        first_col_row.replace("•", "")
-                        .replace("  ", " ")
-                        .strip()
-                    )
+                    if coordinates is None and "Coordinates" in first_col_row:
+                        coordinates = parse_coordinates(second_col_row)
 
-                    second_col_row = (
-                        second_col_row.replace("•", "")
-                        .replace("\xa0", " ")
-                        .replace("′", "")
-                    )
+                    row = normalize_infobox_row(first_col_row, second_col_row)
 
-                    first_col_row = re.sub(r"\[.*?\]", "", first_col_row)
-                    first_col_row = re.sub(r"\{.*?\}", "", first_col_row)
-
-                    if first_col_row.strip() == "":
-                        continue
-
-                    second_col_row = re.sub(r"\[.*?\]", " ", second_col_row)
-                    second_col_row = re.sub(r"\{.*?\}", " ", second_col_row)
-
-                    if second_col_row.strip() == "":
-                        continue
-
-                    second_col_row = re.sub(r"(?<!\s)\(", " (", second_col_row)
-                    second_col_row = re.sub(r"\)(?!\s)", ") ", second_col_row)
-
-                    second_col_row = (
-                        second_col_row.replace("Nasdaq", " Nasdaq")
-                        .replace("S&P", " S&P")
-                        .replace("DJIA", " DJIA")
-                        .replace("Euro", " Euro")
-                        .replace("DAX", " DAX")
-                    )
-
-                    second_col_row_chars = list(second_col_row)
-                    i = 1
-
-                    while i < len(second_col_row_chars):
-                        prev_char = second_col_row_chars[i - 1]
-                        curr_char = second_col_row_chars[i]
-
-                        if (
-                            (
-                                (prev_char.islower() and curr_char.isupper()) or
-                                (
-                                    prev_char.isalpha() and 
-                                    curr_char.isnumeric() and
-                                    prev_char != "m" and
-                                    prev_char != "i"
-                                )
-                            )
-                            and
-                            (
-                                i < 2 or
-                                second_col_row_chars[i - 2] != " "
-                            )
-                        ):
-                            second_col_row_chars.insert(i, " ")
-                            i += 1
-
-                        i += 1
-
-                    second_col_row = (
-                        "".join(second_col_row_chars)
-                        .strip()
-                        # Run replace twice to ensure that all extra spaces are removed
-                        .replace("  ", " ")
-                        .replace("  ", " ")
-                    )
-
-                    filtered_wiki_infobox[first_col_row] = second_col_row
+                    if row:
+                        filtered_wiki_infobox[row[0]] = row[1]
                 
-                return filtered_wiki_infobox
+                return filtered_wiki_infobox, coordinates
                 
             else:
-                return {}
+                return {}, None
         
         except Exception:
-            return {}
+            logger.exception("Wikipedia infobox parse failed for %r", url)
+            return {}, None
             
     def _get_wiki_see_also(self, title: str) -> list[dict[str, str]]:
         try:
             res = req.get(
-                "https://en.wikipedia.org/w/index.php",
+                f"{WIKIPEDIA_BASE_URL}/w/index.php",
                 headers=self.headers,
                 params={
                     "title": title,
@@ -215,43 +123,14 @@ class Wiki:
             if res.status_code != 200:
                 return []
             
-            page_text = response.text
-            page_text_lines = page_text.splitlines()
-
-            see_also_items = []
-            collecting = False
+            see_also_items = extract_see_also_titles(res.text)
 
-            for i in range(len(page_text_lines) - 1, -1, -1):
-                line = page_text_lines[i].strip()
-
-                # Start collecting after reaching '== References ==' or '== Notes =='
-                if not collecting and re.match(r"^==\s*References\s*==$", line, re.IGNORECASE):
-                    collecting = True
-                    continue
-                elif not collecting and re.match(r"^==\s*Notes\s*==$", line, re.IGNORECASE):
-                    collecting = True
-                    continue
-
-                if collecting and re.match(r"^==\s*See also\s*==$", line, re.IGNORECASE):
-                    break
-
-                if collecting:
-                    if line.startswith("{{") or line.startswith("}}"):
-                        continue
-
-                    match = re.match(r"^\*\s*\[\[(.*?)\]\]", line)
-
-                    if match:
-                        see_also_items.insert(0, match.group(1))
-                        
             if not see_also_items:
                 return []
 
             see_also_items_data = []
             
             for item in see_also_items:
-                item = item.split('|')[-1] if "|" in item else item
-                
                 wiki_result = self._get_wiki_summary_result(item)
                 
                 if not wiki_result:
@@ -266,8 +145,10 @@ class Wiki:
             return see_also_items_data
         
         except Exception:
+            logger.exception("Wikipedia see-also lookup failed for %r", title)
             return []
 
+    @traced("enrich.wiki")
     def get_wiki_result(
         self,
         title: str,
@@ -276,10 +157,20 @@ class Wiki:
         title = title.replace(" - Wikipedia", "")
         
         summary = self._get_wiki_summary_result(title)
-        infobox = self._get_wiki_infobox_result(url)
+        infobox, coordinates = self._get_wiki_infobox_result(url)
         see_also = self._get_wiki_see_also(title)
         
         summary["infobox"] = infobox
         summary["see_also"] = see_also
+
+        if coordinates:
+            geo_index.add(
+                f"wikipedia:{url}",
+                "wikipedia",
+                summary.get("title", title),
+                *coordinates,
+                url=url,
+                thumbnail=summary.get("thumbnail", ""),
+            )
         
         return summary
@@ -0,0 +1,172 @@
+import re
+from typing import Optional
+
+# Normalization of Wikipedia infobox cells and raw wikitext, shared by services/wiki.py. Runs for every
+# Wikipedia hit on every search, so patterns are compiled once and each cell is rebuilt in one pass.
+
+# Matched against whole, stripped header lines; References / Notes close the "See also" section
+SECTION_END_PATTERN = re.compile(r"==\s*(?:References|Notes)\s*==", re.IGNORECASE)
+SEE_ALSO_PATTERN = re.compile(r"==\s*See also\s*==", re.IGNORECASE)
+SEE_ALSO_LINK_PATTERN = re.compile(r"^[^\S\n]*\*[^\S\n]*\[\[(.*?)\]\]", re.MULTILINE)
+
+# Footnote markers like [1] and template leftovers like {{...}}
+SQUARE_BRACKETS_PATTERN = re.compile(r"\[.*?\]")
+CURLY_BRACKETS_PATTERN = re.compile(r"\{.*?\}")
+OPEN_PAREN_PATTERN = re.compile(r"(?<!\s)\(")
+CLOSE_PAREN_PATTERN = re.compile(r"\)(?!\s)")
+# Index and currency names that the HTML table glues to the preceding value
+GLUED_TOKEN_PATTERN = re.compile(r"(Nasdaq|S&P|DJIA|Euro|DAX)")
+
+COORD_DROP_PATTERN = re.compile(r"[^\d. NSEW]")
+COORD_HEMISPHERE_PATTERN = re.compile(r"([NSEW])")
+# The parts of a raw {{coord}} cell that carry decimal degrees: the hidden "geo" span ("40.71278; -74.00611")
+# and the "geo-dec" span ("40.71278°N 74.00611°W"). The DMS part ("40°42′46″N") never matches either.
+COORD_GEO_PATTERN = re.compile(r"([-−]?\d+(?:\.\d+)?)\s*;\s*([-−]?\d+(?:\.\d+)?)")
+COORD_DECIMAL_PATTERN = re.compile(r"(\d+(?:\.\d+)?)°\s*([NS])[\s\ufeff]+(\d+(?:\.\d+)?)°\s*([EW])")
+
+VALUE_TRANSLATION = str.maketrans({"•": None, "\xa0": " ", "′": None})
+
+SKIPPED_LABELS = ("Dependencies", "Subsidaries", "Subordinated", "Latitude", "Longitude")
+MAX_CELL_LENGTH = 45
+
+# "48°51′29.6″N 2°17′40.2″E / 48.858222°N 2.294500°E" -> "48.858222°N 2.294500°E", with "-" before S and W parts
+def filter_infobox_coords(coord: str) -> str:
+    decimal_coord = COORD_HEMISPHERE_PATTERN.sub(r"°\1", COORD_DROP_PATTERN.sub("", coord.split("/")[-1]))
+
+    return " ".join(
+        f"-{part}" if "S" in part or "W" in part else part
+        for part in decimal_coord.strip().split(" ")
+    )
+
+# Raw infobox Coordinates cell (before filter_infobox_coords) as (latitude, longitude), e.g.
+# "40°42′46″N 74°00′22″W / 40.71278°N 74.00611°W / 40.71278; -74.00611" -> (40.71278, -74.00611).
+# Cells without decimal degrees are rejected rather than guessed from their DMS digits.
+def parse_coordinates(coord: str) -> Optional[tuple[float, float]]:
+    geo_match = COORD_GEO_PATTERN.search(coord)
+
+    if geo_match:
+        latitude, longitude = (float(value.replace("−", "-")) for value in geo_match.groups())
+    else:
+        decimal_match = COORD_DECIMAL_PATTERN.search(coord)
+
+        if not decimal_match:
+            return None
+
+        latitude_value, latitude_hemisphere, longitude_value, longitude_hemisphere = decimal_match.groups()
+        latitude = -float(latitude_value) if latitude_hemisphere == "S" else float(latitude_value)
+        longitude = -float(longitude_value) if longitude_hemisphere == "W" else float(longitude_value)
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+
+    return latitude, longitude
+
+# Splits words the HTML table glued together: "Emma ThomasChristopher Nolan" -> "Emma Thomas Christopher Nolan",
+# "Paris2024" -> "Paris 2024" (but not units such as "330m" or "5mi"). A space is only inserted when the
+# output does not already have one two characters back.
+def _split_glued_words(text: str) -> str:
+    if not text:
+        return text
+
+    out = [text[0]]
+    prev_char = text[0]
+
+    for curr_char in text[1:]:
+        if (
+            (
+                (prev_char.islower() and curr_char.isupper()) or
+                (prev_char.isalpha() and curr_char.isnumeric() and prev_char != "m" and prev_char != "i")
+            )
+            and (len(out) < 2 or out[-2] != " ")
+        ):
+            out.append(" ")
+
+        out.append(curr_char)
+        prev_char = curr_char
+
+    return "".join(out)
+
+def normalize_infobox_label(label: str) -> str:
+    if "Capital and largest city" in label:
+        label = "Capital and largest city"
+
+    if "Assembly members" in label:
+        label = "Assembly members"
+
+    label = label.replace("•", "").replace("  ", " ").strip()
+
+    return CURLY_BRACKETS_PATTERN.sub("", SQUARE_BRACKETS_PATTERN.sub("", label))
+
+# Returns "" when nothing but footnotes or templates is left
+def normalize_infobox_value(value: str) -> str:
+    value = value.translate(VALUE_TRANSLATION)
+    value = CURLY_BRACKETS_PATTERN.sub(" ", SQUARE_BRACKETS_PATTERN.sub(" ", value))
+
+    if value.strip() == "":
+        return ""
+
+    value = CLOSE_PAREN_PATTERN.sub(") ", OPEN_PAREN_PATTERN.sub(" (", value))
+    value = GLUED_TOKEN_PATTERN.sub(r" \1", value)
+
+    # Twice, so runs of up to four spaces collapse
+    return _split_glued_words(value).strip().replace("  ", " ").replace("  ", " ")
+
+# One infobox row as (label, value), or None when the row is skipped
+def normalize_infobox_row(label: str, value: str) -> Optional[tuple[str, str]]:
+    if any(skipped_label in label for skipped_label in SKIPPED_LABELS):
+        return None
+
+    if "Coordinates" in label:
+        return "Coordinates", filter_infobox_coords(value)
+
+    if len(label) > MAX_CELL_LENGTH or len(value) > MAX_CELL_LENGTH or label == value:
+        return None
+
+    label = normalize_infobox_label(label)
+
+    if label.strip() == "":
+        return None
+
+    value = normalize_infobox_value(value)
+
+    if not value:
+        return None
+
+    return label, value
+
+# Bounds of the last line before `end` that is exactly a header matching `pattern`. Jumps from one "=="
+# to the previous one with rfind, so only the header lines near the end of the article are looked at.
+def _rfind_header(wikitext: str, pattern: re.Pattern, end: int) -> Optional[tuple[int, int]]:
+    position = end
+
+    while True:
+        marker = wikitext.rfind("==", 0, position)
+
+        if marker == -1:
+            return None
+
+        line_start = wikitext.rfind("\n", 0, marker) + 1
+        line_end = wikitext.find("\n", marker, end)
+        line_end = end if line_end == -1 else line_end
+
+        if pattern.fullmatch(wikitext[line_start:line_end].strip()):
+            return line_start, line_end
+
+        position = line_start
+
+# Link targets listed under "== See also ==", i.e. between that header and the last References / Notes
+# header; without a See also header everything above References / Notes is searched. Piped links
+# ("[[Tour Montparnasse|Montparnasse Tower]]") yield their display text.
+def extract_see_also_titles(wikitext: str) -> list[str]:
+    section_end = _rfind_header(wikitext, SECTION_END_PATTERN, len(wikitext))
+
+    if section_end is None:
+        return []
+
+    see_also_header = _rfind_header(wikitext, SEE_ALSO_PATTERN, section_end[0])
+    section_start = see_also_header[1] if see_also_header else 0
+
+    return [
+        link.split("|")[-1]
+        for link in SEE_ALSO_LINK_PATTERN.findall(wikitext, section_start, section_end[0])
+    ]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from backend.services import dedup
+from backend.services.dedup import dedupe_texts, normalize_text, MINHASH_PERMUTATIONS, SHINGLE_SIZE
+
+ARTICLE = (
+    "The Eiffel Tower is a wrought-iron lattice tower on the Champ de Mars in Paris, France. It is named after "
+    "the engineer Gustave Eiffel, whose company designed and built the tower from 1887 to 1889. Locally nicknamed "
+    "La dame de fer, it was constructed as the centrepiece of the 1889 World's Fair and to crown the centennial "
+    "anniversary of the French Revolution. Although initially criticised by some of France's leading artists "
+    "and intellectuals for its design, it has since become a global cultural icon of France and one of the most "
+    "recognisable structures in the world."
+)
+
+def shingles(text: str) -> set[str]:
+    words = normalize_text(text).split()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def jaccard(a: str, b: str) -> float:
+    return len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+
+# 0.7 of 64 permutations is 44.8, so 45 equal values is the least agreement that counts as a near duplicate
+@pytest.mark.parametrize("equal_values, dropped", [(45, True), (44, False)])
+def test_near_duplicate_threshold_on_signature_agreement(monkeypatch, equal_values, dropped):
+    base = np.arange(MINHASH_PERMUTATIONS, dtype=np.uint64)
+    # Differ in the leading values only, so the trailing LSH bands still collide and the pair is compared
+    variant = base.copy()
+    variant[:MINHASH_PERMUTATIONS - equal_values] += np.uint64(1000)
+    signatures = {"original": base, "copy": variant}
+
+    monkeypatch.setattr(dedup, "minhash", lambda normalized_text: signatures[normalized_text])
+
+    kept, stats = dedupe_texts(["original", "copy"])
+
+    assert kept == (["original"] if dropped else ["original", "copy"])
+    assert stats["near_duplicates"] == int(dropped)
+
+def test_syndicated_copy_with_small_edits_is_dropped():
+    copy = ARTICLE.replace("wrought-iron lattice tower", "wrought iron lattice tower").replace(
+        "one of the most recognisable", "among the most recognisable"
+    ) + " Read more at our partner site."
+
+    assert jaccard(ARTICLE, copy) > 0.8
+
+    kept, stats = dedupe_texts([ARTICLE, copy])
+
+    assert kept == [ARTICLE]
+    assert stats["near_duplicates"] == 1
+    assert stats["tokens_saved"] > 0
+
+def test_text_sharing_half_its_shingles_is_kept():
+    words = ARTICLE.split()
+    rewritten = " ".join(words[:len(words) // 2]) + (
+        " Today it draws millions of visitors every year, who ride its lifts to three observation levels and "
+        "dine in its two restaurants while looking out over the city and the river Seine below them."
+    )
+
+    assert 0.3 < jaccard(ARTICLE, rewritten) < 0.6
+
+    kept, stats = dedupe_texts([ARTICLE, rewritten])
+
+    assert kept == [ARTICLE, rewritten]
+    assert stats["near_duplicates"] == 0
+
+def test_exact_duplicates_ignore_case_and_punctuation():
+    kept, stats = dedupe_texts([ARTICLE, ARTICLE.upper().replace(",", " ")])
+
+    assert kept == [ARTICLE]
+    assert stats["exact_duplicates"] == 1
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from backend.infrastructure.geo_index import GeoIndex, haversine_km
+
+# Dense cities, sparse countryside and the awkward spots: the antimeridian and close to the poles
+CLUSTERS = [
+    (48.8566, 2.3522, 0.05),
+    (40.7128, -74.0060, 0.2),
+    (-33.8688, 151.2093, 2.0),
+    (64.1466, -21.9426, 5.0),
+    (-16.5, 179.9, 1.0),
+    (78.2232, 15.6267, 3.0),
+    (0.0, 0.0, 60.0),
+]
+
+QUERIES = [
+    (48.8584, 2.2945),
+    (40.7580, -73.9855),
+    (-33.8568, 151.2153),
+    (-17.0, -179.8),
+    (80.0, 20.0),
+    (10.0, 10.0),
+    (35.6762, 139.6503),
+    (-70.0, -60.0),
+]
+
+@pytest.fixture(scope="module")
+def index_and_entities():
+    rng = random.Random(50)
+    index = GeoIndex()
+    entities = []
+
+    for cluster, (center_lat, center_lon, spread) in enumerate(CLUSTERS):
+        for i in range(300):
+            lat = max(-90.0, min(90.0, center_lat + rng.uniform(-spread, spread)))
+            lon = (center_lon + rng.uniform(-spread, spread) + 180.0) % 360.0 - 180.0
+            kind = "place" if i % 3 else "article"
+            entity_id = f"{cluster}-{i}"
+
+            index.add(entity_id, kind, f"Entity {entity_id}", lat, lon)
+            entities.append((entity_id, kind, lat, lon))
+
+    return index, entities
+
+def brute_force(entities, lat, lon, k, kind=None, max_distance_km=None, exclude=None):
+    hits = sorted(
+        (haversine_km(lat, lon, entity_lat, entity_lon), entity_id)
+        for entity_id, entity_kind, entity_lat, entity_lon in entities
+        if entity_id != exclude and (kind is None or entity_kind == kind)
+    )
+
+    return [
+        entity_id
+        for distance_km, entity_id in hits[:k]
+        if max_distance_km is None or distance_km <= max_distance_km
+    ]
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("k", [1, 5, 25])
+def test_nearest_matches_brute_force_order(index_and_entities, lat, lon, k):
+    index, entities = index_and_entities
+
+    assert [entity.entity_id for entity, _ in index.nearest(lat, lon, k=k)] == brute_force(entities, lat, lon, k)
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_nearest_with_filters_matches_brute_force_order(index_and_entities, lat, lon):
+    index, entities = index_and_entities
+    exclude = brute_force(entities, lat, lon, 1)[0]
+
+    nearest = index.nearest(lat, lon, k=10, kind="article", max_distance_km=50.0, exclude=exclude)
+
+    assert [entity.entity_id for entity, _ in nearest] == brute_force(
+        entities, lat, lon, 10, kind="article", max_distance_km=50.0, exclude=exclude
+    )
+    assert all(distance_km <= 50.0 for _, distance_km in nearest)
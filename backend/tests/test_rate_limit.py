@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from backend.infrastructure import rate_limit
+from backend.infrastructure.rate_limit import RateLimiter, SLIDING_WINDOW_SCRIPT, KEY_PREFIX
+
+WINDOW = 60
+WINDOW_INDEX = 1000
+
+# The script runs inside fakeredis' Lua interpreter, so these exercise the same code Redis evaluates
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setitem(rate_limit.QUOTAS, "search", (5, 100))
+
+    limiter = RateLimiter(window=WINDOW)
+    limiter.async_redis_client = FakeAsyncRedis(decode_responses=True)
+    limiter.sliding_window_script = limiter.async_redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    return limiter
+
+# Pins the clock to a fraction of the way through the current window
+def set_elapsed(monkeypatch, elapsed):
+    monkeypatch.setattr(rate_limit.time, "time", lambda: (WINDOW_INDEX + elapsed) * WINDOW)
+
+def set_counter(limiter, client_key, window_index, count):
+    key = f"{KEY_PREFIX}search:{client_key}:{window_index}"
+    asyncio.run(limiter.async_redis_client.set(key, count))
+
+def hits(limiter, client_key, count, priority=True):
+    async def run():
+        return [await limiter.hit("search", client_key, priority) for _ in range(count)]
+
+    return asyncio.run(run())
+
+def test_allows_exactly_the_limit_then_denies(monkeypatch, limiter):
+    set_elapsed(monkeypatch, 0.5)
+
+    retry_afters = hits(limiter, "user:1", 6)
+
+    assert retry_afters[:5] == [0] * 5
+    # Over the limit on the current window alone, so the retry waits for it to end and slide out enough
+    assert retry_afters[5] > 0
+
+def test_previous_window_counts_by_its_remaining_overlap(monkeypatch, limiter):
+    # 8 requests last window, a quarter of which still overlaps: 2 count against the limit of 5. The 4th
+    # request fits once the previous window has slid out to 1, at 0.875 of this one.
+    set_elapsed(monkeypatch, 0.75)
+    set_counter(limiter, "user:1", WINDOW_INDEX - 1, 8)
+
+    assert hits(limiter, "user:1", 4) == [0, 0, 0, 8]
+
+def test_previous_window_alone_can_fill_the_limit(monkeypatch, limiter):
+    # 10 * 0.5 = 5 already used; the next request fits once another tenth of the window has passed
+    set_elapsed(monkeypatch, 0.5)
+    set_counter(limiter, "user:1", WINDOW_INDEX - 1, 10)
+
+    assert hits(limiter, "user:1", 1) == [6]
+
+def test_anonymous_clients_are_throttled_under_pressure_and_shed_when_full(monkeypatch, limiter):
+    set_elapsed(monkeypatch, 0.5)
+
+    # 70 to 74 of 100 global: below the 0.8 pressure threshold, anonymous clients keep their full quota
+    set_counter(limiter, "global", WINDOW_INDEX, 70)
+    assert hits(limiter, "ip:1", 5, priority=False) == [0] * 5
+
+    # 80 of 100: anonymous clients get floor(5 * 0.25) = 1, which has to slide out of the window entirely
+    # before the next one; logged-in users are unaffected
+    set_counter(limiter, "global", WINDOW_INDEX, 80)
+    assert hits(limiter, "ip:2", 2, priority=False) == [0, 90]
+    assert hits(limiter, "user:1", 5) == [0] * 5
+
+    # 100 of 100: anonymous clients are shed until the window ends
+    set_counter(limiter, "global", WINDOW_INDEX, 100)
+    assert hits(limiter, "ip:3", 1, priority=False) == [30]
+    assert hits(limiter, "user:2", 1) == [0]
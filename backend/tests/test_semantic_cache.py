@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from backend.infrastructure.semantic_cache import SemanticCache
+
+STORED = [1.0, 0.0, 0.0, 0.0]
+NEAR = [3.0, 4.0, 0.0, 0.0]
+
+# Cosine similarity of NEAR to STORED computed the way lookup_similar does, in float32; the threshold is
+# compared in float32 too, so the nearest stricter threshold is the next float32 up
+def cached_similarity() -> np.float32:
+    return SemanticCache._to_unit_vector(STORED) @ SemanticCache._to_unit_vector(NEAR)
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache(max_entries=8, ttl=60, dim=4)
+    cache.store("web:moderate", "eiffel tower", STORED, {"results": ["stored"]})
+
+    return cache
+
+def test_similarity_exactly_at_the_threshold_is_a_hit(monkeypatch, cache):
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_WEB", repr(float(cached_similarity())))
+
+    assert cache.lookup_similar("web:moderate", "web", NEAR) == {"results": ["stored"]}
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_similarity_just_below_the_threshold_is_a_miss(monkeypatch, cache):
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_WEB", repr(float(np.nextafter(cached_similarity(), np.float32(1)))))
+
+    assert cache.lookup_similar("web:moderate", "web", NEAR) is None
+    assert cache.stats()["misses"] == 1
+
+def test_thresholds_are_per_vertical_and_partitions_are_separate(monkeypatch, cache):
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_WEB", "0.5")
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_NEWS", "0.7")
+
+    # cos = 0.6
+    assert cache.lookup_similar("web:moderate", "web", NEAR) is not None
+    assert cache.lookup_similar("web:moderate", "news", NEAR) is None
+    assert cache.lookup_similar("web:strict", "web", NEAR) is None
+
+def test_expired_entries_never_match(monkeypatch, cache):
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD_WEB", "0.5")
+    monkeypatch.setattr("backend.infrastructure.semantic_cache.time.time", lambda: 2e10)
+
+    assert cache.lookup_similar("web:moderate", "web", STORED) is None
+    assert cache.lookup_exact("web:moderate", "eiffel tower") is None
@@ -0,0 +1,35 @@
+import pytest
+
+from backend.services.wikitext import parse_coordinates
+
+# Coordinates cells as pandas.read_html returns them from live infoboxes: "geo-dms / geo-dec", plus the
+# "/ lat; lon" geo span where it is not hidden with display:none
+@pytest.mark.parametrize(
+    "cell, expected",
+    [
+        ("48°51′29.6″N 2°17′40.2″E﻿ / ﻿48.858222°N 2.294500°E", (48.858222, 2.2945)),
+        ("40°42′46″N 74°00′22″W﻿ / ﻿40.71278°N 74.00611°W﻿ / 40.71278; -74.00611", (40.71278, -74.00611)),
+        ("40°42′46″N 74°00′22″W﻿ / ﻿40.71278°N 74.00611°W", (40.71278, -74.00611)),
+        ("33°51′31″S 151°12′51″E﻿ / ﻿33.85861°S 151.21417°E﻿ / -33.85861; 151.21417", (-33.85861, 151.21417)),
+        ("22°54′30″S 43°11′47″W﻿ / ﻿22.90833°S 43.19639°W", (-22.90833, -43.19639)),
+        ("51°30′26″N 0°7′39″W﻿ / ﻿51.50722°N 0.12750°W﻿ / 51.50722; -0.12750", (51.50722, -0.1275)),
+    ],
+)
+def test_parse_coordinates_keeps_hemisphere_signs(cell, expected):
+    assert parse_coordinates(cell) == pytest.approx(expected)
+
+@pytest.mark.parametrize(
+    "cell",
+    [
+        # DMS only, without the decimal part
+        "5°3′N 9°5′E",
+        "51°30′26″N 0°7′39″W",
+        "Paris, France",
+        "",
+        # Out of range
+        "91.5°N 10.0°E",
+        "10.0; 200.0",
+    ],
+)
+def test_parse_coordinates_rejects_cells_without_decimal_degrees(cell):
+    assert parse_coordinates(cell) is None
@@ -0,0 +1,95 @@
+from backend.infrastructure.write_behind import WriteBehindBuffer
+
+class PoisonRowError(Exception):
+    pass
+
+class TransientError(Exception):
+    pass
+
+# Rejects any batch holding a poison row, the way one bad FK fails a whole multi-row INSERT
+class FakeTable:
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.unavailable = False
+
+    def insert(self, rows):
+        self.calls += 1
+
+        if self.unavailable:
+            raise TransientError()
+
+        if any(row.get("poison") for row in rows):
+            raise PoisonRowError()
+
+        self.rows.extend(rows)
+
+def make_buffer(table, max_attempts=3):
+    # Timer and size triggers are out of reach so only the test's flush() calls write
+    return WriteBehindBuffer(
+        table.insert,
+        max_rows=1000,
+        max_delay_ms=60000,
+        max_attempts=max_attempts,
+        is_transient_error=lambda error: isinstance(error, TransientError),
+    )
+
+def test_bisect_writes_every_row_but_the_poison_one():
+    table = FakeTable()
+    buffer = make_buffer(table)
+
+    for i in range(16):
+        buffer.add({"id": i, "poison": i == 11})
+
+    assert buffer.flush() == 15
+    assert [row["id"] for row in table.rows] == [i for i in range(16) if i != 11]
+    assert buffer.pending() == 1
+
+    buffer.close()
+
+def test_poison_row_is_retried_alone_then_dropped():
+    table = FakeTable()
+    buffer = make_buffer(table, max_attempts=3)
+
+    for i in range(8):
+        buffer.add({"id": i, "poison": i == 3})
+
+    buffer.flush()
+    buffer.add({"id": 8, "poison": False})
+
+    # The poison row goes back in front of rows buffered since, and fails on its own from now on
+    assert buffer.flush() == 1
+    assert buffer.pending() == 1
+    assert buffer.dropped == 0
+
+    calls = table.calls
+    assert buffer.flush() == 0
+    assert table.calls == calls + 1
+    assert buffer.pending() == 0
+    assert buffer.dropped == 1
+    assert [row["id"] for row in table.rows] == [0, 1, 2, 4, 5, 6, 7, 8]
+
+    buffer.close()
+
+def test_transient_error_retries_the_batch_without_bisecting_or_counting():
+    table = FakeTable()
+    buffer = make_buffer(table, max_attempts=2)
+
+    for i in range(4):
+        buffer.add({"id": i})
+
+    table.unavailable = True
+
+    for _ in range(3):
+        assert buffer.flush() == 0
+
+    assert table.calls == 3
+    assert buffer.pending() == 4
+    assert buffer.dropped == 0
+
+    table.unavailable = False
+
+    assert buffer.flush() == 4
+    assert [row["id"] for row in table.rows] == [0, 1, 2, 3]
+
+    buffer.close()